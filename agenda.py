@@ -1,17 +1,24 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, ForeignKey, and_
-from sqlalchemy.orm import Session, relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, ForeignKey, Index, select, update, func, bindparam
+from sqlalchemy.orm import Session, Query, relationship
 from tabulate import tabulate
 from typing import Optional, Union, List, Any
-from datetime import datetime
+from datetime import datetime, time, timedelta
 from enum import Enum as PyEnum
+from itertools import chain
 
-from database import Base, agenda_maquinas_tabela, agenda_itens_tabela, agenda_suprimentos_tabela
+from database import (Base, agenda_maquinas_tabela, agenda_itens_tabela, agenda_suprimentos_tabela, agrupar_linhas_por,
+                      dividir_em_lotes, executar_com_retentativas)
 import funcionario as mod_funcionario
 import cliente as mod_cliente
 import maquina as mod_maquina
 import suprimento as mod_suprimento
 import servico as mod_servico
 import produto as mod_produto
+from resolvedor_nomes import obter_resolvedor
+from exportacao import RelatorioEmFluxo
+from paginacao import Pagina, paginar_consulta, TAMANHO_PAGINA
+from disponibilidade import obter_indice_maquinas, buscar_agendas_sobrepostas, horarios_livres_funcionario
+import resumos_diarios as mod_resumos
 
 class AgendaStatus(PyEnum):
     AGENDADO = "Agendado"
@@ -32,6 +39,14 @@ class SuprimentoAgendado:
 
 class Agenda(Base):
     __tablename__ = 'agendas'
+    # Mesma estratégia de vendas para listar_agendas. O índice de início
+    # inclui o fim para que o teste de sobreposição de verificar_conflito_maquina
+    # seja resolvido só com o índice.
+    __table_args__ = (
+        Index('ix_agendas_inicio_fim', 'data_hora_inicio', 'data_hora_fim'),
+        Index('ix_agendas_cliente_inicio', 'cliente_id', 'data_hora_inicio'),
+        Index('ix_agendas_funcionario_inicio', 'funcionario_id', 'data_hora_inicio'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     data_hora_inicio = Column(DateTime, nullable=False)
@@ -58,15 +73,134 @@ class Agenda(Base):
         self.status = kwargs.get('status', AgendaStatus.AGENDADO)
         self.valor_total = 0.0
 
+# Janela usada para sugerir horários livres na interface.
+EXPEDIENTE_PADRAO = (time(8, 0), time(18, 0))
+
+# Reserva de suprimentos: os suprimentos de agendas AGENDADO estão
+# reservados, e disponível = estoque - reservado. A reserva é a própria soma
+# de agenda_suprimentos, então sai sozinha quando a agenda deixa de ser
+# AGENDADO (Não Realizado, ou Realizado, quando a venda consome o estoque) ou
+# é excluída.
+
+TOLERANCIA_RESERVA = 1e-9
+
+def quantidades_reservadas(db: Session, ids_suprimentos: Optional[List[int]] = None,
+                           agenda_id_a_ignorar: Optional[int] = None) -> dict[int, float]:
+    tabela_agendas = Agenda.__table__
+    consulta = (
+        select(agenda_suprimentos_tabela.c.suprimento_id, func.sum(agenda_suprimentos_tabela.c.quantidade))
+        .join(tabela_agendas, tabela_agendas.c.id == agenda_suprimentos_tabela.c.agenda_id)
+        .where(tabela_agendas.c.status == AgendaStatus.AGENDADO)
+        .group_by(agenda_suprimentos_tabela.c.suprimento_id)
+    )
+    if agenda_id_a_ignorar:
+        consulta = consulta.where(agenda_suprimentos_tabela.c.agenda_id != agenda_id_a_ignorar)
+    if ids_suprimentos is None:
+        return {id_sup: quantidade or 0.0 for id_sup, quantidade in db.execute(consulta)}
+    reservadas: dict[int, float] = {}
+    for lote in dividir_em_lotes(set(ids_suprimentos)):
+        reservadas.update((id_sup, quantidade or 0.0) for id_sup, quantidade in
+                          db.execute(consulta.where(agenda_suprimentos_tabela.c.suprimento_id.in_(lote))))
+    return reservadas
+
+def suprimentos_disponiveis(db: Session, ids_suprimentos: Optional[List[int]] = None) -> dict[int, float]:
+    tabela_suprimentos = mod_suprimento.Suprimento.__table__
+    consulta = select(tabela_suprimentos.c.id, tabela_suprimentos.c.estoque)
+    if ids_suprimentos is not None:
+        consulta = consulta.where(tabela_suprimentos.c.id.in_(list(set(ids_suprimentos))))
+    reservadas = quantidades_reservadas(db, ids_suprimentos)
+    return {id_sup: estoque - reservadas.get(id_sup, 0.0) for id_sup, estoque in db.execute(consulta)}
+
+def _formatar_disponibilidade_suprimentos(db: Session, suprimentos: List[mod_suprimento.Suprimento]) -> str:
+    reservadas = quantidades_reservadas(db, [sup.id for sup in suprimentos])
+    dados_tabela = [
+        [sup.id, sup.nome, sup.unidade_medida, f"{sup.estoque:.2f}", f"{reservadas.get(sup.id, 0.0):.2f}",
+         f"{sup.estoque - reservadas.get(sup.id, 0.0):.2f}"]
+        for sup in suprimentos
+    ]
+    return tabulate(dados_tabela, headers=["ID", "Nome", "Unidade", "Estoque", "Reservado", "Disponível"], tablefmt="grid")
+
+def _demanda_por_suprimento(suprimentos_utilizados: List[SuprimentoAgendado]) -> dict[int, float]:
+    demanda: dict[int, float] = {}
+    for sup_ag in suprimentos_utilizados:
+        demanda[sup_ag.suprimento.id] = demanda.get(sup_ag.suprimento.id, 0.0) + sup_ag.quantidade
+    return demanda
+
+def _reservar_suprimentos(db: Session, demanda: dict[int, float], agenda_id_a_ignorar: Optional[int] = None) -> None:
+    if not demanda:
+        return
+    # O UPDATE sem efeito bloqueia as linhas dos suprimentos até o fim da
+    # transação (no SQLite, o banco para escrita): duas agendas concorrentes
+    # não conferem o mesmo saldo disponível ao mesmo tempo.
+    tabela_suprimentos = mod_suprimento.Suprimento.__table__
+    for lote in dividir_em_lotes(sorted(demanda)):
+        db.execute(update(tabela_suprimentos).where(tabela_suprimentos.c.id.in_(lote)).values(estoque=tabela_suprimentos.c.estoque))
+    suprimentos = {
+        linha.id: linha for linha in db.execute(
+            select(tabela_suprimentos.c.id, tabela_suprimentos.c.nome, tabela_suprimentos.c.unidade_medida, tabela_suprimentos.c.estoque)
+            .where(tabela_suprimentos.c.id.in_(list(demanda)))
+        )
+    }
+    reservadas = quantidades_reservadas(db, list(demanda), agenda_id_a_ignorar)
+    for id_sup in sorted(demanda):
+        if id_sup not in suprimentos:
+            db.rollback()
+            raise ValueError(f"Suprimento com ID {id_sup} não encontrado.")
+        suprimento = suprimentos[id_sup]
+        disponivel = suprimento.estoque - reservadas.get(id_sup, 0.0)
+        if demanda[id_sup] > disponivel + TOLERANCIA_RESERVA:
+            db.rollback()
+            raise ValueError(f"Suprimento '{suprimento.nome}' insuficiente: disponível {max(disponivel, 0.0):.2f} "
+                             f"{suprimento.unidade_medida}, necessário {demanda[id_sup]:.2f}.")
+
 # Funções de CRUD e Lógica de Negócio para Agenda
 
-def _recalcular_valor_total(db: Session, agenda: Agenda) -> None:
-    total = 0.0
-    itens_db = db.execute(agenda_itens_tabela.select().where(agenda_itens_tabela.c.agenda_id == agenda.id)).fetchall()
-    for item in itens_db:
-        total += item.quantidade * item.valor_negociado
-    agenda.valor_total = total
-    db.commit()
+def _validar_horario_disponivel(db: Session, funcionario_id: int, cliente_id: int, inicio: datetime, fim: datetime,
+                                agenda_id_a_ignorar: Optional[int] = None) -> None:
+    if fim <= inicio:
+        raise ValueError("A data/hora de fim deve ser posterior à de início.")
+    for conflito in buscar_agendas_sobrepostas(db, inicio, fim, funcionario_id=funcionario_id, cliente_id=cliente_id,
+                                               agenda_id_a_ignorar=agenda_id_a_ignorar):
+        envolvido = "O funcionário" if conflito.funcionario_id == funcionario_id else "O cliente"
+        raise ValueError(f"{envolvido} já possui a agenda ID {conflito.id} entre "
+                         f"{conflito.data_hora_inicio.strftime('%d/%m/%y %H:%M')} e {conflito.data_hora_fim.strftime('%d/%m/%y %H:%M')}.")
+
+def _validar_maquinas_livres(db: Session, maquinas: List[mod_maquina.Maquina], inicio: datetime, fim: datetime,
+                             agenda_id_a_ignorar: Optional[int] = None) -> None:
+    indice = obter_indice_maquinas(db)
+    for maquina in maquinas:
+        if not indice.maquina_livre(db, maquina.id, inicio, fim, agenda_id_a_ignorar):
+            raise ValueError(f"A máquina '{maquina.nome}' já está em uso no horário solicitado.")
+
+# valor_total é mantido por diferença: só os itens incluídos ou removidos na
+# operação entram na conta. O UPDATE usa a própria coluna (valor_total + delta)
+# para não depender do valor carregado na sessão.
+def _aplicar_delta_valor_total(agenda: Agenda, delta: float) -> None:
+    if delta:
+        agenda.valor_total = Agenda.valor_total + delta
+
+# Tolerância para diferenças de arredondamento acumuladas pelos deltas.
+TOLERANCIA_TOTAL_AGENDA = 0.005
+
+def verificar_totais_agendas(db: Session, corrigir: bool = False) -> List[tuple[int, float, float]]:
+    # Recalcula o total de todas as agendas com um único GROUP BY e devolve
+    # (id, valor armazenado, valor calculado) das que divergirem.
+    soma_itens = func.coalesce(func.sum(agenda_itens_tabela.c.quantidade * agenda_itens_tabela.c.valor_negociado), 0.0)
+    consulta = (
+        select(Agenda.id, Agenda.valor_total, soma_itens)
+        .outerjoin(agenda_itens_tabela, agenda_itens_tabela.c.agenda_id == Agenda.id)
+        .group_by(Agenda.id, Agenda.valor_total)
+        .having(func.abs(Agenda.valor_total - soma_itens) > TOLERANCIA_TOTAL_AGENDA)
+    )
+    divergencias = [(id_agenda, armazenado, calculado) for id_agenda, armazenado, calculado in db.execute(consulta)]
+
+    if corrigir and divergencias:
+        db.execute(
+            update(Agenda.__table__).where(Agenda.__table__.c.id == bindparam('b_id')).values(valor_total=bindparam('b_total')),
+            [{'b_id': id_agenda, 'b_total': calculado} for id_agenda, _, calculado in divergencias]
+        )
+        db.commit()
+    return divergencias
 
 def criar_agenda(db: Session, funcionario_obj: mod_funcionario.Funcionario, cliente_obj: mod_cliente.Cliente,
                  data_hora_inicio_obj: datetime, data_hora_fim_obj: datetime,
@@ -74,21 +208,33 @@ def criar_agenda(db: Session, funcionario_obj: mod_funcionario.Funcionario, clie
                  maquinas_agendadas: Optional[List[mod_maquina.Maquina]] = None,
                  suprimentos_utilizados: Optional[List[SuprimentoAgendado]] = None,
                  **kwargs) -> Agenda:
-    
-    if data_hora_fim_obj <= data_hora_inicio_obj:
-        raise ValueError("A data/hora de fim deve ser posterior à de início.")
+    # A reserva dos suprimentos e a gravação da agenda são uma transação,
+    # repetida em caso de conflito com outra sessão.
+    return executar_com_retentativas(db, lambda: _criar_agenda(
+        db, funcionario_obj, cliente_obj, data_hora_inicio_obj, data_hora_fim_obj, itens_agendados,
+        maquinas_agendadas, suprimentos_utilizados, **kwargs
+    ))
+
+def _criar_agenda(db: Session, funcionario_obj: mod_funcionario.Funcionario, cliente_obj: mod_cliente.Cliente,
+                  data_hora_inicio_obj: datetime, data_hora_fim_obj: datetime,
+                  itens_agendados: List[ItemAgendado],
+                  maquinas_agendadas: Optional[List[mod_maquina.Maquina]] = None,
+                  suprimentos_utilizados: Optional[List[SuprimentoAgendado]] = None,
+                  **kwargs) -> Agenda:
+    _validar_horario_disponivel(db, funcionario_obj.id, cliente_obj.id, data_hora_inicio_obj, data_hora_fim_obj)
 
     nova_agenda = Agenda(
         funcionario_obj=funcionario_obj, cliente_obj=cliente_obj,
         data_hora_inicio=data_hora_inicio_obj, data_hora_fim=data_hora_fim_obj, **kwargs
     )
+    if nova_agenda.status == AgendaStatus.AGENDADO:
+        _reservar_suprimentos(db, _demanda_por_suprimento(suprimentos_utilizados or []))
 
     if maquinas_agendadas:
         nova_agenda.maquinas_agendadas.extend(maquinas_agendadas)
 
     db.add(nova_agenda)
-    db.commit()
-    db.refresh(nova_agenda)
+    db.flush()
 
     total_valor = 0
     for item_ag in itens_agendados:
@@ -109,6 +255,8 @@ def criar_agenda(db: Session, funcionario_obj: mod_funcionario.Funcionario, clie
     nova_agenda.valor_total = total_valor
     db.commit()
     db.refresh(nova_agenda)
+    obter_indice_maquinas(db).registrar_agenda(nova_agenda.id, [m.id for m in maquinas_agendadas or []],
+                                               data_hora_inicio_obj, data_hora_fim_obj)
     return nova_agenda
 
 def buscar_agenda(db: Session, id_agenda: int) -> Optional[Agenda]:
@@ -124,25 +272,21 @@ def deletar_agenda(db: Session, id_agenda: int) -> None:
     
     db.delete(agenda)
     db.commit()
+    obter_indice_maquinas(db).remover_agenda(id_agenda)
 
-def _formatar_agendas_para_tabela(db: Session, agendas: list[Agenda]) -> str:
-    if not agendas:
-        return "Nenhum agendamento para exibir."
+CABECALHOS_RELATORIO_AGENDAS = ["ID", "Início", "Fim", "Funcionário", "Cliente", "Itens", "Status", "Valor"]
 
-    cabecalhos = ["ID", "Início", "Fim", "Funcionário", "Cliente", "Itens", "Status", "Valor"]
+def _preparar_linhas_agendas(db: Session, agendas: list[Agenda]) -> tuple[list[list[Any]], dict[str, float]]:
     dados_tabela = []
 
+    itens_por_agenda = agrupar_linhas_por(db, agenda_itens_tabela, 'agenda_id', (a.id for a in agendas))
+    resolvedor = obter_resolvedor(db)
+    resolvedor.carregar_linhas(chain.from_iterable(itens_por_agenda.values()))
+
     for agenda in agendas:
         itens_str_list = []
-        itens_agendados = db.execute(agenda_itens_tabela.select().where(agenda_itens_tabela.c.agenda_id == agenda.id)).fetchall()
-        for item in itens_agendados:
-            nome_item = f"({item.item_tipo} ID:{item.item_id} não encontrado)"
-            if item.item_tipo == 'Produto':
-                prod = mod_produto.buscar_produto_id(db, item.item_id)
-                if prod: nome_item = prod.nome
-            elif item.item_tipo == 'Servico':
-                serv = mod_servico.buscar_servico_id(db, item.item_id)
-                if serv: nome_item = serv.nome
+        for item in itens_por_agenda.get(agenda.id, []):
+            nome_item = resolvedor.nome(item.item_tipo, item.item_id) or f"({item.item_tipo} ID:{item.item_id} não encontrado)"
             itens_str_list.append(f"{item.quantidade}x {nome_item}")
         
         itens_str = ", ".join(itens_str_list) if itens_str_list else "Nenhum"
@@ -158,21 +302,26 @@ def _formatar_agendas_para_tabela(db: Session, agendas: list[Agenda]) -> str:
             f"R${agenda.valor_total:.2f}"
         ])
     
-    return tabulate(dados_tabela, headers=cabecalhos, tablefmt="grid")
+    return dados_tabela, {}
+
+def _formatar_agendas_para_tabela(db: Session, agendas: list[Agenda]) -> str:
+    if not agendas:
+        return "Nenhum agendamento para exibir."
+
+    dados_tabela, _ = _preparar_linhas_agendas(db, agendas)
+    return tabulate(dados_tabela, headers=CABECALHOS_RELATORIO_AGENDAS, tablefmt="grid")
+
+RELATORIO_AGENDAS = RelatorioEmFluxo(CABECALHOS_RELATORIO_AGENDAS, _preparar_linhas_agendas)
 
 def get_itens_agendados_detalhes(db: Session, id_agenda: int) -> List[dict]:
     itens_db = db.execute(
         agenda_itens_tabela.select().where(agenda_itens_tabela.c.agenda_id == id_agenda)
     ).fetchall()
+    resolvedor = obter_resolvedor(db)
+    resolvedor.carregar_linhas(itens_db)
     detalhes = []
     for item in itens_db:
-        nome_item = f"({item.item_tipo} ID:{item.item_id} não encontrado)"
-        if item.item_tipo == 'Produto':
-            prod = mod_produto.buscar_produto_id(db, item.item_id)
-            if prod: nome_item = prod.nome
-        elif item.item_tipo == 'Servico':
-            serv = mod_servico.buscar_servico_id(db, item.item_id)
-            if serv: nome_item = serv.nome
+        nome_item = resolvedor.nome(item.item_tipo, item.item_id) or f"({item.item_tipo} ID:{item.item_id} não encontrado)"
         detalhes.append({
             "id_associacao": item.id,
             "nome": nome_item,
@@ -189,43 +338,105 @@ def atualizar_agenda(db: Session, id_agenda: int,
     if not agenda:
         raise ValueError(f"Agenda com ID {id_agenda} não encontrada.")
 
-    for chave, valor in kwargs.items():
-        if hasattr(agenda, chave):
-            setattr(agenda, chave, valor)
-
-    if ids_associacao_a_remover:
-        for id_assoc in ids_associacao_a_remover:
-            db.execute(agenda_itens_tabela.delete().where(agenda_itens_tabela.c.id == id_assoc))
-
-    if itens_a_adicionar:
-        for item_ag in itens_a_adicionar:
-            db.execute(agenda_itens_tabela.insert().values(
-                agenda_id=agenda.id,
-                item_tipo=item_ag.item.__class__.__name__,
-                item_id=item_ag.item.id,
-                quantidade=item_ag.quantidade,
-                valor_negociado=item_ag.valor_negociado
-            ))
-    _recalcular_valor_total(db, agenda)
-    db.commit()
+    # O novo horário é conferido antes de qualquer alteração na agenda. Uma
+    # agenda não realizada não ocupa horário, então reabri-la também confere.
+    novo_status = kwargs.get('status', agenda.status)
+    reabrindo = agenda.status == AgendaStatus.NAO_REALIZADO and novo_status != AgendaStatus.NAO_REALIZADO
+    if novo_status != AgendaStatus.NAO_REALIZADO and (
+            reabrindo or {'data_hora_inicio', 'data_hora_fim', 'funcionario_id', 'cliente_id'} & kwargs.keys()):
+        novos = {chave: kwargs.get(chave, getattr(agenda, chave))
+                 for chave in ('funcionario_id', 'cliente_id', 'data_hora_inicio', 'data_hora_fim')}
+        _validar_horario_disponivel(db, novos['funcionario_id'], novos['cliente_id'], novos['data_hora_inicio'],
+                                    novos['data_hora_fim'], agenda_id_a_ignorar=agenda.id)
+
+    # As máquinas (as novas, se trocadas) precisam estar livres no horário final.
+    if novo_status != AgendaStatus.NAO_REALIZADO and (
+            reabrindo or {'data_hora_inicio', 'data_hora_fim', 'maquinas_agendadas'} & kwargs.keys()):
+        _validar_maquinas_livres(
+            db, kwargs['maquinas_agendadas'] if 'maquinas_agendadas' in kwargs else agenda.maquinas_agendadas,
+            kwargs.get('data_hora_inicio', agenda.data_hora_inicio), kwargs.get('data_hora_fim', agenda.data_hora_fim), agenda.id
+        )
+
+    # Qualquer falha daqui em diante desfaz a transação inteira, inclusive
+    # os atributos já alterados na agenda, que voltam a ser lidos do banco.
+    try:
+        status_anterior = agenda.status
+        for chave, valor in kwargs.items():
+            if hasattr(agenda, chave):
+                setattr(agenda, chave, valor)
+
+        # Reabrir uma agenda volta a reservar os seus suprimentos.
+        if agenda.status == AgendaStatus.AGENDADO and status_anterior != AgendaStatus.AGENDADO:
+            demanda: dict[int, float] = {}
+            for sup_agendado in db.execute(agenda_suprimentos_tabela.select().where(agenda_suprimentos_tabela.c.agenda_id == agenda.id)):
+                demanda[sup_agendado.suprimento_id] = demanda.get(sup_agendado.suprimento_id, 0.0) + sup_agendado.quantidade
+            _reservar_suprimentos(db, demanda, agenda_id_a_ignorar=agenda.id)
+
+        # Itens de uma agenda já vendida mudam o resumo diário da venda.
+        muda_itens = bool(ids_associacao_a_remover or itens_a_adicionar)
+        if muda_itens:
+            mod_resumos.aplicar_vendas_da_agenda(db, agenda.id, sinal=-1)
+
+        delta_total = 0.0
+        if ids_associacao_a_remover:
+            filtro_remocao = (agenda_itens_tabela.c.agenda_id == agenda.id) & agenda_itens_tabela.c.id.in_(ids_associacao_a_remover)
+            removidos = db.execute(
+                select(func.sum(agenda_itens_tabela.c.quantidade * agenda_itens_tabela.c.valor_negociado)).where(filtro_remocao)
+            ).scalar()
+            delta_total -= removidos or 0.0
+            db.execute(agenda_itens_tabela.delete().where(filtro_remocao))
+
+        if itens_a_adicionar:
+            db.execute(agenda_itens_tabela.insert(), [
+                {
+                    'agenda_id': agenda.id,
+                    'item_tipo': item_ag.item.__class__.__name__,
+                    'item_id': item_ag.item.id,
+                    'quantidade': item_ag.quantidade,
+                    'valor_negociado': item_ag.valor_negociado
+                }
+                for item_ag in itens_a_adicionar
+            ])
+            delta_total += sum(item_ag.subtotal for item_ag in itens_a_adicionar)
+
+        _aplicar_delta_valor_total(agenda, delta_total)
+        if muda_itens:
+            mod_resumos.aplicar_vendas_da_agenda(db, agenda.id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     db.refresh(agenda)
+    # As máquinas são relidas do banco: a atualização pode ter trocado a lista.
+    ids_maquinas = db.execute(
+        select(agenda_maquinas_tabela.c.maquina_id).where(agenda_maquinas_tabela.c.agenda_id == agenda.id)
+    ).scalars().all()
+    obter_indice_maquinas(db).registrar_agenda(agenda.id, ids_maquinas, agenda.data_hora_inicio, agenda.data_hora_fim)
     return agenda
 
 def verificar_conflito_maquina(db: Session, maquina_id: int, inicio: datetime, fim: datetime, agenda_id_a_ignorar: Optional[int] = None) -> bool:
-    query = db.query(Agenda).join(agenda_maquinas_tabela).filter(
-        agenda_maquinas_tabela.c.maquina_id == maquina_id,
-        and_(
-            Agenda.data_hora_inicio < fim, #type: ignore
-            Agenda.data_hora_fim > inicio #type: ignore
-        )
-    )
+    return not obter_indice_maquinas(db).maquina_livre(db, maquina_id, inicio, fim, agenda_id_a_ignorar)
 
-    if agenda_id_a_ignorar:
-        query = query.filter(Agenda.id != agenda_id_a_ignorar)
+def verificar_conflito_funcionario(db: Session, funcionario_id: int, inicio: datetime, fim: datetime, agenda_id_a_ignorar: Optional[int] = None) -> bool:
+    return bool(buscar_agendas_sobrepostas(db, inicio, fim, funcionario_id=funcionario_id, agenda_id_a_ignorar=agenda_id_a_ignorar))
 
-    return db.query(query.exists()).scalar()
+def buscar_horarios_livres_funcionario(db: Session, funcionario_id: int, inicio: datetime, fim: datetime, duracao: timedelta,
+                                       quantidade: int = 5, expediente: Optional[tuple[time, time]] = None) -> List[datetime]:
+    return horarios_livres_funcionario(db, funcionario_id, inicio, fim, duracao, quantidade, expediente=expediente)
 
-def listar_agendas(db: Session, data_inicio: Optional[datetime] = None, data_fim: Optional[datetime] = None, cliente_id: Optional[int] = None, funcionario_id: Optional[int] = None) -> list[Agenda]:
+def listar_maquinas_livres(db: Session, ids_maquinas: List[int], inicio: datetime, fim: datetime) -> List[int]:
+    return obter_indice_maquinas(db).maquinas_livres(db, ids_maquinas, inicio, fim)
+
+def buscar_primeiro_horario_livre_maquinas(db: Session, ids_maquinas: List[int], duracao: timedelta, a_partir_de: datetime,
+                                           limite: Optional[datetime] = None, simultaneo: bool = False) -> Union[dict[int, Optional[datetime]], Optional[datetime]]:
+    # simultaneo=True procura um horário em que todas as máquinas estejam livres
+    # juntas; caso contrário devolve o primeiro horário livre de cada uma.
+    indice = obter_indice_maquinas(db)
+    if simultaneo:
+        return indice.primeiro_horario_livre_comum(db, ids_maquinas, duracao, a_partir_de, limite)
+    return indice.primeiro_horario_livre(db, ids_maquinas, duracao, a_partir_de, limite)
+
+def consultar_agendas(db: Session, data_inicio: Optional[datetime] = None, data_fim: Optional[datetime] = None, cliente_id: Optional[int] = None, funcionario_id: Optional[int] = None) -> Query:
     query = db.query(Agenda)
     if data_inicio:
         query = query.filter(Agenda.data_hora_inicio >= data_inicio) #type: ignore
@@ -237,5 +448,14 @@ def listar_agendas(db: Session, data_inicio: Optional[datetime] = None, data_fim
     if funcionario_id:
         query = query.filter(Agenda.funcionario_id == funcionario_id)
     
-    return query.order_by(Agenda.data_hora_inicio.desc()).all() #type: ignore
+    return query.order_by(Agenda.data_hora_inicio.desc(), Agenda.id.desc()) #type: ignore
+
+def listar_agendas(db: Session, data_inicio: Optional[datetime] = None, data_fim: Optional[datetime] = None, cliente_id: Optional[int] = None, funcionario_id: Optional[int] = None) -> list[Agenda]:
+    return consultar_agendas(db, data_inicio, data_fim, cliente_id, funcionario_id).all()
+
+def paginar_agendas(db: Session, data_inicio: Optional[datetime] = None, data_fim: Optional[datetime] = None, cliente_id: Optional[int] = None,
+                    funcionario_id: Optional[int] = None, token: Optional[str] = None, tamanho_pagina: int = TAMANHO_PAGINA) -> Pagina:
+    # Mais recentes primeiro, como em consultar_agendas.
+    consulta = consultar_agendas(db, data_inicio, data_fim, cliente_id, funcionario_id)
+    return paginar_consulta(consulta, [Agenda.data_hora_inicio, Agenda.id], token, tamanho_pagina, descendente=True)
  
\ No newline at end of file
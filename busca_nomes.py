@@ -0,0 +1,196 @@
+from sqlalchemy import Table, Select, select, insert, update, delete, func, case, or_, event, inspect, bindparam
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from typing import Any, Iterable
+import math
+import re
+import unicodedata
+
+from database import trigramas_pessoas_tabela, trigramas_fornecedores_tabela, dividir_em_lotes
+
+# Busca de pessoas e fornecedores por nome sem varrer a tabela. Cada registro
+# guarda em nome_busca a chave do nome (minúscula, sem acentos nem pontuação,
+# espaços simples), preenchida pelo validador de nome, e tem seus trigramas
+# em trigramas_<tabela>, mantidos pelos eventos de insert/update/delete do
+# mapper. Uma busca pega no índice de trigramas os registros que contêm os
+# trigramas do texto e só confere o LIKE nesses candidatos.
+#
+# Os trigramas saem da chave inteira com o marcador no lugar dos espaços e
+# nas bordas ("joao silva" -> "__joao_silva_"), então "_si" marca início de
+# palavra e "o_s" atravessa as palavras.
+
+MODOS_BUSCA = ('prefixo', 'infixo', 'aproximado')
+LIMITE_RESULTADOS = 50
+# Similaridade mínima (trigramas em comum / trigramas da união) na busca
+# aproximada, e quantos candidatos com mais trigramas em comum são avaliados.
+LIMIAR_SIMILARIDADE = 0.3
+CANDIDATOS_APROXIMADOS = 200
+MARCADOR = '_'
+TAMANHO_LOTE_INDEXACAO = 5000
+
+def _dobrar(texto: str) -> str:
+    # Minúsculas sem acentos ("Conceição" -> "conceicao").
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(caractere for caractere in decomposto if not unicodedata.combining(caractere)).casefold()
+
+def normalizar_nome(texto: str) -> str:
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', _dobrar(texto)).split())
+
+def chave_unica_nome(texto: str) -> str:
+    # Chave dos nomes únicos de produtos, serviços e suprimentos: como o nome
+    # é comparado nas checagens de duplicidade, mantendo a pontuação.
+    return ' '.join(_dobrar(texto).split())
+
+def preencher_chaves_unicas(db: Session, modelo: Any) -> tuple[int, list[str]]:
+    # Registros anteriores à coluna nome_chave. Nomes que só diferem em
+    # maiúsculas/acentos ("Pão" e "pao") teriam a mesma chave: o primeiro
+    # fica com ela e os demais continuam sem chave, devolvidos para correção.
+    tabela = modelo.__table__
+    chaves_usadas = set(db.execute(select(tabela.c.nome_chave).where(tabela.c.nome_chave.is_not(None))).scalars())
+    preenchidos, conflitos = [], []
+    for registro_id, nome in db.execute(select(tabela.c.id, tabela.c.nome).where(tabela.c.nome_chave.is_(None)).order_by(tabela.c.id)).all():
+        chave = chave_unica_nome(nome)
+        if chave in chaves_usadas:
+            conflitos.append(nome)
+            continue
+        chaves_usadas.add(chave)
+        preenchidos.append({'b_id': registro_id, 'b_chave': chave})
+    if preenchidos:
+        db.execute(update(tabela).where(tabela.c.id == bindparam('b_id')).values(nome_chave=bindparam('b_chave')), preenchidos)
+        db.commit()
+    return len(preenchidos), conflitos
+
+def _trigramas(texto: str) -> set[str]:
+    return {texto[inicio:inicio + 3] for inicio in range(len(texto) - 2)}
+
+def trigramas_do_nome(chave: str) -> set[str]:
+    return _trigramas(MARCADOR * 2 + chave.replace(' ', MARCADOR) + MARCADOR)
+
+def similaridade(trigramas_a: set[str], trigramas_b: set[str]) -> float:
+    uniao = len(trigramas_a | trigramas_b)
+    return len(trigramas_a & trigramas_b) / uniao if uniao else 0.0
+
+# Tabela de trigramas de cada tabela com a coluna nome_busca.
+TABELAS_TRIGRAMAS = {'pessoas': trigramas_pessoas_tabela, 'fornecedores': trigramas_fornecedores_tabela}
+
+def _tabela_da_chave(modelo: Any) -> Table:
+    # Na herança (Cliente, Funcionario) a chave fica na tabela da base.
+    return modelo.__mapper__.columns['nome_busca'].table
+
+def _tabela_trigramas(modelo: Any) -> Table:
+    return TABELAS_TRIGRAMAS[_tabela_da_chave(modelo).name]
+
+# --- Manutenção do índice ---
+
+def _reindexar(conexao: Connection, t: Table, registros: list[tuple[int, str]]) -> None:
+    for lote in dividir_em_lotes([registro_id for registro_id, _ in registros]):
+        conexao.execute(delete(t).where(t.c.registro_id.in_(lote)))
+    linhas = [{'trigrama': trigrama, 'registro_id': registro_id}
+              for registro_id, chave in registros if chave for trigrama in trigramas_do_nome(chave)]
+    if linhas:
+        conexao.execute(insert(t), linhas)
+
+def registrar_indexacao(modelo: Any) -> None:
+    # Chamado uma vez por modelo com nome_busca; vale também para subclasses.
+    t = _tabela_trigramas(modelo)
+
+    def ao_inserir(_mapper, conexao: Connection, alvo: Any) -> None:
+        _reindexar(conexao, t, [(alvo.id, alvo.nome_busca)])
+
+    def ao_atualizar(_mapper, conexao: Connection, alvo: Any) -> None:
+        if inspect(alvo).attrs.nome_busca.history.has_changes():
+            _reindexar(conexao, t, [(alvo.id, alvo.nome_busca)])
+
+    def ao_excluir(_mapper, conexao: Connection, alvo: Any) -> None:
+        conexao.execute(delete(t).where(t.c.registro_id == alvo.id))
+
+    event.listen(modelo, 'after_insert', ao_inserir, propagate=True)
+    event.listen(modelo, 'after_update', ao_atualizar, propagate=True)
+    event.listen(modelo, 'after_delete', ao_excluir, propagate=True)
+
+def indexar_pendentes(db: Session, modelo: Any) -> int:
+    # Registros gravados sem passar pelo ORM (cargas em massa, bancos criados
+    # antes da busca) ficam com nome_busca NULL: gera a chave e os trigramas.
+    tabela = _tabela_da_chave(modelo)
+    total = 0
+    while True:
+        pendentes = db.execute(select(tabela.c.id, tabela.c.nome).where(tabela.c.nome_busca.is_(None))
+                               .limit(TAMANHO_LOTE_INDEXACAO)).all()
+        if not pendentes:
+            break
+        registros = [(registro_id, normalizar_nome(nome)) for registro_id, nome in pendentes]
+        db.execute(update(tabela).where(tabela.c.id == bindparam('b_id')).values(nome_busca=bindparam('b_chave')),
+                   [{'b_id': registro_id, 'b_chave': chave} for registro_id, chave in registros])
+        _reindexar(db.connection(), _tabela_trigramas(modelo), registros)
+        db.commit()
+        total += len(registros)
+    return total
+
+def reconstruir_indice(db: Session, modelo: Any) -> int:
+    tabela = _tabela_da_chave(modelo)
+    db.execute(delete(_tabela_trigramas(modelo)))
+    db.execute(update(tabela).values(nome_busca=None))
+    return indexar_pendentes(db, modelo)
+
+# --- Consulta ---
+
+def _ids_com_trigramas(modelo: Any, trigramas: Iterable[str], minimo: int) -> Select:
+    t = _tabela_trigramas(modelo)
+    return (select(t.c.registro_id).where(t.c.trigrama.in_(list(trigramas)))
+            .group_by(t.c.registro_id).having(func.count() >= minimo))
+
+def _buscar_aproximado(db: Session, modelo: Any, chave: str, limite: int) -> list[Any]:
+    # Ranqueia por trigramas em comum no banco (só os do tipo do modelo, pela
+    # junção com a tabela dele) e calcula a similaridade dos melhores aqui.
+    t = _tabela_trigramas(modelo)
+    trigramas_busca = trigramas_do_nome(chave)
+    tabela_modelo = modelo.__table__
+    em_comum = func.count().label('em_comum')
+    candidatos = db.execute(
+        select(t.c.registro_id, em_comum)
+        .join(tabela_modelo, tabela_modelo.c.id == t.c.registro_id)
+        .where(t.c.trigrama.in_(list(trigramas_busca)))
+        .group_by(t.c.registro_id)
+        .having(func.count() >= math.ceil(LIMIAR_SIMILARIDADE * len(trigramas_busca)))
+        .order_by(em_comum.desc())
+        .limit(CANDIDATOS_APROXIMADOS)
+    ).scalars().all()
+    if not candidatos:
+        return []
+    pontuados = []
+    for registro in db.query(modelo).filter(modelo.id.in_(candidatos)).all():
+        pontuacao = similaridade(trigramas_busca, trigramas_do_nome(registro.nome_busca or ''))
+        if pontuacao >= LIMIAR_SIMILARIDADE:
+            pontuados.append((pontuacao, registro))
+    pontuados.sort(key=lambda par: (-par[0], par[1].nome_busca, par[1].id))
+    return [registro for _, registro in pontuados[:limite]]
+
+def buscar_por_nome(db: Session, modelo: Any, nome_parcial: str, modo: str = 'infixo', limite: int = LIMITE_RESULTADOS) -> list[Any]:
+    # prefixo: alguma palavra do nome começa com o texto; infixo: o texto
+    # aparece em qualquer ponto; aproximado: nomes parecidos, mais parecidos
+    # primeiro (tolera erros de digitação).
+    if modo not in MODOS_BUSCA:
+        raise ValueError(f"Modo de busca '{modo}' inválido. Use um dos: {list(MODOS_BUSCA)}")
+    chave = normalizar_nome(nome_parcial)
+    if not chave:
+        return []
+    if modo == 'aproximado':
+        return _buscar_aproximado(db, modelo, chave, limite)
+
+    coluna = modelo.nome_busca
+    if modo == 'prefixo':
+        trigramas = _trigramas(MARCADOR + chave.replace(' ', MARCADOR))
+        filtro = or_(coluna.like(f"{chave}%"), coluna.like(f"% {chave}%"))
+    else:
+        trigramas = _trigramas(chave.replace(' ', MARCADOR))
+        filtro = coluna.like(f"%{chave}%")
+    consulta = db.query(modelo).filter(filtro)
+    # Textos curtos demais para formar um trigrama caem no LIKE sobre a chave.
+    if trigramas:
+        consulta = consulta.filter(modelo.id.in_(_ids_com_trigramas(modelo, trigramas, len(trigramas))))
+    # Nomes que começam pelo texto primeiro, depois os mais curtos.
+    comeca_com = case((coluna.like(f"{chave}%"), 0), else_=1)
+    return consulta.order_by(comeca_com, func.length(coluna), coluna, modelo.id).limit(limite).all()
+
+def inicializar_busca_nomes(db: Session, modelos: Iterable[Any]) -> int:
+    return sum(indexar_pendentes(db, modelo) for modelo in modelos)
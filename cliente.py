@@ -1,11 +1,14 @@
-from sqlalchemy import Column, Integer, ForeignKey, func
+from sqlalchemy import Column, Integer, ForeignKey
 from sqlalchemy.orm import Session
 from tabulate import tabulate
-from typing import Optional, Any, List
+from typing import Optional, Any, List, Iterable
 from datetime import date
 
 from pessoa import Pessoa
 import info as mod_info
+import busca_nomes as mod_busca
+import documentos as mod_documentos
+from paginacao import Pagina, paginar_consulta, TAMANHO_PAGINA
 
 class Cliente(Pessoa):
     __tablename__ = 'clientes'
@@ -46,20 +49,23 @@ def buscar_cliente_id(db: Session, id_cliente: int) -> Optional[Cliente]:
     return db.query(Cliente).filter(Cliente.id == id_cliente).first()
 
 def buscar_cliente_cpf(db: Session, cpf: str) -> Optional[Cliente]:
-    try:
-        cpf_limpo = "".join(filter(str.isdigit, cpf))
-        cpf_formatado = f"{cpf_limpo[:3]}.{cpf_limpo[3:6]}.{cpf_limpo[6:9]}-{cpf_limpo[9:]}"
-    except IndexError:
+    chave = mod_documentos.chave_documento(cpf, mod_documentos.TAMANHO_CPF)
+    if chave is None:
         return None
-    return db.query(Cliente).filter(Cliente.cpf == cpf_formatado).first()
+    return db.query(Cliente).filter(Cliente.cpf_numero == chave).first()
 
-def buscar_clientes_por_nome(db: Session, nome_parcial: str) -> List[Cliente]:
-    nome_lower = f"%{nome_parcial.lower().strip()}%"
-    return db.query(Cliente).filter(func.lower(Cliente.nome).like(nome_lower)).all()
+def buscar_clientes_por_cpfs(db: Session, cpfs: Iterable[str]) -> dict[str, Cliente]:
+    return mod_documentos.buscar_por_documentos(db, Cliente, Cliente.cpf_numero, cpfs, mod_documentos.TAMANHO_CPF)
+
+def buscar_clientes_por_nome(db: Session, nome_parcial: str, modo: str = 'infixo') -> List[Cliente]:
+    return mod_busca.buscar_por_nome(db, Cliente, nome_parcial, modo)
 
 def listar_clientes(db: Session) -> list[Cliente]:
     return db.query(Cliente).order_by(Cliente.id).all()
 
+def paginar_clientes(db: Session, token: Optional[str] = None, tamanho_pagina: int = TAMANHO_PAGINA) -> Pagina:
+    return paginar_consulta(db.query(Cliente), [Cliente.id], token, tamanho_pagina)
+
 def criar_cliente(db: Session, nome: str, nascimento_obj: date, cpf: str, info_contato: mod_info.Informacao) -> Cliente:
     if buscar_cliente_cpf(db, cpf):
         raise ValueError(f"Cliente com CPF {cpf} já existe.")
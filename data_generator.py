@@ -6,7 +6,7 @@ from typing import Any, Union, List
 
 # Import all necessary modules from the project
 # Certifique-se de que esses módulos estão no mesmo diretório ou no PYTHONPATH
-import pessoa
+import documentos
 import info
 import funcionario as mod_funcionario
 import cliente as mod_cliente
@@ -81,15 +81,14 @@ def _setup_dependent_objects(num_base_objects=50):
     for pool_list in _POOLS.values():
         pool_list.clear()
 
+    # CPFs e CNPJs distintos gerados em lote, em vez de sortear e conferir um a um
+    cpfs_base = documentos.gerar_cpfs_validos(2 * num_base_objects)
+    cnpjs_base = documentos.gerar_cnpjs_validos(num_base_objects)
+
     for i in range(num_base_objects):
         # Funcionarios
         # Garante CPF único para cada funcionário base
-        unique_cpf_func = None
-        while True:
-            temp_cpf = pessoa.gerar_cpf_valido()
-            if mod_funcionario.Funcionario.buscar_funcionario_cpf(temp_cpf) is None:
-                unique_cpf_func = temp_cpf
-                break
+        unique_cpf_func = cpfs_base[2 * i]
         func = mod_funcionario.Funcionario(
             id_funcionario=i + 1,
             nome=f"Funcionario {random.choice(_SURNAMES)}",
@@ -101,12 +100,7 @@ def _setup_dependent_objects(num_base_objects=50):
 
         # Clientes
         # Garante CPF único para cada cliente base
-        unique_cpf_cli = None
-        while True:
-            temp_cpf = pessoa.gerar_cpf_valido()
-            if mod_cliente.Cliente.buscar_cliente(temp_cpf) is None:
-                unique_cpf_cli = temp_cpf
-                break
+        unique_cpf_cli = cpfs_base[2 * i + 1]
         cli = mod_cliente.Cliente(
             nome=f"Cliente {random.choice(_SURNAMES)}",
             nascimento="01/01/1995", cpf=unique_cpf_cli,
@@ -128,12 +122,7 @@ def _setup_dependent_objects(num_base_objects=50):
 
         # Fornecedores
         # Garante CNPJ único para cada fornecedor base
-        unique_cnpj_forn = None
-        while True:
-            temp_cnpj = pessoa.gerar_cnpj_valido()
-            if mod_fornecedor.Fornecedor.buscar_fornecedor(temp_cnpj) is None:
-                unique_cnpj_forn = temp_cnpj
-                break
+        unique_cnpj_forn = cnpjs_base[i]
         forn = mod_fornecedor.Fornecedor(
             nome=f"Fornecedor Generico {int_to_alphastring(i+1)}", # Garante nome válido
             cnpj=unique_cnpj_forn, # Usa o CNPJ único garantido
@@ -187,15 +176,10 @@ def _generate_fornecedores(num_instances: int):
     """Generates a specified number of Fornecedor instances, ensuring unique CNPJ."""
     mod_fornecedor.Fornecedor._fornecedores_por_cnpj.clear() # Clear before generating for this test run
     start_time = time.time()
+    cnpjs = documentos.gerar_cnpjs_validos(num_instances)
     for i in range(num_instances):
         try:
-            unique_cnpj = None
-            # Loop para garantir CNPJ único antes de criar o fornecedor
-            while True:
-                temp_cnpj = pessoa.gerar_cnpj_valido()
-                if mod_fornecedor.Fornecedor.buscar_fornecedor(temp_cnpj) is None:
-                    unique_cnpj = temp_cnpj
-                    break
+            unique_cnpj = cnpjs[i]
             
             # Nome é válido (duas palavras alfabéticas, a segunda sendo única)
             name = f"Fornecedor Gerado {int_to_alphastring(i+1)}"
@@ -213,16 +197,10 @@ def _generate_clientes(num_instances: int):
     """Generates a specified number of Cliente instances, ensuring unique CPF."""
     mod_cliente.Cliente._clientes_por_cpf.clear() # Clear before generating for this test run
     start_time = time.time()
+    cpfs = documentos.gerar_cpfs_validos(num_instances)
     for i in range(num_instances):
         try:
-            unique_cpf = None
-            # Loop para garantir CPF único antes de criar o cliente
-            # Evita colisões e ValueErrors que seriam suprimidos
-            while True:
-                temp_cpf = pessoa.gerar_cpf_valido()
-                if mod_cliente.Cliente.buscar_cliente(temp_cpf) is None:
-                    unique_cpf = temp_cpf
-                    break
+            unique_cpf = cpfs[i]
             
             name = f"Cliente Gerado {int_to_alphastring(i+1)}"
             info_contact = info.Informacao(f"119{random.randint(10000000, 99999999)}", f"stress_cli_{i}@test.com", "Rua Teste, 1", "")
@@ -300,15 +278,10 @@ def _generate_funcionarios(num_instances: int):
     mod_funcionario.Funcionario._funcionarios_por_cpf.clear()
     mod_funcionario.Funcionario._funcionarios_por_id.clear()
     start_time = time.time()
+    cpfs = documentos.gerar_cpfs_validos(num_instances)
     for i in range(num_instances):
         try:
-            unique_cpf = None
-            # Loop para garantir CPF único antes de criar o funcionário
-            while True:
-                temp_cpf = pessoa.gerar_cpf_valido()
-                if mod_funcionario.Funcionario.buscar_funcionario_cpf(temp_cpf) is None:
-                    unique_cpf = temp_cpf
-                    break
+            unique_cpf = cpfs[i]
             
             name = f"Funcionario Teste {int_to_alphastring(i+1)}"
             mod_funcionario.Funcionario(
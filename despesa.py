@@ -1,20 +1,31 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
-from sqlalchemy.orm import Session, relationship
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index, update, select, insert, func, case, union_all
+from sqlalchemy.orm import Session, Query, relationship
 import tabulate
-from typing import Optional, Union, List, Any
+from typing import Optional, Union, List, Any, Callable
 from datetime import date
+import time
 
-from database import Base
+from database import Base, historico_custos_tabela, venda_itens_tabela, agenda_itens_tabela, dividir_em_lotes, inserir_obtendo_ids
 import produto as mod_produto
 import suprimento as mod_suprimento
 import maquina as mod_maquina
 import fornecedor as mod_fornecedor
 import funcionario as mod_funcionario
+from resolvedor_nomes import obter_resolvedor
+import historico_custos as mod_historico
+from exportacao import RelatorioEmFluxo
+from paginacao import Pagina, paginar_consulta, TAMANHO_PAGINA
+import resumos_diarios as mod_resumos
+import movimentos_estoque as mod_movimentos
 
 # --- Classes ORM para Despesas ---
 
 class Despesa(Base):
     __tablename__ = 'despesas'
+    __table_args__ = (
+        Index('ix_despesas_data_despesa', 'data_despesa'),
+        Index('ix_despesas_tipo_data', 'tipo', 'data_despesa'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     valor_total = Column(Float, nullable=False)
     data_despesa = Column(Date, nullable=False)
@@ -31,7 +42,7 @@ class Compra(Despesa):
     item_tipo = Column(String(50), nullable=False)
     item_id = Column(Integer, nullable=True)
     item_descricao = Column(String(255), nullable=True)
-    fornecedor_id = Column(Integer, ForeignKey('fornecedores.id'), nullable=False)
+    fornecedor_id = Column(Integer, ForeignKey('fornecedores.id'), nullable=False, index=True)
     fornecedor_obj = relationship("Fornecedor")
     __mapper_args__ = {'polymorphic_identity': 'compra'}
 
@@ -39,7 +50,7 @@ class FixoTerceiro(Despesa):
     __tablename__ = 'fixo_terceiros'
     id = Column(Integer, ForeignKey('despesas.id'), primary_key=True)
     tipo_despesa_str = Column(String(255), nullable=False)
-    fornecedor_id = Column(Integer, ForeignKey('fornecedores.id'), nullable=True)
+    fornecedor_id = Column(Integer, ForeignKey('fornecedores.id'), nullable=True, index=True)
     fornecedor_obj = relationship("Fornecedor")
     __mapper_args__ = {'polymorphic_identity': 'fixo_terceiro'}
 
@@ -48,7 +59,7 @@ class Salario(Despesa):
     id = Column(Integer, ForeignKey('despesas.id'), primary_key=True)
     salario_bruto = Column(Float, nullable=False)
     descontos = Column(Float, nullable=False)
-    funcionario_id = Column(Integer, ForeignKey('pessoas.id'), nullable=False)
+    funcionario_id = Column(Integer, ForeignKey('pessoas.id'), nullable=False, index=True)
     funcionario_obj = relationship("Funcionario")
     __mapper_args__ = {'polymorphic_identity': 'salario'}
 
@@ -59,7 +70,7 @@ class Comissao(Despesa):
     valor_soma_produtos = Column(Float, nullable=False)
     taxa_servicos = Column(Float, nullable=False)
     taxa_produtos = Column(Float, nullable=False)
-    funcionario_id = Column(Integer, ForeignKey('pessoas.id'), nullable=False)
+    funcionario_id = Column(Integer, ForeignKey('pessoas.id'), nullable=False, index=True)
     funcionario_obj = relationship("Funcionario")
     __mapper_args__ = {'polymorphic_identity': 'comissao'}
 
@@ -71,6 +82,12 @@ class Outros(Despesa):
 
 # --- Funções CRUD para Despesas ---
 
+def _registrar_no_resumo(db: Session, nova_despesa: Despesa) -> None:
+    db.add(nova_despesa)
+    db.flush()
+    mod_resumos.aplicar_despesas(db, [nova_despesa.id])
+    db.commit()
+
 def criar_compra(db: Session, fornecedor_obj: mod_fornecedor.Fornecedor,
                  item_comprado: Union[mod_produto.Produto, mod_suprimento.Suprimento, mod_maquina.Maquina, str],
                  quantidade: float, valor_unitario: float, data_despesa_obj: date, comentario: Optional[str] = None):
@@ -95,23 +112,18 @@ def criar_compra(db: Session, fornecedor_obj: mod_fornecedor.Fornecedor,
             item_comprado.custo_compra = valor_unitario
         else:
             item_comprado.custo_unitario = valor_unitario
-            
-        historico_existente = item_comprado.historico_custo_compra or []
-        novo_historico = list(historico_existente)
-        
-        novo_registro = {
-            "data": data_despesa_obj.isoformat(),
-            "quantidade": quantidade,
-            "valor_unitario": valor_unitario,
-            "fornecedor_id": fornecedor_obj.id,
-            "fornecedor_nome": fornecedor_obj.nome
-        }
-        novo_historico.append(novo_registro)
-        item_comprado.historico_custo_compra = novo_historico
+
+        # O flush gera o ID da compra para ligar o registro de custo a ela.
+        db.flush()
+        mod_historico.registrar_custo(
+            db, item_tipo_str, item_comprado.id, data_despesa_obj, quantidade, valor_unitario,
+            fornecedor_id=fornecedor_obj.id, fornecedor_nome=fornecedor_obj.nome, compra_id=nova_compra.id
+        )
+        mod_movimentos.registrar_movimentos(db, 'compra', [(item_tipo_str, item_comprado.id, quantidade, data_despesa_obj, nova_compra.id)])
         
         db.add(item_comprado)
 
-    db.commit()
+    _registrar_no_resumo(db, nova_compra)
 
 def criar_fixo_terceiro(db: Session, valor: float, tipo_despesa_str: str, data_despesa_obj: date,
                         fornecedor_obj: Optional[mod_fornecedor.Fornecedor] = None, comentario: Optional[str] = None):
@@ -119,8 +131,7 @@ def criar_fixo_terceiro(db: Session, valor: float, tipo_despesa_str: str, data_d
         valor_total=valor, data_despesa=data_despesa_obj,
         tipo_despesa_str=tipo_despesa_str, fornecedor_id=fornecedor_obj.id if fornecedor_obj else None, comentario=comentario
     )
-    db.add(nova_despesa)
-    db.commit()
+    _registrar_no_resumo(db, nova_despesa)
 
 def criar_salario(db: Session, funcionario_obj: mod_funcionario.Funcionario, salario_bruto: float,
                   descontos: float, data_despesa_obj: date, comentario: Optional[str] = None):
@@ -128,8 +139,7 @@ def criar_salario(db: Session, funcionario_obj: mod_funcionario.Funcionario, sal
         valor_total=salario_bruto - descontos, data_despesa=data_despesa_obj,
         salario_bruto=salario_bruto, descontos=descontos, funcionario_id=funcionario_obj.id, comentario=comentario
     )
-    db.add(nova_despesa)
-    db.commit()
+    _registrar_no_resumo(db, nova_despesa)
 
 def criar_comissao(db: Session, funcionario_obj: mod_funcionario.Funcionario, valor_soma_servicos: float, valor_soma_produtos: float,
                    taxa_servicos: float, taxa_produtos: float, data_despesa_obj: date, comentario: Optional[str] = None):
@@ -137,39 +147,205 @@ def criar_comissao(db: Session, funcionario_obj: mod_funcionario.Funcionario, va
     nova_despesa = Comissao(valor_total=valor_final, data_despesa=data_despesa_obj,
                             valor_soma_servicos=valor_soma_servicos, valor_soma_produtos=valor_soma_produtos,
                             taxa_servicos=taxa_servicos, taxa_produtos=taxa_produtos, funcionario_id=funcionario_obj.id, comentario=comentario)
-    db.add(nova_despesa)
+    _registrar_no_resumo(db, nova_despesa)
+
+def somar_vendas_para_comissao(db: Session, data_inicio: date, data_fim: date,
+                               funcionario_ids: Optional[List[int]] = None) -> dict[int, tuple[float, float]]:
+    # funcionario_id -> (soma de serviços, soma de produtos) vendidos no
+    # período, somando itens avulsos e itens da agenda realizada pela venda,
+    # numa única agregação no banco.
+    vendas = Base.metadata.tables['vendas']
+    filtros = [vendas.c.data_venda.between(data_inicio, data_fim)]
+    itens = union_all(
+        select(vendas.c.funcionario_id, venda_itens_tabela.c.item_tipo,
+               (venda_itens_tabela.c.quantidade * venda_itens_tabela.c.preco_unitario_vendido).label('valor'))
+        .join_from(vendas, venda_itens_tabela, venda_itens_tabela.c.venda_id == vendas.c.id).where(*filtros),
+        select(vendas.c.funcionario_id, agenda_itens_tabela.c.item_tipo,
+               (agenda_itens_tabela.c.quantidade * agenda_itens_tabela.c.valor_negociado).label('valor'))
+        .join_from(vendas, agenda_itens_tabela, agenda_itens_tabela.c.agenda_id == vendas.c.agenda_id).where(*filtros),
+    ).subquery()
+    consulta = select(
+        itens.c.funcionario_id,
+        func.sum(case((itens.c.item_tipo == 'Servico', itens.c.valor), else_=0.0)),
+        func.sum(case((itens.c.item_tipo == 'Produto', itens.c.valor), else_=0.0)),
+    ).group_by(itens.c.funcionario_id)
+
+    somas: dict[int, tuple[float, float]] = {}
+    lotes = dividir_em_lotes(set(funcionario_ids)) if funcionario_ids is not None else [None]
+    for lote in lotes:
+        consulta_lote = consulta if lote is None else consulta.where(itens.c.funcionario_id.in_(lote))
+        for funcionario_id, servicos, produtos in db.execute(consulta_lote):
+            somas[funcionario_id] = (servicos or 0.0, produtos or 0.0)
+    return somas
+
+def calcular_comissao(db: Session, funcionario_obj: mod_funcionario.Funcionario, data_inicio: date, data_fim: date) -> tuple[float, float]:
+    return somar_vendas_para_comissao(db, data_inicio, data_fim, [funcionario_obj.id]).get(funcionario_obj.id, (0.0, 0.0))
+
+def gerar_comissoes_em_lote(db: Session, data_inicio: date, data_fim: date, taxa_servicos: float, taxa_produtos: float,
+                            data_despesa_obj: Optional[date] = None, funcionario_ids: Optional[List[int]] = None,
+                            comentario: Optional[str] = None) -> int:
+    # Uma Comissao por funcionário com vendas no período, todas na mesma
+    # transação. Quem já tem comissão na data da despesa é ignorado, então
+    # repetir a geração do mesmo período não duplica lançamentos.
+    data_despesa_obj = data_despesa_obj or data_fim
+    comentario = comentario or f"Comissão de {data_inicio.strftime('%d/%m/%Y')} a {data_fim.strftime('%d/%m/%Y')}"
+    somas = somar_vendas_para_comissao(db, data_inicio, data_fim, funcionario_ids)
+
+    ja_comissionados: set[int] = set()
+    for lote in dividir_em_lotes(somas):
+        ja_comissionados.update(db.execute(
+            select(Comissao.funcionario_id).where(Comissao.data_despesa == data_despesa_obj, Comissao.funcionario_id.in_(lote))
+        ).scalars())
+    a_gerar = [(funcionario_id, servicos, produtos) for funcionario_id, (servicos, produtos) in sorted(somas.items())
+               if funcionario_id not in ja_comissionados and (servicos or produtos)]
+    if not a_gerar:
+        return 0
+
+    # Os IDs das despesas vêm do banco e são reaproveitados nas comissões.
+    ids_despesas = inserir_obtendo_ids(db, Despesa.__table__, [
+        {'tipo': 'comissao', 'data_despesa': data_despesa_obj, 'comentario': comentario,
+         'valor_total': (servicos * taxa_servicos) + (produtos * taxa_produtos)}
+        for _, servicos, produtos in a_gerar
+    ])
+    db.execute(insert(Comissao.__table__), [
+        {'id': id_despesa, 'funcionario_id': funcionario_id, 'valor_soma_servicos': servicos,
+         'valor_soma_produtos': produtos, 'taxa_servicos': taxa_servicos, 'taxa_produtos': taxa_produtos}
+        for id_despesa, (funcionario_id, servicos, produtos) in zip(ids_despesas, a_gerar)
+    ])
+    mod_resumos.aplicar_despesas(db, ids_despesas)
+    db.commit()
+    return len(a_gerar)
+
+class ResultadoFolha:
+    def __init__(self, data_inicio: date, data_fim: date, simulacao: bool):
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.simulacao = simulacao
+        # (funcionario_id, salario_bruto, descontos) de cada salário calculado.
+        self.salarios: List[tuple[int, float, float]] = []
+        self.ja_lancados = 0
+        # Etapa -> segundos.
+        self.tempos: dict[str, float] = {}
+
+    @property
+    def total_bruto(self) -> float:
+        return sum(bruto for _, bruto, _ in self.salarios)
+
+    @property
+    def total_descontos(self) -> float:
+        return sum(descontos for _, _, descontos in self.salarios)
+
+    @property
+    def total_liquido(self) -> float:
+        return self.total_bruto - self.total_descontos
+
+    def __str__(self) -> str:
+        situacao = "Simulação" if self.simulacao else "Lançados"
+        return (f"{situacao}: {len(self.salarios)} salário(s), Bruto: R${self.total_bruto:.2f}, "
+                f"Descontos: R${self.total_descontos:.2f}, Líquido: R${self.total_liquido:.2f}, "
+                f"Já lançados: {self.ja_lancados}, Tempo: {sum(self.tempos.values()):.3f}s")
+
+def _salario_proporcional(salario: float, admissao: date, demissao: Optional[date], data_inicio: date, data_fim: date) -> float:
+    # Admitidos ou demitidos dentro do período recebem pelos dias trabalhados.
+    inicio_trabalho = max(admissao, data_inicio)
+    fim_trabalho = min(demissao, data_fim) if demissao else data_fim
+    dias_periodo = (data_fim - data_inicio).days + 1
+    dias_trabalhados = (fim_trabalho - inicio_trabalho).days + 1
+    if dias_trabalhados >= dias_periodo:
+        return salario
+    return round(salario * max(dias_trabalhados, 0) / dias_periodo, 2)
+
+def gerar_folha_pagamento(db: Session, data_inicio: date, data_fim: date, data_pagamento: Optional[date] = None,
+                          calcular_descontos: Optional[Callable[[float], float]] = None, simular: bool = False,
+                          comentario: Optional[str] = None) -> ResultadoFolha:
+    # Um Salario por funcionário ativo no período (sem demissão ou demitido
+    # depois do início), sem carregar objetos ORM: seleção, cálculo e INSERTs
+    # em lote de despesas + salarios numa única transação. Funcionários
+    # que já têm salário na data de pagamento são ignorados. simular=True só
+    # calcula.
+    if data_inicio > data_fim:
+        raise ValueError("A data de início deve ser anterior à data de fim.")
+    data_pagamento = data_pagamento or data_fim
+    comentario = comentario or f"Folha de {data_inicio.strftime('%d/%m/%Y')} a {data_fim.strftime('%d/%m/%Y')}"
+    resultado = ResultadoFolha(data_inicio, data_fim, simular)
+
+    inicio_etapa = time.perf_counter()
+    funcionarios = Base.metadata.tables['funcionarios']
+    ativos = db.execute(
+        select(funcionarios.c.id, funcionarios.c.salario, funcionarios.c.data_admissao, funcionarios.c.data_demissao)
+        .where(funcionarios.c.data_admissao <= data_fim,
+               (funcionarios.c.data_demissao.is_(None)) | (funcionarios.c.data_demissao >= data_inicio))
+        .order_by(funcionarios.c.id)
+    ).fetchall()
+    ja_lancados = set(db.execute(select(Salario.funcionario_id).where(Salario.data_despesa == data_pagamento)).scalars())
+    resultado.tempos['seleção'] = time.perf_counter() - inicio_etapa
+
+    inicio_etapa = time.perf_counter()
+    for funcionario_id, salario, admissao, demissao in ativos:
+        if funcionario_id in ja_lancados:
+            resultado.ja_lancados += 1
+            continue
+        bruto = _salario_proporcional(salario, admissao, demissao, data_inicio, data_fim)
+        if bruto <= 0:
+            continue
+        descontos = round(calcular_descontos(bruto), 2) if calcular_descontos else 0.0
+        if descontos < 0 or descontos > bruto:
+            raise ValueError(f"Descontos inválidos para o funcionário ID {funcionario_id}: R${descontos:.2f}.")
+        resultado.salarios.append((funcionario_id, bruto, descontos))
+    resultado.tempos['cálculo'] = time.perf_counter() - inicio_etapa
+
+    if simular or not resultado.salarios:
+        return resultado
+
+    inicio_etapa = time.perf_counter()
+    # Os IDs das despesas vêm do banco (como em gerar_comissoes_em_lote) e
+    # os salários reaproveitam cada um. executemany de uma instrução só
+    # (compilada uma vez): montar .values(lote) recompilaria o SQL a cada
+    # lote e custa mais que a própria gravação.
+    ids_despesas = inserir_obtendo_ids(db, Despesa.__table__, [
+        {'tipo': 'salario', 'data_despesa': data_pagamento, 'comentario': comentario, 'valor_total': bruto - descontos}
+        for _, bruto, descontos in resultado.salarios
+    ])
+    db.execute(insert(Salario.__table__), [
+        {'id': id_despesa, 'funcionario_id': funcionario_id, 'salario_bruto': bruto, 'descontos': descontos}
+        for id_despesa, (funcionario_id, bruto, descontos) in zip(ids_despesas, resultado.salarios)
+    ])
+    mod_resumos.aplicar_despesas(db, ids_despesas)
     db.commit()
+    resultado.tempos['gravação'] = time.perf_counter() - inicio_etapa
+    return resultado
 
 def criar_outros(db: Session, valor: float, tipo_despesa_str: str, data_despesa_obj: date, comentario: Optional[str] = None):
     nova_despesa = Outros(valor_total=valor, data_despesa=data_despesa_obj,
                           tipo_despesa_str=tipo_despesa_str, comentario=comentario)
-    db.add(nova_despesa)
-    db.commit()
+    _registrar_no_resumo(db, nova_despesa)
 
 def deletar_despesa(db: Session, id_despesa: int):
     despesa = db.query(Despesa).get(id_despesa)
     if not despesa:
         raise ValueError(f"Despesa com ID {id_despesa} não encontrada.")
+    if isinstance(despesa, Compra):
+        # O registro de custo continua no histórico, apenas sem a compra.
+        db.execute(update(historico_custos_tabela).where(historico_custos_tabela.c.compra_id == despesa.id).values(compra_id=None))
+    mod_resumos.aplicar_despesas(db, [id_despesa], sinal=-1)
     db.delete(despesa)
     db.commit()
 
-def _formatar_despesas_para_tabela(db: Session, despesas: List[Despesa]) -> str:
-    if not despesas: return "Nenhuma despesa para exibir."
-    
-    cabecalhos = ["ID", "Data", "Tipo", "Valor", "Detalhes"]
+CABECALHOS_RELATORIO_DESPESAS = ["ID", "Data", "Tipo", "Valor", "Detalhes"]
+
+def _preparar_linhas_despesas(db: Session, despesas: List[Despesa]) -> tuple[list[list[Any]], dict[str, float]]:
     dados_tabela = []
     total_despesas = 0.0
 
+    resolvedor = obter_resolvedor(db)
+    resolvedor.carregar((d.item_tipo, d.item_id) for d in despesas if isinstance(d, Compra) and d.item_tipo in ("Produto", "Suprimento"))
+
     for d in despesas:
         detalhes = ""
         if isinstance(d, Compra):
             nome_item = ""
-            if d.item_tipo == "Produto":
-                item_obj = mod_produto.buscar_produto_id(db, d.item_id)
-                if item_obj: nome_item = item_obj.nome
-            elif d.item_tipo == "Suprimento":
-                item_obj = mod_suprimento.buscar_suprimento_id(db, d.item_id)
-                if item_obj: nome_item = item_obj.nome
+            if d.item_tipo in ("Produto", "Suprimento"):
+                nome_item = resolvedor.nome(d.item_tipo, d.item_id) or ""
             
             nome_item_final = nome_item or d.item_descricao or f"ID:{d.item_id} não encontrado"
             detalhes = f"Compra: {d.quantidade}x {nome_item_final} | Forn: {d.fornecedor_obj.nome}"
@@ -187,33 +363,47 @@ def _formatar_despesas_para_tabela(db: Session, despesas: List[Despesa]) -> str:
         dados_tabela.append([d.id, d.data_despesa.strftime("%d/%m/%Y"), tipo_str, f"R${d.valor_total:.2f}", detalhes])
         total_despesas += d.valor_total
 
-    tabela_formatada = tabulate.tabulate(dados_tabela, headers=cabecalhos, tablefmt="grid")
-    sumario = f"\n--- RESUMO DO FILTRO ---\nValor Total das Despesas: R${total_despesas:.2f}"
-    
-    return f"{tabela_formatada}{sumario}"
+    return dados_tabela, {'despesas': total_despesas}
+
+def _montar_resumo_despesas(totais: dict[str, float]) -> str:
+    return f"\n--- RESUMO DO FILTRO ---\nValor Total das Despesas: R${totais.get('despesas', 0.0):.2f}"
+
+def _formatar_despesas_para_tabela(db: Session, despesas: List[Despesa]) -> str:
+    if not despesas: return "Nenhuma despesa para exibir."
+
+    dados_tabela, totais = _preparar_linhas_despesas(db, despesas)
+    tabela_formatada = tabulate.tabulate(dados_tabela, headers=CABECALHOS_RELATORIO_DESPESAS, tablefmt="grid")
+    return f"{tabela_formatada}{_montar_resumo_despesas(totais)}"
+
+RELATORIO_DESPESAS = RelatorioEmFluxo(CABECALHOS_RELATORIO_DESPESAS, _preparar_linhas_despesas, _montar_resumo_despesas)
 
 def atualizar_dados_despesa(db: Session, id_despesa: int, **kwargs: Any) -> Despesa:
     despesa = db.query(Despesa).get(id_despesa)
     if not despesa:
         raise ValueError(f"Despesa com ID {id_despesa} não encontrada.")
 
+    mod_resumos.aplicar_despesas(db, [id_despesa], sinal=-1)
     for chave, valor in kwargs.items():
         if hasattr(despesa, chave):
             setattr(despesa, chave, valor)
 
     if isinstance(despesa, Compra):
         setattr(despesa, "valor_total", despesa.quantidade * despesa.valor_unitario)
+        db.execute(update(historico_custos_tabela).where(historico_custos_tabela.c.compra_id == despesa.id).values(
+            data_compra=despesa.data_despesa, quantidade=despesa.quantidade, valor_unitario=despesa.valor_unitario
+        ))
     elif isinstance(despesa, Salario):
         setattr(despesa, "valor_total", despesa.salario_bruto - despesa.descontos)
     elif isinstance(despesa, Comissao):
         valor_final = (despesa.valor_soma_servicos * despesa.taxa_servicos) + (despesa.valor_soma_produtos * despesa.taxa_produtos)
         setattr(despesa, "valor_total", valor_final)
-    
+
+    mod_resumos.aplicar_despesas(db, [id_despesa])
     db.commit()
     db.refresh(despesa)
     return despesa
 
-def listar_despesas(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None, funcionario_id: Optional[int] = None, fornecedor_id: Optional[int] = None, tipos: Optional[List[str]] = None) -> list[Despesa]:
+def consultar_despesas(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None, funcionario_id: Optional[int] = None, fornecedor_id: Optional[int] = None, tipos: Optional[List[str]] = None) -> Query:
     query = db.query(Despesa)
 
     if data_inicio:
@@ -234,4 +424,13 @@ def listar_despesas(db: Session, data_inicio: Optional[date] = None, data_fim: O
         fixo_ids = db.query(FixoTerceiro.id).filter(FixoTerceiro.fornecedor_id == fornecedor_id)
         query = query.filter(Despesa.id.in_(compra_ids.union(fixo_ids)))
 
-    return query.order_by(Despesa.data_despesa.asc()).all()
+    return query.order_by(Despesa.data_despesa.asc(), Despesa.id.asc())
+
+def listar_despesas(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None, funcionario_id: Optional[int] = None, fornecedor_id: Optional[int] = None, tipos: Optional[List[str]] = None) -> list[Despesa]:
+    return consultar_despesas(db, data_inicio, data_fim, funcionario_id, fornecedor_id, tipos).all()
+
+def paginar_despesas(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None, funcionario_id: Optional[int] = None,
+                     fornecedor_id: Optional[int] = None, tipos: Optional[List[str]] = None, token: Optional[str] = None,
+                     tamanho_pagina: int = TAMANHO_PAGINA) -> Pagina:
+    consulta = consultar_despesas(db, data_inicio, data_fim, funcionario_id, fornecedor_id, tipos)
+    return paginar_consulta(consulta, [Despesa.data_despesa, Despesa.id], token, tamanho_pagina)
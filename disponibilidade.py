@@ -0,0 +1,246 @@
+from sqlalchemy import select, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, time, timedelta
+from heapq import merge
+from itertools import accumulate
+from typing import Iterable, Iterator, Optional
+import threading
+import weakref
+
+from database import Base, agenda_maquinas_tabela
+
+class IntervalosOrdenados:
+    # Intervalos [inicio, fim) ordenados pelo início. fins_maximos[i] guarda o
+    # maior fim entre os intervalos 0..i; como é crescente, dá para achar por
+    # bisect o primeiro intervalo que ainda termina depois de um instante, o
+    # que mantém as consultas em O(log n + k) mesmo com sobreposições.
+    def __init__(self):
+        self.intervalos: list[tuple[datetime, datetime, int]] = []
+        self.inicios: list[datetime] = []
+        self.fins_maximos: list[datetime] = []
+
+    def __len__(self) -> int:
+        return len(self.intervalos)
+
+    def _recalcular_fins_maximos(self, desde: int) -> None:
+        anterior = self.fins_maximos[desde - 1:desde] if desde > 0 else []
+        sufixo = [fim for _, fim, _ in self.intervalos[desde:]]
+        self.fins_maximos[desde:] = list(accumulate(anterior + sufixo, max))[len(anterior):]
+
+    def adicionar(self, inicio: datetime, fim: datetime, id_ref: int) -> None:
+        posicao = bisect_right(self.intervalos, (inicio, fim, id_ref))
+        self.intervalos.insert(posicao, (inicio, fim, id_ref))
+        self.inicios.insert(posicao, inicio)
+        self._recalcular_fins_maximos(posicao)
+
+    def remover(self, inicio: datetime, fim: datetime, id_ref: int) -> None:
+        posicao = bisect_left(self.intervalos, (inicio, fim, id_ref))
+        if posicao < len(self.intervalos) and self.intervalos[posicao] == (inicio, fim, id_ref):
+            del self.intervalos[posicao]
+            del self.inicios[posicao]
+            self._recalcular_fins_maximos(posicao)
+
+    def sobrepostos(self, inicio: datetime, fim: datetime) -> Iterator[tuple[datetime, datetime, int]]:
+        primeiro = bisect_right(self.fins_maximos, inicio)
+        ultimo = bisect_left(self.inicios, fim)
+        for intervalo in self.intervalos[primeiro:ultimo]:
+            if intervalo[1] > inicio:
+                yield intervalo
+
+    def a_partir_de(self, instante: datetime) -> list[tuple[datetime, datetime, int]]:
+        return self.intervalos[bisect_right(self.fins_maximos, instante):]
+
+# Varre intervalos ocupados (ordenados pelo início) e devolve até 'quantidade'
+# janelas livres de 'duracao' dentro de [inicio, fim), sem testar horário a
+# horário. 'passo' é o intervalo entre janelas consecutivas no mesmo vão.
+def buscar_horarios_livres(ocupados: Iterable[tuple[datetime, datetime]], inicio: datetime, fim: Optional[datetime],
+                           duracao: timedelta, quantidade: int = 1, passo: Optional[timedelta] = None) -> list[datetime]:
+    if duracao <= timedelta(0):
+        raise ValueError("A duração deve ser positiva.")
+    passo = passo or duracao
+    horarios: list[datetime] = []
+    candidato = inicio
+
+    def preencher_vao(limite: Optional[datetime]) -> None:
+        nonlocal candidato
+        while len(horarios) < quantidade and (limite is None or candidato + duracao <= limite):
+            if fim is not None and candidato + duracao > fim:
+                return
+            horarios.append(candidato)
+            candidato += passo
+
+    for ocupado_inicio, ocupado_fim, *_ in ocupados:
+        if len(horarios) >= quantidade or (fim is not None and candidato >= fim):
+            break
+        if ocupado_fim <= candidato:
+            continue
+        preencher_vao(ocupado_inicio)
+        candidato = max(candidato, ocupado_fim)
+    preencher_vao(None)
+    return horarios
+
+# Fora do expediente [abertura, fechamento) de cada dia vira um intervalo
+# ocupado, para que a mesma varredura respeite o horário de trabalho.
+def _fora_do_expediente(inicio: datetime, fim: datetime, expediente: tuple[time, time]) -> Iterator[tuple[datetime, datetime]]:
+    abertura, fechamento = expediente
+    dia = inicio.date()
+    while datetime.combine(dia, time.min) < fim:
+        proximo_dia = datetime.combine(dia + timedelta(days=1), time.min)
+        yield datetime.combine(dia, time.min), datetime.combine(dia, abertura)
+        yield datetime.combine(dia, fechamento), proximo_dia
+        dia += timedelta(days=1)
+
+# --- Disponibilidade de funcionários e clientes ---
+
+# Uma única consulta por faixa de datas; com funcionario_id/cliente_id ela
+# usa os índices compostos (pessoa, data_hora_inicio) de agendas. Agendas
+# não realizadas liberam o horário, como liberam os suprimentos reservados.
+def buscar_agendas_sobrepostas(db: Session, inicio: datetime, fim: datetime, funcionario_id: Optional[int] = None,
+                               cliente_id: Optional[int] = None, agenda_id_a_ignorar: Optional[int] = None) -> list:
+    agendas = Base.metadata.tables['agendas']
+    filtros_pessoa = []
+    if funcionario_id is not None:
+        filtros_pessoa.append(agendas.c.funcionario_id == funcionario_id)
+    if cliente_id is not None:
+        filtros_pessoa.append(agendas.c.cliente_id == cliente_id)
+    if not filtros_pessoa:
+        return []
+    consulta = (
+        select(agendas.c.id, agendas.c.funcionario_id, agendas.c.cliente_id, agendas.c.data_hora_inicio, agendas.c.data_hora_fim)
+        .where(or_(*filtros_pessoa), agendas.c.data_hora_inicio < fim, agendas.c.data_hora_fim > inicio,
+               # AgendaStatus vem do tipo da coluna: agenda importa este módulo.
+               agendas.c.status != agendas.c.status.type.enum_class.NAO_REALIZADO)
+        .order_by(agendas.c.data_hora_inicio)
+    )
+    if agenda_id_a_ignorar is not None:
+        consulta = consulta.where(agendas.c.id != agenda_id_a_ignorar)
+    return db.execute(consulta).fetchall()
+
+def horarios_livres_funcionario(db: Session, funcionario_id: int, inicio: datetime, fim: datetime, duracao: timedelta,
+                                quantidade: int = 1, passo: Optional[timedelta] = None,
+                                expediente: Optional[tuple[time, time]] = None) -> list[datetime]:
+    # O filtro de sobreposição já traz as agendas que começaram antes de
+    # 'inicio' e ainda ocupam o começo da janela.
+    ocupados = [(linha.data_hora_inicio, linha.data_hora_fim)
+                for linha in buscar_agendas_sobrepostas(db, inicio, fim, funcionario_id=funcionario_id)]
+    if expediente is not None:
+        ocupados = merge(ocupados, _fora_do_expediente(inicio, fim, expediente))
+    return buscar_horarios_livres(ocupados, inicio, fim, duracao, quantidade, passo)
+
+class IndiceMaquinas:
+    # Ocupação das máquinas montada sob demanda a partir de agendas +
+    # agenda_maquinas e mantida por criar_agenda/atualizar_agenda/deletar_agenda.
+    # Alterações feitas por outros processos só aparecem após invalidar().
+    def __init__(self):
+        self._trava = threading.RLock()
+        self._por_maquina: Optional[dict[int, IntervalosOrdenados]] = None
+        self._agendas: dict[int, tuple[datetime, datetime, list[int]]] = {}
+
+    @property
+    def carregado(self) -> bool:
+        return self._por_maquina is not None
+
+    def invalidar(self) -> None:
+        with self._trava:
+            self._por_maquina = None
+            self._agendas = {}
+
+    def _garantir_carregado(self, db: Session) -> dict[int, IntervalosOrdenados]:
+        with self._trava:
+            if self._por_maquina is None:
+                agendas = Base.metadata.tables['agendas']
+                consulta = (
+                    select(agenda_maquinas_tabela.c.maquina_id, agendas.c.id, agendas.c.data_hora_inicio, agendas.c.data_hora_fim)
+                    .join(agendas, agendas.c.id == agenda_maquinas_tabela.c.agenda_id)
+                    .order_by(agendas.c.data_hora_inicio)
+                )
+                por_maquina: dict[int, IntervalosOrdenados] = {}
+                self._agendas = {}
+                for maquina_id, agenda_id, inicio, fim in db.execute(consulta):
+                    # As linhas já vêm ordenadas; montamos as listas direto em
+                    # vez de inserir uma a uma.
+                    indice = por_maquina.setdefault(maquina_id, IntervalosOrdenados())
+                    indice.intervalos.append((inicio, fim, agenda_id))
+                    self._agendas.setdefault(agenda_id, (inicio, fim, []))[2].append(maquina_id)
+                for indice in por_maquina.values():
+                    indice.intervalos.sort()
+                    indice.inicios = [inicio for inicio, _, _ in indice.intervalos]
+                    indice._recalcular_fins_maximos(0)
+                self._por_maquina = por_maquina
+            return self._por_maquina
+
+    # --- Manutenção (chamada depois do commit das operações de agenda) ---
+
+    def registrar_agenda(self, agenda_id: int, ids_maquinas: Iterable[int], inicio: datetime, fim: datetime) -> None:
+        with self._trava:
+            if self._por_maquina is None:
+                return
+            self._remover_sem_trava(agenda_id)
+            ids_maquinas = list(ids_maquinas)
+            if not ids_maquinas:
+                return
+            self._agendas[agenda_id] = (inicio, fim, ids_maquinas)
+            for maquina_id in ids_maquinas:
+                self._por_maquina.setdefault(maquina_id, IntervalosOrdenados()).adicionar(inicio, fim, agenda_id)
+
+    def remover_agenda(self, agenda_id: int) -> None:
+        with self._trava:
+            if self._por_maquina is not None:
+                self._remover_sem_trava(agenda_id)
+
+    def _remover_sem_trava(self, agenda_id: int) -> None:
+        registro = self._agendas.pop(agenda_id, None)
+        if registro is None:
+            return
+        inicio, fim, ids_maquinas = registro
+        for maquina_id in ids_maquinas:
+            self._por_maquina[maquina_id].remover(inicio, fim, agenda_id)
+
+    # --- Consultas ---
+
+    def agendas_em_conflito(self, db: Session, maquina_id: int, inicio: datetime, fim: datetime) -> list[int]:
+        with self._trava:
+            indice = self._garantir_carregado(db).get(maquina_id)
+            return [agenda_id for _, _, agenda_id in indice.sobrepostos(inicio, fim)] if indice else []
+
+    def maquina_livre(self, db: Session, maquina_id: int, inicio: datetime, fim: datetime,
+                      agenda_id_a_ignorar: Optional[int] = None) -> bool:
+        return all(agenda_id == agenda_id_a_ignorar for agenda_id in self.agendas_em_conflito(db, maquina_id, inicio, fim))
+
+    def maquinas_livres(self, db: Session, ids_maquinas: Iterable[int], inicio: datetime, fim: datetime) -> list[int]:
+        return [maquina_id for maquina_id in ids_maquinas if self.maquina_livre(db, maquina_id, inicio, fim)]
+
+    def primeiro_horario_livre(self, db: Session, ids_maquinas: Iterable[int], duracao: timedelta,
+                               a_partir_de: datetime, limite: Optional[datetime] = None) -> dict[int, Optional[datetime]]:
+        with self._trava:
+            por_maquina = self._garantir_carregado(db)
+            horarios = {}
+            for maquina_id in ids_maquinas:
+                indice = por_maquina.get(maquina_id)
+                ocupados = indice.a_partir_de(a_partir_de) if indice else []
+                encontrados = buscar_horarios_livres(ocupados, a_partir_de, limite, duracao)
+                horarios[maquina_id] = encontrados[0] if encontrados else None
+            return horarios
+
+    def primeiro_horario_livre_comum(self, db: Session, ids_maquinas: Iterable[int], duracao: timedelta,
+                                     a_partir_de: datetime, limite: Optional[datetime] = None) -> Optional[datetime]:
+        # Primeiro horário em que todas as máquinas estão livres ao mesmo tempo.
+        with self._trava:
+            por_maquina = self._garantir_carregado(db)
+            listas = [por_maquina[m].a_partir_de(a_partir_de) for m in set(ids_maquinas) if m in por_maquina]
+            encontrados = buscar_horarios_livres(merge(*listas), a_partir_de, limite, duracao)
+            return encontrados[0] if encontrados else None
+
+_indices_por_engine: "weakref.WeakKeyDictionary[Engine, IndiceMaquinas]" = weakref.WeakKeyDictionary()
+_trava_indices = threading.Lock()
+
+def obter_indice_maquinas(db: Session) -> IndiceMaquinas:
+    engine = db.get_bind()
+    with _trava_indices:
+        indice = _indices_por_engine.get(engine)
+        if indice is None:
+            indice = IndiceMaquinas()
+            _indices_por_engine[engine] = indice
+        return indice
@@ -0,0 +1,208 @@
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.orm import Session
+from typing import Any, Iterable, Optional
+import random
+
+from database import dividir_em_lotes
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# CPF e CNPJ ficam gravados duas vezes: na forma de exibição, com a máscara
+# (cpf, cnpj), e como chave numérica, os dígitos lidos como inteiro
+# (cpf_numero, cnpj_numero), com índice único. As buscas só comparam a
+# chave: o texto recebido, com ou sem máscara, vira um inteiro e a consulta é
+# uma igualdade no índice, sem remontar a máscara. Zeros à esquerda não se
+# perdem porque o número de dígitos de cada documento é fixo.
+
+TAMANHO_CPF = 11
+TAMANHO_CNPJ = 14
+MASCARA_CPF = "###.###.###-##"
+MASCARA_CNPJ = "##.###.###/####-##"
+
+# Pesos do primeiro e do segundo dígito verificador de cada documento.
+PESOS_VERIFICADORES: dict[int, tuple[list[int], list[int]]] = {
+    TAMANHO_CPF: (list(range(10, 1, -1)), list(range(11, 1, -1))),
+    TAMANHO_CNPJ: ([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]),
+}
+
+DIGITOS_ASCII = frozenset("0123456789")
+
+def digitos(documento: str) -> str:
+    # Só 0-9: str.isdigit aceita também '²', '١' e outros dígitos Unicode,
+    # que int() recusa ou lê como outro número.
+    return "".join(caractere for caractere in documento if caractere in DIGITOS_ASCII)
+
+def formatar_cpf(numeros_cpf: str) -> str:
+    return f"{numeros_cpf[:3]}.{numeros_cpf[3:6]}.{numeros_cpf[6:9]}-{numeros_cpf[9:]}"
+
+def formatar_cnpj(numeros_cnpj: str) -> str:
+    return f"{numeros_cnpj[:2]}.{numeros_cnpj[2:5]}.{numeros_cnpj[5:8]}/{numeros_cnpj[8:12]}-{numeros_cnpj[12:]}"
+
+# --- Dígitos verificadores, um documento por vez ---
+
+def _digito_verificador(soma: int) -> int:
+    resto = soma % 11
+    return 0 if resto < 2 else 11 - resto
+
+def _com_verificadores(base: list[int], tamanho: int) -> list[int]:
+    pesos_primeiro, pesos_segundo = PESOS_VERIFICADORES[tamanho]
+    completo = base + [_digito_verificador(sum(d * p for d, p in zip(base, pesos_primeiro)))]
+    completo.append(_digito_verificador(sum(d * p for d, p in zip(completo, pesos_segundo))))
+    return completo
+
+def eh_documento_valido(numeros: str, tamanho: int) -> bool:
+    # numeros: só os dígitos. Sequências de um dígito repetido passam na
+    # conta dos verificadores, mas não são documentos válidos.
+    if not (numeros.isascii() and numeros.isdigit()) or len(numeros) != tamanho or len(set(numeros)) == 1:
+        return False
+    valores = [int(caractere) for caractere in numeros]
+    return _com_verificadores(valores[:-2], tamanho) == valores
+
+def gerar_documento(tamanho: int) -> str:
+    while True:
+        completo = _com_verificadores([random.randint(0, 9) for _ in range(tamanho - 2)], tamanho)
+        if len(set(completo)) > 1:
+            return "".join(map(str, completo))
+
+# --- Em lote ---
+# Com numpy, N documentos viram uma matriz N x tamanho de dígitos e os dois
+# verificadores saem de produtos matriciais pelos vetores de pesos, sem laço
+# em Python por documento. Sem numpy, os lotes usam as funções acima.
+
+def _verificadores_em_lote(bases: Any, tamanho: int) -> tuple[Any, Any]:
+    pesos_primeiro, pesos_segundo = PESOS_VERIFICADORES[tamanho]
+    def digito(somas: Any) -> Any:
+        restos = somas % 11
+        return np.where(restos < 2, 0, 11 - restos)
+    primeiro = digito(bases @ np.array(pesos_primeiro))
+    segundo = digito(bases @ np.array(pesos_segundo[:-1]) + primeiro * pesos_segundo[-1])
+    return primeiro, segundo
+
+def _matriz_digitos(documentos: list[str], tamanho: int) -> tuple[Any, Any]:
+    # Como os validadores dos modelos, só os dígitos contam (máscara ou não).
+    # Documentos sem exatamente `tamanho` dígitos ficam com aceitos False e a
+    # linha zerada.
+    try:
+        caracteres = np.array(documentos, dtype=np.bytes_)
+        caracteres = caracteres.view(np.uint8).reshape(len(documentos), -1)
+    except UnicodeEncodeError:
+        caracteres = np.array(documentos, dtype=np.str_)
+        caracteres = caracteres.view(np.uint32).reshape(len(documentos), -1)
+    eh_digito = (caracteres >= ord('0')) & (caracteres <= ord('9'))
+    posicoes = eh_digito[0]
+    if posicoes.sum() == tamanho and (eh_digito == posicoes).all():
+        # Todos no mesmo formato (só dígitos, ou todos com a mesma máscara):
+        # basta separar as colunas dos dígitos.
+        return (caracteres[:, posicoes] - ord('0')).astype(np.int64), np.ones(len(documentos), dtype=bool)
+    aceitos = eh_digito.sum(axis=1) == tamanho
+    matriz = np.zeros((len(documentos), tamanho), dtype=np.int64)
+    matriz[aceitos] = (caracteres[aceitos][eh_digito[aceitos]] - ord('0')).reshape(-1, tamanho)
+    return matriz, aceitos
+
+def _validar_em_lote(documentos: Iterable[str], tamanho: int) -> list[bool]:
+    documentos = list(documentos)
+    if np is None:
+        return [eh_documento_valido(digitos(documento), tamanho) for documento in documentos]
+    if not documentos:
+        return []
+    matriz, aceitos = _matriz_digitos(documentos, tamanho)
+    primeiro, segundo = _verificadores_em_lote(matriz[:, :-2], tamanho)
+    validos = aceitos & (primeiro == matriz[:, -2]) & (segundo == matriz[:, -1]) & (matriz.min(axis=1) != matriz.max(axis=1))
+    return validos.tolist()
+
+def validar_cpfs(documentos: Iterable[str]) -> list[bool]:
+    return _validar_em_lote(documentos, TAMANHO_CPF)
+
+def validar_cnpjs(documentos: Iterable[str]) -> list[bool]:
+    return _validar_em_lote(documentos, TAMANHO_CNPJ)
+
+def _gerar_matriz(quantidade: int, tamanho: int, excluir: Iterable[int]) -> Any:
+    # Sorteia os números-base (os dígitos antes dos verificadores), que
+    # determinam o documento: base distinta é documento distinto, e a chave
+    # de `excluir` (cpf_numero/cnpj_numero) sem os dois últimos dígitos é a
+    # base dele. Bases de um dígito repetido também ficam de fora (são dez).
+    gerador = np.random.default_rng()
+    limite = 10 ** (tamanho - 2)
+    proibidas = np.concatenate((np.fromiter(excluir, dtype=np.int64) // 100, np.arange(10, dtype=np.int64) * ((limite - 1) // 9)))
+    bases = np.empty(0, dtype=np.int64)
+    while len(bases) < quantidade:
+        faltam = quantidade - len(bases)
+        sorteadas = gerador.integers(0, limite, size=faltam + faltam // 10 + 16, dtype=np.int64)
+        # Ordenadas, as repetições ficam vizinhas.
+        bases = np.sort(np.concatenate((bases, sorteadas)))
+        bases = bases[np.concatenate(([True], bases[1:] != bases[:-1]))]
+        bases = bases[~np.isin(bases, proibidas)]
+    bases = gerador.permutation(bases)[:quantidade]
+    digitos_base = (bases[:, None] // 10 ** np.arange(tamanho - 3, -1, -1, dtype=np.int64)) % 10
+    return np.column_stack((digitos_base, *_verificadores_em_lote(digitos_base, tamanho)))
+
+def _textos_da_matriz(matriz: Any, mascara: Optional[str]) -> list[str]:
+    caracteres = (matriz + ord('0')).astype(np.uint8)
+    if mascara:
+        modelo = np.frombuffer(mascara.encode('ascii'), dtype=np.uint8)
+        com_mascara = np.tile(modelo, (len(matriz), 1))
+        com_mascara[:, modelo == ord('#')] = caracteres
+        caracteres = com_mascara
+    largura = caracteres.shape[1]
+    return list(map(bytes.decode, np.ascontiguousarray(caracteres).view(f"S{largura}").ravel().tolist()))
+
+def _gerar_em_lote(quantidade: int, tamanho: int, mascara: Optional[str], excluir: Iterable[int]) -> list[str]:
+    if quantidade <= 0:
+        return []
+    if np is not None:
+        return _textos_da_matriz(_gerar_matriz(quantidade, tamanho, excluir), mascara)
+    formatar = {MASCARA_CPF: formatar_cpf, MASCARA_CNPJ: formatar_cnpj}.get(mascara, str)
+    vistos, gerados = set(excluir), []
+    while len(gerados) < quantidade:
+        numeros = gerar_documento(tamanho)
+        if int(numeros) not in vistos:
+            vistos.add(int(numeros))
+            gerados.append(formatar(numeros))
+    return gerados
+
+def gerar_cpfs_validos(quantidade: int, excluir: Iterable[int] = ()) -> list[str]:
+    # CPFs distintos só com dígitos, como pessoa.gerar_cpf_valido; excluir:
+    # chaves (cpf_numero) que não podem sair, como as já cadastradas.
+    return _gerar_em_lote(quantidade, TAMANHO_CPF, None, excluir)
+
+def gerar_cnpjs_validos(quantidade: int, excluir: Iterable[int] = ()) -> list[str]:
+    # CNPJs distintos com máscara, como pessoa.gerar_cnpj_valido.
+    return _gerar_em_lote(quantidade, TAMANHO_CNPJ, MASCARA_CNPJ, excluir)
+
+# --- Chaves e buscas ---
+
+def chave_documento(documento: str, tamanho: int) -> Optional[int]:
+    # None quando o texto não tem o número de dígitos do documento.
+    numeros = digitos(documento)
+    return int(numeros) if len(numeros) == tamanho else None
+
+def buscar_por_documentos(db: Session, modelo: Any, coluna_chave: Any, documentos: Iterable[str], tamanho: int) -> dict[str, Any]:
+    # Resolve muitos documentos de uma vez (importação de listas): um IN na
+    # chave por lote. Devolve {documento como recebido: registro}, só com os
+    # encontrados; formas diferentes do mesmo documento apontam para o mesmo
+    # registro.
+    documentos_por_chave: dict[int, list[str]] = {}
+    for documento in documentos:
+        chave = chave_documento(documento, tamanho)
+        if chave is not None:
+            documentos_por_chave.setdefault(chave, []).append(documento)
+    encontrados: dict[str, Any] = {}
+    for lote in dividir_em_lotes(documentos_por_chave):
+        for registro in db.query(modelo).filter(coluna_chave.in_(lote)):
+            for documento in documentos_por_chave[getattr(registro, coluna_chave.key)]:
+                encontrados[documento] = registro
+    return encontrados
+
+def preencher_chaves_documento(db: Session, modelo: Any, coluna_documento: str, coluna_chave: str) -> int:
+    # Registros anteriores à chave numérica (ou gravados sem passar pelo
+    # ORM): a chave sai dos dígitos da forma de exibição já validada.
+    tabela = modelo.__table__
+    pendentes = db.execute(select(tabela.c.id, tabela.c[coluna_documento]).where(tabela.c[coluna_chave].is_(None))).all()
+    chaves = [{'b_id': registro_id, 'b_chave': int(digitos(documento))} for registro_id, documento in pendentes if digitos(documento)]
+    if chaves:
+        db.execute(update(tabela).where(tabela.c.id == bindparam('b_id')).values({coluna_chave: bindparam('b_chave')}), chaves)
+        db.commit()
+    return len(chaves)
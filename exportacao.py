@@ -0,0 +1,74 @@
+from sqlalchemy.orm import Session, Query
+from typing import Any, Callable, Iterator, TextIO
+import csv
+import json
+import tabulate
+
+# Relatórios exportados em fluxo: as linhas são lidas, formatadas e escritas em
+# lotes, então o consumo de memória não cresce com o tamanho do período.
+
+TAMANHO_LOTE_EXPORTACAO = 500
+FORMATOS_EXPORTACAO = ('txt', 'csv', 'jsonl')
+
+class RelatorioEmFluxo:
+    # cabecalhos: colunas do relatório.
+    # preparar_linhas(db, objetos) -> (linhas, totais parciais do lote).
+    # montar_resumo(totais somados de todos os lotes) -> texto final do .txt.
+    def __init__(self, cabecalhos: list[str],
+                 preparar_linhas: Callable[[Session, list[Any]], tuple[list[list[Any]], dict[str, float]]],
+                 montar_resumo: Callable[[dict[str, float]], str] = lambda _totais: ""):
+        self.cabecalhos = cabecalhos
+        self.preparar_linhas = preparar_linhas
+        self.montar_resumo = montar_resumo
+
+def percorrer_em_lotes(db: Session, consulta: Query, tamanho_lote: int = TAMANHO_LOTE_EXPORTACAO) -> Iterator[list[Any]]:
+    # Só os IDs, na ordem da consulta, vêm por um cursor do lado do servidor
+    # numa conexão própria (stream_results + yield_per). Cada lote de objetos é
+    # carregado pela sessão, liberando-a para as consultas auxiliares dos
+    # formatadores enquanto o cursor continua aberto.
+    entidade = consulta.column_descriptions[0]['entity']
+    consulta_ids = consulta.with_entities(entidade.id).statement
+    with db.get_bind().connect() as conexao:
+        resultado = conexao.execution_options(stream_results=True, yield_per=tamanho_lote).execute(consulta_ids)
+        for particao in resultado.partitions():
+            ids = [linha[0] for linha in particao]
+            por_id = {obj.id: obj for obj in db.query(entidade).filter(entidade.id.in_(ids))}
+            yield [por_id[id_obj] for id_obj in ids if id_obj in por_id]
+
+def _somar_totais(acumulado: dict[str, float], parcial: dict[str, float]) -> None:
+    for chave, valor in parcial.items():
+        acumulado[chave] = acumulado.get(chave, 0.0) + valor
+
+def escrever_relatorio_em_fluxo(db: Session, relatorio: RelatorioEmFluxo, consulta: Query, destino: TextIO,
+                                formato: str = 'txt', tamanho_lote: int = TAMANHO_LOTE_EXPORTACAO) -> int:
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato '{formato}' inválido. Use um dos: {list(FORMATOS_EXPORTACAO)}")
+
+    escritor_csv = csv.writer(destino) if formato == 'csv' else None
+    if escritor_csv:
+        escritor_csv.writerow(relatorio.cabecalhos)
+
+    totais: dict[str, float] = {}
+    total_linhas = 0
+    for lote in percorrer_em_lotes(db, consulta, tamanho_lote):
+        linhas, totais_lote = relatorio.preparar_linhas(db, lote)
+        _somar_totais(totais, totais_lote)
+        total_linhas += len(linhas)
+        if formato == 'txt':
+            # Cada lote vira um bloco da grade; as larguras das colunas são
+            # calculadas por bloco, sem precisar conhecer o relatório inteiro.
+            if total_linhas > len(linhas):
+                destino.write("\n")
+            destino.write(tabulate.tabulate(linhas, headers=relatorio.cabecalhos, tablefmt="grid"))
+        elif escritor_csv:
+            escritor_csv.writerows(linhas)
+        else:
+            for linha in linhas:
+                destino.write(json.dumps(dict(zip(relatorio.cabecalhos, linha)), ensure_ascii=False, default=str))
+                destino.write("\n")
+        destino.flush()
+
+    if formato == 'txt' and total_linhas:
+        destino.write(relatorio.montar_resumo(totais))
+        destino.write("\n")
+    return total_linhas
@@ -0,0 +1,193 @@
+from sqlalchemy import Select, Date, DateTime, Enum, Float, Integer, select, func
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Optional
+import gzip
+import json
+import os
+
+from database import venda_itens_tabela, agenda_itens_tabela
+import venda as mod_venda
+import agenda as mod_agenda
+import despesa as mod_despesa
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Exportação analítica: cada tabela é lida por um cursor do lado do servidor,
+# em Core (sem objetos ORM), e gravada em arquivos colunares comprimidos
+# particionados por mês: <destino>/<tabela>/ano=AAAA/mes=MM/parte-00001.<ext>.
+# Com pyarrow instalado os arquivos são Parquet (zstd); sem ele, cada parte é
+# um JSON orientado a colunas comprimido com gzip.
+
+TAMANHO_LOTE_COLUNAR = 10_000
+TABELAS_EXPORTACAO_COLUNAR = ('vendas', 'venda_itens', 'agendas', 'agenda_itens', 'despesas')
+
+def _consulta_vendas() -> tuple[Select, Any]:
+    vendas = mod_venda.Venda.__table__
+    return select(vendas).order_by(vendas.c.data_venda, vendas.c.id), vendas.c.data_venda
+
+def _consulta_venda_itens() -> tuple[Select, Any]:
+    vendas = mod_venda.Venda.__table__
+    consulta = (
+        select(venda_itens_tabela, vendas.c.data_venda)
+        .join(vendas, vendas.c.id == venda_itens_tabela.c.venda_id)
+        .order_by(vendas.c.data_venda, venda_itens_tabela.c.venda_id, venda_itens_tabela.c.id)
+    )
+    return consulta, vendas.c.data_venda
+
+def _consulta_agendas() -> tuple[Select, Any]:
+    agendas = mod_agenda.Agenda.__table__
+    return select(agendas).order_by(agendas.c.data_hora_inicio, agendas.c.id), agendas.c.data_hora_inicio
+
+def _consulta_agenda_itens() -> tuple[Select, Any]:
+    agendas = mod_agenda.Agenda.__table__
+    consulta = (
+        select(agenda_itens_tabela, agendas.c.data_hora_inicio)
+        .join(agendas, agendas.c.id == agenda_itens_tabela.c.agenda_id)
+        .order_by(agendas.c.data_hora_inicio, agenda_itens_tabela.c.agenda_id, agenda_itens_tabela.c.id)
+    )
+    return consulta, agendas.c.data_hora_inicio
+
+def _consulta_despesas() -> tuple[Select, Any]:
+    # Uma linha por despesa com as colunas de todas as subclasses (LEFT JOIN
+    # em cada tabela filha); colunas com o mesmo nome em mais de uma subclasse
+    # (ex: fornecedor_id em compras e fixo_terceiros) viram uma só.
+    despesas = mod_despesa.Despesa.__table__
+    juncao = despesas
+    colunas_por_nome: dict[str, list] = defaultdict(list)
+    for mapper in mod_despesa.Despesa.__mapper__.self_and_descendants:
+        tabela = mapper.local_table
+        if tabela is despesas:
+            continue
+        juncao = juncao.outerjoin(tabela, tabela.c.id == despesas.c.id)
+        for coluna in tabela.c:
+            if coluna.name != 'id':
+                colunas_por_nome[coluna.name].append(coluna)
+
+    colunas_subclasses = [colunas[0] if len(colunas) == 1 else func.coalesce(*colunas).label(nome)
+                          for nome, colunas in colunas_por_nome.items()]
+    consulta = (
+        select(despesas, *colunas_subclasses)
+        .select_from(juncao)
+        .order_by(despesas.c.data_despesa, despesas.c.id)
+    )
+    return consulta, despesas.c.data_despesa
+
+CONSULTAS_COLUNARES: dict[str, Callable[[], tuple[Select, Any]]] = {
+    'vendas': _consulta_vendas,
+    'venda_itens': _consulta_venda_itens,
+    'agendas': _consulta_agendas,
+    'agenda_itens': _consulta_agenda_itens,
+    'despesas': _consulta_despesas,
+}
+
+def _filtrar_periodo(consulta: Select, coluna_data: Any, data_inicio: Optional[date], data_fim: Optional[date]) -> Select:
+    com_hora = isinstance(coluna_data.type, DateTime)
+    if data_inicio:
+        consulta = consulta.where(coluna_data >= (datetime.combine(data_inicio, time.min) if com_hora else data_inicio))
+    if data_fim:
+        if com_hora:
+            consulta = consulta.where(coluna_data < datetime.combine(data_fim + timedelta(days=1), time.min))
+        else:
+            consulta = consulta.where(coluna_data <= data_fim)
+    return consulta
+
+def _nome_tipo(tipo_sql: Any) -> str:
+    # Enum vem antes de String (é subclasse dela) e é gravado pelo valor.
+    if isinstance(tipo_sql, Enum): return 'string'
+    if isinstance(tipo_sql, DateTime): return 'timestamp'
+    if isinstance(tipo_sql, Date): return 'date'
+    if isinstance(tipo_sql, Integer): return 'int64'
+    if isinstance(tipo_sql, Float): return 'float64'
+    return 'string'
+
+def _tipo_arrow(nome_tipo: str) -> Any:
+    return {
+        'string': pa.string(), 'timestamp': pa.timestamp('us'), 'date': pa.date32(),
+        'int64': pa.int64(), 'float64': pa.float64(),
+    }[nome_tipo]
+
+class EscritorParticoes:
+    # Grava cada lote como uma parte dentro da partição do seu mês.
+    def __init__(self, diretorio_tabela: str, colunas: list[tuple[str, str]]):
+        self.diretorio_tabela = diretorio_tabela
+        self.colunas = colunas
+        self.partes_por_particao: dict[tuple[int, int], int] = defaultdict(int)
+        self.arquivos: list[str] = []
+        self.esquema = pa.schema([(nome, _tipo_arrow(tipo)) for nome, tipo in colunas]) if pa else None
+
+    def gravar(self, ano_mes: tuple[int, int], linhas: list[tuple]) -> None:
+        self.partes_por_particao[ano_mes] += 1
+        diretorio = os.path.join(self.diretorio_tabela, f"ano={ano_mes[0]:04d}", f"mes={ano_mes[1]:02d}")
+        os.makedirs(diretorio, exist_ok=True)
+        nome_parte = f"parte-{self.partes_por_particao[ano_mes]:05d}"
+        valores_por_coluna = list(zip(*linhas))
+
+        if pa:
+            caminho = os.path.join(diretorio, nome_parte + ".parquet")
+            tabela = pa.Table.from_arrays(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(valores_por_coluna, self.esquema)],
+                schema=self.esquema)
+            pq.write_table(tabela, caminho, compression='zstd')
+        else:
+            caminho = os.path.join(diretorio, nome_parte + ".json.gz")
+            conteudo = {
+                'esquema': dict(self.colunas),
+                'linhas': len(linhas),
+                'colunas': {nome: list(valores) for (nome, _), valores in zip(self.colunas, valores_por_coluna)},
+            }
+            with gzip.open(caminho, 'wt', encoding='utf-8') as arquivo:
+                json.dump(conteudo, arquivo, ensure_ascii=False, default=lambda valor: valor.isoformat())
+        self.arquivos.append(caminho)
+
+def exportar_tabela_colunar(db: Session, nome_tabela: str, destino: str, data_inicio: Optional[date] = None,
+                            data_fim: Optional[date] = None, tamanho_lote: int = TAMANHO_LOTE_COLUNAR) -> dict[str, int]:
+    if nome_tabela not in CONSULTAS_COLUNARES:
+        raise ValueError(f"Tabela '{nome_tabela}' inválida. Use uma das: {list(TABELAS_EXPORTACAO_COLUNAR)}")
+
+    consulta, coluna_data = CONSULTAS_COLUNARES[nome_tabela]()
+    consulta = _filtrar_periodo(consulta, coluna_data, data_inicio, data_fim)
+    colunas = [(coluna.name, _nome_tipo(coluna.type)) for coluna in consulta.selected_columns]
+    indice_data = [coluna.name for coluna in consulta.selected_columns].index(coluna_data.name)
+    indices_enum = [i for i, coluna in enumerate(consulta.selected_columns) if isinstance(coluna.type, Enum)]
+    escritor = EscritorParticoes(os.path.join(destino, nome_tabela), colunas)
+
+    # A consulta vem ordenada pela data, então cada mês chega contíguo: o
+    # buffer é gravado quando o mês muda ou quando atinge o tamanho do lote.
+    buffer: list[tuple] = []
+    particao_atual: Optional[tuple[int, int]] = None
+    total_linhas = 0
+    with db.get_bind().connect() as conexao:
+        resultado = conexao.execution_options(stream_results=True, yield_per=tamanho_lote).execute(consulta)
+        for particao in resultado.partitions():
+            for linha in particao:
+                data_linha = linha[indice_data]
+                ano_mes = (data_linha.year, data_linha.month)
+                if buffer and (ano_mes != particao_atual or len(buffer) >= tamanho_lote):
+                    escritor.gravar(particao_atual, buffer)
+                    buffer = []
+                particao_atual = ano_mes
+                if indices_enum:
+                    linha = list(linha)
+                    for i in indices_enum:
+                        if linha[i] is not None:
+                            linha[i] = linha[i].value
+                buffer.append(tuple(linha))
+                total_linhas += 1
+        if buffer:
+            escritor.gravar(particao_atual, buffer)
+
+    return {'linhas': total_linhas, 'arquivos': len(escritor.arquivos)}
+
+def exportar_colunar(db: Session, destino: str, tabelas: Optional[list[str]] = None, data_inicio: Optional[date] = None,
+                     data_fim: Optional[date] = None, tamanho_lote: int = TAMANHO_LOTE_COLUNAR) -> dict[str, dict[str, int]]:
+    return {
+        nome_tabela: exportar_tabela_colunar(db, nome_tabela, destino, data_inicio, data_fim, tamanho_lote)
+        for nome_tabela in (tabelas or TABELAS_EXPORTACAO_COLUNAR)
+    }
@@ -1,17 +1,24 @@
-from sqlalchemy import Column, Integer, String, func
+from sqlalchemy import Column, Integer, BigInteger, String
 from sqlalchemy.orm import Session, validates
 from tabulate import tabulate
-from typing import Optional, Any, List
+from typing import Optional, Any, List, Iterable
 
 from database import Base
 import info as mod_info
+import busca_nomes as mod_busca
+import documentos as mod_documentos
+from paginacao import Pagina, paginar_consulta, TAMANHO_PAGINA
 
 class Fornecedor(Base):
     __tablename__ = 'fornecedores'
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(255), nullable=False)
+    # Chave de busca do nome (ver busca_nomes); NULL até ser indexada.
+    nome_busca = Column(String(255), nullable=True, index=True)
     cnpj = Column(String(18), unique=True, index=True, nullable=False)
+    # Dígitos do CNPJ como inteiro (ver documentos); NULL até ser preenchida.
+    cnpj_numero = Column(BigInteger, unique=True, index=True, nullable=True)
     
     telefone = Column(String(50), nullable=False)
     email = Column(String(255), nullable=False)
@@ -60,62 +67,46 @@ class Fornecedor(Base):
         nome_limpo = nome_str.strip()
         if not nome_limpo:
             raise ValueError("O nome do fornecedor não pode ser vazio.")
+        self.nome_busca = mod_busca.normalizar_nome(nome_limpo)
         return nome_limpo
 
     @validates('cnpj')
     def validar_cnpj(self, key, cnpj_str):
-        cnpj_limpo = "".join(filter(str.isdigit, cnpj_str))
+        cnpj_limpo = mod_documentos.digitos(cnpj_str)
         if not Fornecedor._eh_cnpj_valido(cnpj_limpo):
             raise ValueError("CNPJ inválido: Dígitos verificadores não correspondem ou padrão inválido.")
-        
-        return f"{cnpj_limpo[:2]}.{cnpj_limpo[2:5]}.{cnpj_limpo[5:8]}/{cnpj_limpo[8:12]}-{cnpj_limpo[12:]}"
+        self.cnpj_numero = int(cnpj_limpo)
+        return mod_documentos.formatar_cnpj(cnpj_limpo)
 
     @staticmethod
     def _eh_cnpj_valido(numeros_cnpj: str) -> bool:
-        if not numeros_cnpj.isdigit() or len(numeros_cnpj) != 14:
-            return False
-
-        if len(set(numeros_cnpj)) == 1:
-            return False
-        soma1: int = 0
-        multiplicadores1: list[int] = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-        for i in range(12):
-            soma1 += int(numeros_cnpj[i]) * multiplicadores1[i]
-        primeiro_dv_calculado: int = 11 - (soma1 % 11)
-        if primeiro_dv_calculado > 9:
-            primeiro_dv_calculado = 0
-        if primeiro_dv_calculado != int(numeros_cnpj[12]):
-            return False
-        soma2: int = 0
-        multiplicadores2: list[int] = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-        for i in range(13):
-            soma2 += int(numeros_cnpj[i]) * multiplicadores2[i]
-        segundo_dv_calculado: int = 11 - (soma2 % 11)
-        if segundo_dv_calculado > 9:
-            segundo_dv_calculado = 0
-        return segundo_dv_calculado == int(numeros_cnpj[13])
+        return mod_documentos.eh_documento_valido(numeros_cnpj, mod_documentos.TAMANHO_CNPJ)
+
+mod_busca.registrar_indexacao(Fornecedor)
 
 # Funções de CRUD para Fornecedor
 
 def buscar_fornecedor(db: Session, cnpj: str) -> Optional[Fornecedor]:
-    try:
-        cnpj_limpo = "".join(filter(str.isdigit, cnpj))
-        if len(cnpj_limpo) != 14: return None
-        cnpj_formatado = f"{cnpj_limpo[:2]}.{cnpj_limpo[2:5]}.{cnpj_limpo[5:8]}/{cnpj_limpo[8:12]}-{cnpj_limpo[12:]}"
-    except IndexError:
+    chave = mod_documentos.chave_documento(cnpj, mod_documentos.TAMANHO_CNPJ)
+    if chave is None:
         return None
-    return db.query(Fornecedor).filter(Fornecedor.cnpj == cnpj_formatado).first() #type: ignore
+    return db.query(Fornecedor).filter(Fornecedor.cnpj_numero == chave).first()
+
+def buscar_fornecedores_por_cnpjs(db: Session, cnpjs: Iterable[str]) -> dict[str, Fornecedor]:
+    return mod_documentos.buscar_por_documentos(db, Fornecedor, Fornecedor.cnpj_numero, cnpjs, mod_documentos.TAMANHO_CNPJ)
 
 def buscar_fornecedor_id(db: Session, id_fornecedor: int) -> Optional[Fornecedor]:
     return db.query(Fornecedor).filter(Fornecedor.id == id_fornecedor).first()
 
-def buscar_fornecedores_por_nome(db: Session, nome_parcial: str) -> List[Fornecedor]:
-    nome_lower = f"%{nome_parcial.lower().strip()}%"
-    return db.query(Fornecedor).filter(func.lower(Fornecedor.nome).like(nome_lower)).all()
+def buscar_fornecedores_por_nome(db: Session, nome_parcial: str, modo: str = 'infixo') -> List[Fornecedor]:
+    return mod_busca.buscar_por_nome(db, Fornecedor, nome_parcial, modo)
 
 def listar_fornecedores(db: Session) -> list[Fornecedor]:
     return db.query(Fornecedor).order_by(Fornecedor.id).all()
 
+def paginar_fornecedores(db: Session, token: Optional[str] = None, tamanho_pagina: int = TAMANHO_PAGINA) -> Pagina:
+    return paginar_consulta(db.query(Fornecedor), [Fornecedor.id], token, tamanho_pagina)
+
 def criar_fornecedor(db: Session, nome: str, cnpj: str, info_contato: mod_info.Informacao) -> Fornecedor:
     if buscar_fornecedor(db, cnpj):
         raise ValueError(f"Fornecedor com CNPJ {cnpj} já existe.")
@@ -1,11 +1,14 @@
-from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey
 from sqlalchemy.orm import Session, validates
 from tabulate import tabulate
-from typing import Optional, Any, List
+from typing import Optional, Any, List, Iterable
 from datetime import date
 
 from pessoa import Pessoa
 import info as mod_info
+import busca_nomes as mod_busca
+import documentos as mod_documentos
+from paginacao import Pagina, paginar_consulta, TAMANHO_PAGINA
 
 class Funcionario(Pessoa):
     __tablename__ = 'funcionarios'
@@ -84,22 +87,26 @@ class Funcionario(Pessoa):
 # Funções de CRUD para Funcionario
 
 def buscar_funcionario_por_cpf(db: Session, cpf: str) -> Optional[Funcionario]:
-    try:
-        cpf_limpo = "".join(filter(str.isdigit, cpf))
-        cpf_formatado = f"{cpf_limpo[:3]}.{cpf_limpo[3:6]}.{cpf_limpo[6:9]}-{cpf_limpo[9:]}"
-    except IndexError: return None
-    return db.query(Funcionario).filter(Funcionario.cpf == cpf_formatado).first()
+    chave = mod_documentos.chave_documento(cpf, mod_documentos.TAMANHO_CPF)
+    if chave is None:
+        return None
+    return db.query(Funcionario).filter(Funcionario.cpf_numero == chave).first()
+
+def buscar_funcionarios_por_cpfs(db: Session, cpfs: Iterable[str]) -> dict[str, Funcionario]:
+    return mod_documentos.buscar_por_documentos(db, Funcionario, Funcionario.cpf_numero, cpfs, mod_documentos.TAMANHO_CPF)
 
 def buscar_funcionario_por_id(db: Session, id_func: int) -> Optional[Funcionario]:
     return db.query(Funcionario).filter(Funcionario.id == id_func).first()
 
-def buscar_funcionarios_por_nome(db: Session, nome_parcial: str) -> List[Funcionario]:
-    nome_lower = f"%{nome_parcial.lower().strip()}%"
-    return db.query(Funcionario).filter(func.lower(Funcionario.nome).like(nome_lower)).all()
+def buscar_funcionarios_por_nome(db: Session, nome_parcial: str, modo: str = 'infixo') -> List[Funcionario]:
+    return mod_busca.buscar_por_nome(db, Funcionario, nome_parcial, modo)
 
 def listar_funcionarios(db: Session) -> list[Funcionario]:
     return db.query(Funcionario).order_by(Funcionario.id).all()
 
+def paginar_funcionarios(db: Session, token: Optional[str] = None, tamanho_pagina: int = TAMANHO_PAGINA) -> Pagina:
+    return paginar_consulta(db.query(Funcionario), [Funcionario.id], token, tamanho_pagina)
+
 def criar_funcionario(db: Session, **kwargs) -> Funcionario:
     if buscar_funcionario_por_cpf(db, kwargs['cpf']):
         raise ValueError(f"Funcionário com CPF {kwargs['cpf']} já existe.")
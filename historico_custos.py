@@ -0,0 +1,130 @@
+from sqlalchemy import select, update, insert, func, extract, null
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import date
+from typing import Optional, Any
+
+from database import Base, historico_custos_tabela, dividir_em_lotes
+
+# Tipos de item que têm custo de compra registrado.
+TABELAS_COM_HISTORICO = ('produtos', 'suprimentos')
+TIPO_POR_TABELA = {'produtos': 'Produto', 'suprimentos': 'Suprimento'}
+
+ITENS_POR_PAGINA = 20
+
+def registrar_custo(db: Session, item_tipo: str, item_id: int, data_compra: date, quantidade: float, valor_unitario: float,
+                    fornecedor_id: Optional[int] = None, fornecedor_nome: Optional[str] = None, compra_id: Optional[int] = None) -> None:
+    db.execute(insert(historico_custos_tabela).values(
+        item_tipo=item_tipo, item_id=item_id, compra_id=compra_id,
+        fornecedor_id=fornecedor_id, fornecedor_nome=fornecedor_nome,
+        data_compra=data_compra, quantidade=quantidade, valor_unitario=valor_unitario
+    ))
+
+def _filtro_item(item_tipo: str, item_id: int):
+    return (historico_custos_tabela.c.item_tipo == item_tipo) & (historico_custos_tabela.c.item_id == item_id)
+
+def contar_historico(db: Session, item_tipo: str, item_id: int) -> int:
+    return db.execute(select(func.count()).select_from(historico_custos_tabela).where(_filtro_item(item_tipo, item_id))).scalar_one()
+
+def listar_historico(db: Session, item_tipo: str, item_id: int, pagina: int = 1, por_pagina: int = ITENS_POR_PAGINA,
+                     data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> list:
+    # Mais recentes primeiro; o índice (item_tipo, item_id, data_compra)
+    # atende o filtro e a ordenação.
+    consulta = select(historico_custos_tabela).where(_filtro_item(item_tipo, item_id))
+    if data_inicio:
+        consulta = consulta.where(historico_custos_tabela.c.data_compra >= data_inicio)
+    if data_fim:
+        consulta = consulta.where(historico_custos_tabela.c.data_compra <= data_fim)
+    consulta = consulta.order_by(historico_custos_tabela.c.data_compra.desc(), historico_custos_tabela.c.id.desc())
+    return db.execute(consulta.limit(por_pagina).offset((max(pagina, 1) - 1) * por_pagina)).fetchall()
+
+def ultimas_compras(db: Session, item_tipo: str, item_id: int, quantidade: int = 5) -> list:
+    return listar_historico(db, item_tipo, item_id, pagina=1, por_pagina=quantidade)
+
+def custo_medio_por_fornecedor(db: Session, item_tipo: str, item_id: int) -> list:
+    # Média ponderada pela quantidade comprada.
+    t = historico_custos_tabela
+    consulta = (
+        select(
+            t.c.fornecedor_id,
+            func.max(t.c.fornecedor_nome).label('fornecedor_nome'),
+            func.count().label('compras'),
+            func.sum(t.c.quantidade).label('quantidade_total'),
+            (func.sum(t.c.quantidade * t.c.valor_unitario) / func.sum(t.c.quantidade)).label('custo_medio'),
+            func.min(t.c.valor_unitario).label('custo_minimo'),
+            func.max(t.c.valor_unitario).label('custo_maximo'),
+        )
+        .where(_filtro_item(item_tipo, item_id))
+        .group_by(t.c.fornecedor_id)
+        .order_by(func.sum(t.c.quantidade * t.c.valor_unitario) / func.sum(t.c.quantidade))
+    )
+    return db.execute(consulta).fetchall()
+
+def custo_ao_longo_do_tempo(db: Session, item_tipo: str, item_id: int) -> list:
+    # Custo médio ponderado por mês (ano, mês, quantidade, custo_medio).
+    t = historico_custos_tabela
+    ano, mes = extract('year', t.c.data_compra).label('ano'), extract('month', t.c.data_compra).label('mes')
+    consulta = (
+        select(ano, mes, func.sum(t.c.quantidade).label('quantidade'),
+               (func.sum(t.c.quantidade * t.c.valor_unitario) / func.sum(t.c.quantidade)).label('custo_medio'))
+        .where(_filtro_item(item_tipo, item_id))
+        .group_by(ano, mes)
+        .order_by(ano, mes)
+    )
+    return db.execute(consulta).fetchall()
+
+def migrar_historico_json(db: Session) -> int:
+    # Copia as listas JSON historico_custo_compra de produtos e suprimentos
+    # para historico_custos, ligando cada registro à Compra correspondente
+    # quando ela existir, e zera a coluna JSON dos itens migrados. Tudo numa
+    # transação; itens já migrados (coluna nula) não são relidos.
+    compras = Base.metadata.tables['compras']
+    despesas = Base.metadata.tables['despesas']
+    total_migrado = 0
+
+    for nome_tabela in TABELAS_COM_HISTORICO:
+        tabela = Base.metadata.tables[nome_tabela]
+        item_tipo = TIPO_POR_TABELA[nome_tabela]
+        historicos = {
+            id_item: historico
+            for id_item, historico in db.execute(
+                select(tabela.c.id, tabela.c.historico_custo_compra).where(tabela.c.historico_custo_compra.isnot(None))
+            )
+        }
+        if not historicos:
+            continue
+
+        compras_candidatas: dict[tuple, list[int]] = defaultdict(list)
+        for lote in dividir_em_lotes(historicos):
+            consulta_compras = (
+                select(compras.c.id, compras.c.item_id, despesas.c.data_despesa, compras.c.quantidade,
+                       compras.c.valor_unitario, compras.c.fornecedor_id)
+                .join(despesas, despesas.c.id == compras.c.id)
+                .where(compras.c.item_tipo == item_tipo, compras.c.item_id.in_(lote))
+                .order_by(compras.c.id)
+            )
+            for linha in db.execute(consulta_compras):
+                chave = (linha.item_id, linha.data_despesa, linha.quantidade, linha.valor_unitario, linha.fornecedor_id)
+                compras_candidatas[chave].append(linha.id)
+
+        novas_linhas: list[dict[str, Any]] = []
+        for id_item, historico in historicos.items():
+            for registro in historico or []:
+                data_compra = date.fromisoformat(registro["data"])
+                chave = (id_item, data_compra, registro["quantidade"], registro["valor_unitario"], registro.get("fornecedor_id"))
+                candidatas = compras_candidatas.get(chave)
+                novas_linhas.append({
+                    'item_tipo': item_tipo, 'item_id': id_item,
+                    'compra_id': candidatas.pop(0) if candidatas else None,
+                    'fornecedor_id': registro.get("fornecedor_id"), 'fornecedor_nome': registro.get("fornecedor_nome"),
+                    'data_compra': data_compra, 'quantidade': registro["quantidade"], 'valor_unitario': registro["valor_unitario"],
+                })
+
+        if novas_linhas:
+            db.execute(insert(historico_custos_tabela), novas_linhas)
+        for lote in dividir_em_lotes(historicos):
+            db.execute(update(tabela).where(tabela.c.id.in_(lote)).values(historico_custo_compra=null()))
+        total_migrado += len(novas_linhas)
+
+    db.commit()
+    return total_migrado
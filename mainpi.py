@@ -1,7 +1,7 @@
 
 from sqlalchemy.orm import Session
 import sys, os
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from typing import Optional, Any, Callable, Union
 import tabulate
 
@@ -20,6 +20,15 @@ import suprimento as crud_suprimento
 import maquina as crud_maquina
 from maquina import StatusMaquina
 import despesa as crud_despesa
+import historico_custos as crud_historico
+import exportacao
+import exportacao_colunar
+import resumos_diarios
+import resultado_financeiro
+import movimentos_estoque
+import busca_nomes
+import documentos
+from paginacao import Pagina
 
 # --- Funções Auxiliares de UI e Sistema ---
 def limpar_tela(): os.system('cls' if os.name == 'nt' else 'clear')
@@ -28,10 +37,7 @@ def esperar_enter(): input("\nPressione Enter para continuar...")
 class InterrompidoPeloUsuario(Exception):
     pass
 
-def _exportar_relatorio(nome_base_arquivo: str, filtros_usados: dict, conteudo_relatorio: str):
-    timestamp = datetime.now().strftime('%d%m%Y%H%M%S')
-    nome_arquivo = f"{nome_base_arquivo}-{timestamp}.txt"
-
+def _montar_cabecalho_exportacao(filtros_usados: dict) -> str:
     cabecalho_filtro = ["Relatório Gerado em: " + datetime.now().strftime('%d/%m/%Y %H:%M:%S')]
     cabecalho_filtro.append("Filtros Aplicados:")
     if not filtros_usados:
@@ -40,36 +46,71 @@ def _exportar_relatorio(nome_base_arquivo: str, filtros_usados: dict, conteudo_r
         for chave, valor in filtros_usados.items():
             cabecalho_filtro.append(f"  - {chave}: {valor}")
     
-    cabecalho_texto = "\n".join(cabecalho_filtro)
-    
+    return "\n".join(cabecalho_filtro) + "\n" + "="*50 + "\n\n"
+
+def _exportar_relatorio(nome_base_arquivo: str, filtros_usados: dict, conteudo_relatorio: str):
+    timestamp = datetime.now().strftime('%d%m%Y%H%M%S')
+    nome_arquivo = f"{nome_base_arquivo}-{timestamp}.txt"
+
     try:
         with open(nome_arquivo, 'w', encoding='utf-8') as f:
-            f.write(cabecalho_texto)
-            f.write("\n" + "="*50 + "\n\n")
+            f.write(_montar_cabecalho_exportacao(filtros_usados))
             f.write(conteudo_relatorio)
         print(f"\nRelatório exportado com sucesso para o arquivo: {nome_arquivo}")
     except IOError as e:
         print(f"\nErro ao exportar relatório: {e}")
 
-def _tratar_saida_relatorio(db: Session, nome_modulo: str, dados_relatorio: list[Any], funcao_formatacao: Callable, filtros_usados: dict):
-    if not dados_relatorio:
+# Lê e grava o relatório em lotes direto no arquivo, sem montar o texto inteiro
+# em memória. Apenas o .txt leva o cabeçalho com os filtros.
+def _exportar_relatorio_em_fluxo(db: Session, nome_base_arquivo: str, filtros_usados: dict,
+                                 relatorio: exportacao.RelatorioEmFluxo, consulta: Any, formato: str):
+    timestamp = datetime.now().strftime('%d%m%Y%H%M%S')
+    nome_arquivo = f"{nome_base_arquivo}-{timestamp}.{formato}"
+
+    try:
+        with open(nome_arquivo, 'w', encoding='utf-8', newline='' if formato == 'csv' else None) as f:
+            if formato == 'txt':
+                f.write(_montar_cabecalho_exportacao(filtros_usados))
+            total_linhas = exportacao.escrever_relatorio_em_fluxo(db, relatorio, consulta, f, formato)
+        print(f"\n{total_linhas} registro(s) exportados com sucesso para o arquivo: {nome_arquivo}")
+    except IOError as e:
+        print(f"\nErro ao exportar relatório: {e}")
+
+def _exibir_paginas_ui(db: Session, primeira_pagina: Pagina, paginar: Callable[[Optional[str]], Pagina], funcao_formatacao: Callable):
+    pagina, numero = primeira_pagina, 1
+    while True:
+        print(f"\n--- Página {numero} ---")
+        print(funcao_formatacao(db, pagina.itens))
+        if not pagina.proximo_token or not solicitar_sim_nao("Ver a próxima página?"): break
+        pagina, numero = paginar(pagina.proximo_token), numero + 1
+
+def _tratar_saida_relatorio(db: Session, nome_modulo: str, dados_relatorio: Any, paginar: Callable[[Optional[str]], Pagina],
+                            funcao_formatacao: Callable, filtros_usados: dict, relatorio_em_fluxo: Optional[exportacao.RelatorioEmFluxo] = None):
+    # Com relatorio_em_fluxo, dados_relatorio é a consulta ainda não executada;
+    # sem ele, uma função que carrega a lista inteira, chamada só ao exportar.
+    # A tela mostra página a página: paginar(token) busca só a página pedida.
+    primeira_pagina = paginar(None)
+    if not primeira_pagina.itens:
         print("\nNenhum registro encontrado para os filtros selecionados.")
         return
 
-    conteudo = funcao_formatacao(db, dados_relatorio)
+    nome_base = nome_modulo.lower()
+    if nome_modulo == 'Despesas' and filtros_usados.get('Tipos'):
+        tipos_str = '-'.join(sorted(filtros_usados['Tipos']))
+        nome_base = tipos_str
 
+    opcoes = "1. Tela, 2. Exportar para .txt, 3. Exportar para .csv, 4. Exportar para .jsonl" if relatorio_em_fluxo else "1. Tela, 2. Exportar para .txt"
     while True:
-        escolha = solicitar_string("Como deseja ver o relatório? (1. Tela, 2. Exportar para .txt)")
+        escolha = solicitar_string(f"Como deseja ver o relatório? ({opcoes})")
         if escolha == '1':
-            print(conteudo)
+            _exibir_paginas_ui(db, primeira_pagina, paginar, funcao_formatacao)
             break
-        elif escolha == '2':
-            nome_base = nome_modulo.lower()
-            if nome_modulo == 'Despesas' and filtros_usados.get('Tipos'):
-                tipos_str = '-'.join(sorted(filtros_usados['Tipos']))
-                nome_base = tipos_str
-            
-            _exportar_relatorio(nome_base, filtros_usados, conteudo)
+        elif escolha == '2' and not relatorio_em_fluxo:
+            _exportar_relatorio(nome_base, filtros_usados, funcao_formatacao(db, dados_relatorio()))
+            break
+        elif relatorio_em_fluxo and escolha in ('2', '3', '4'):
+            formato = exportacao.FORMATOS_EXPORTACAO[int(escolha) - 2]
+            _exportar_relatorio_em_fluxo(db, nome_base, filtros_usados, relatorio_em_fluxo, dados_relatorio, formato)
             break
         else:
             print("Opção inválida. Tente novamente.")
@@ -256,6 +297,10 @@ def _selecionar_produto_ou_suprimento_ui(db: Session) -> Union[crud_produto.Prod
         else:
             print("Opção inválida. Tente novamente.")
 
+# Buscas por nome que aceitam modo='aproximado' (ver busca_nomes).
+_BUSCAS_POR_TRIGRAMAS = (crud_cliente.buscar_clientes_por_nome, crud_funcionario.buscar_funcionarios_por_nome,
+                         crud_fornecedor.buscar_fornecedores_por_nome)
+
 def _selecionar_entidade_ui(db: Session, nome_entidade: str, funcao_busca_id: Callable, funcao_busca_nome: Callable) -> Any:
     while True:
         metodo = solicitar_string(f"Buscar {nome_entidade} por (id/nome)?", min_len=2)
@@ -269,12 +314,17 @@ def _selecionar_entidade_ui(db: Session, nome_entidade: str, funcao_busca_id: Ca
         elif metodo.lower() == 'nome':
             nome_busca = solicitar_string(f"Digite o nome (ou parte do nome) do(a) {nome_entidade}")
             resultados = funcao_busca_nome(db, nome_busca)
+            if not resultados and funcao_busca_nome in _BUSCAS_POR_TRIGRAMAS:
+                resultados = funcao_busca_nome(db, nome_busca, modo='aproximado')
+                if resultados:
+                    print("Nenhum nome contém o texto digitado; mostrando os nomes mais parecidos.")
 
             if not resultados:
                 print("Nenhuma correspondência encontrada.")
                 continue
 
-            exatas = [r for r in resultados if r.nome.lower() == nome_busca.lower()]
+            chave_busca = busca_nomes.normalizar_nome(nome_busca)
+            exatas = [r for r in resultados if busca_nomes.normalizar_nome(r.nome) == chave_busca]
             if len(exatas) == 1:
                 print(f"--> {nome_entidade} selecionado(a) por nome exato: {exatas[0].nome}")
                 return exatas[0]
@@ -307,7 +357,9 @@ def _cadastrar_cliente_ui(db: Session):
     except InterrompidoPeloUsuario:
         print("\nCadastro cancelado.")
 
-def _listar_clientes_ui(db: Session): _tratar_saida_relatorio(db, 'Clientes', crud_cliente.listar_clientes(db), crud_cliente._formatar_clientes_para_tabela, {})
+def _listar_clientes_ui(db: Session):
+    _tratar_saida_relatorio(db, 'Clientes', lambda: crud_cliente.listar_clientes(db), lambda token: crud_cliente.paginar_clientes(db, token),
+                            crud_cliente._formatar_clientes_para_tabela, {})
 
 def _atualizar_cliente_ui(db: Session):
     try:
@@ -358,7 +410,9 @@ def _cadastrar_funcionario_ui(db: Session):
     except InterrompidoPeloUsuario:
         print("\nCadastro cancelado.")
 
-def _listar_funcionarios_ui(db: Session): _tratar_saida_relatorio(db, 'Funcionários', crud_funcionario.listar_funcionarios(db), crud_funcionario._formatar_funcionarios_para_tabela, {})
+def _listar_funcionarios_ui(db: Session):
+    _tratar_saida_relatorio(db, 'Funcionários', lambda: crud_funcionario.listar_funcionarios(db), lambda token: crud_funcionario.paginar_funcionarios(db, token),
+                            crud_funcionario._formatar_funcionarios_para_tabela, {})
 
 def _atualizar_funcionario_ui(db: Session):
     try:
@@ -399,7 +453,9 @@ def _cadastrar_produto_ui(db: Session):
     except InterrompidoPeloUsuario:
         print("\nCadastro cancelado.")
 
-def _listar_produtos_ui(db: Session): _tratar_saida_relatorio(db, 'Produtos', crud_produto.listar_produtos(db), crud_produto._formatar_produtos_para_tabela, {})
+def _listar_produtos_ui(db: Session):
+    _tratar_saida_relatorio(db, 'Produtos', lambda: crud_produto.listar_produtos(db), lambda token: crud_produto.paginar_produtos(db, token),
+                            crud_produto._formatar_produtos_para_tabela, {})
 
 def _atualizar_produto_ui(db: Session):
     try:
@@ -425,17 +481,59 @@ def _deletar_produto_ui(db: Session):
     except InterrompidoPeloUsuario:
         print("\nOperação cancelada.")
 
+def _exibir_historico_custos_ui(db: Session, item_tipo: str, item_obj: Any, funcao_formatacao: Callable):
+    print(f"\nExibindo histórico para: {item_obj.nome}")
+    total_paginas = -(-crud_historico.contar_historico(db, item_tipo, item_obj.id) // crud_historico.ITENS_POR_PAGINA)
+    pagina = 1
+    while True:
+        print(funcao_formatacao(db, item_obj.id, pagina))
+        if pagina >= total_paginas or not solicitar_sim_nao("Ver a próxima página?"): break
+        pagina += 1
+
+    resumo = crud_historico.custo_medio_por_fornecedor(db, item_tipo, item_obj.id)
+    if resumo:
+        print("\n--- Custo Médio por Fornecedor ---")
+        print(tabulate.tabulate(
+            [[r.fornecedor_nome or "N/A", r.compras, f"{r.quantidade_total:.2f}", f"R${r.custo_medio:.2f}",
+              f"R${r.custo_minimo:.2f}", f"R${r.custo_maximo:.2f}"] for r in resumo],
+            headers=["Fornecedor", "Compras", "Qtd. Total", "Custo Médio", "Mínimo", "Máximo"], tablefmt="grid"))
+
 def _ver_historico_compras_produto_ui(db: Session):
     print("--- Histórico de Compras de Produto ---")
     try:
         _listar_produtos_ui(db)
         produto_obj = _selecionar_objeto_ui(db, "Produto", crud_produto.buscar_produto_id)
-        
-        print(f"\nExibindo histórico para: {produto_obj.nome}")
-        historico = produto_obj.historico_custo_compra
-        tabela_historico = crud_produto._formatar_historico_para_tabela(historico)
-        print(tabela_historico)
+        _exibir_historico_custos_ui(db, 'Produto', produto_obj, crud_produto._formatar_historico_para_tabela)
+
+    except InterrompidoPeloUsuario:
+        print("\nOperação cancelada.")
 
+def _exibir_movimentos_estoque_ui(db: Session, item_tipo: str, item_obj: Any):
+    print(f"\nMovimentos de estoque de: {item_obj.nome} (saldo atual: {item_obj.estoque:.2f})")
+    total_registros = movimentos_estoque.contar_movimentos(db, item_tipo, item_obj.id)
+    if not total_registros:
+        print("Nenhum movimento de estoque registrado.")
+    total_paginas = -(-total_registros // movimentos_estoque.ITENS_POR_PAGINA)
+    pagina = 1
+    while total_registros:
+        print(tabulate.tabulate(
+            [[m.data.strftime("%d/%m/%Y"), m.tipo, f"{m.quantidade:+.2f}", m.referencia_id or "-"]
+             for m in movimentos_estoque.listar_movimentos(db, item_tipo, item_obj.id, pagina)],
+            headers=["Data", "Tipo", "Quantidade", "Referência"], tablefmt="grid"))
+        print(f"Página {pagina} de {total_paginas} ({total_registros} movimentos)")
+        if pagina >= total_paginas or not solicitar_sim_nao("Ver a próxima página?"): break
+        pagina += 1
+
+    if solicitar_sim_nao("Consultar o estoque em uma data?"):
+        data_consulta = solicitar_data("Data")
+        saldo = movimentos_estoque.saldo_em(db, item_tipo, item_obj.id, data_consulta)
+        print(f"Estoque em {data_consulta.strftime('%d/%m/%Y')}: {saldo:.2f}")
+
+def _movimentos_estoque_produto_ui(db: Session):
+    print("--- Movimentos de Estoque de Produto ---")
+    try:
+        produto_obj = _selecionar_entidade_ui(db, "Produto", crud_produto.buscar_produto_id, crud_produto.buscar_produto)
+        _exibir_movimentos_estoque_ui(db, 'Produto', produto_obj)
     except InterrompidoPeloUsuario:
         print("\nOperação cancelada.")
 
@@ -450,7 +548,9 @@ def _cadastrar_suprimento_ui(db: Session):
     except InterrompidoPeloUsuario:
         print("\nCadastro cancelado.")
 
-def _listar_suprimentos_ui(db: Session): _tratar_saida_relatorio(db, 'Suprimentos', crud_suprimento.listar_suprimentos(db), crud_suprimento._formatar_suprimentos_para_tabela, {})
+def _listar_suprimentos_ui(db: Session):
+    _tratar_saida_relatorio(db, 'Suprimentos', lambda: crud_suprimento.listar_suprimentos(db), lambda token: crud_suprimento.paginar_suprimentos(db, token),
+                            crud_suprimento._formatar_suprimentos_para_tabela, {})
 
 def _atualizar_suprimento_ui(db: Session):
     try:
@@ -483,12 +583,16 @@ def _ver_historico_compras_suprimento_ui(db: Session):
     try:
         _listar_suprimentos_ui(db)
         suprimento_obj = _selecionar_objeto_ui(db, "Suprimento", crud_suprimento.buscar_suprimento_id)
+        _exibir_historico_custos_ui(db, 'Suprimento', suprimento_obj, crud_suprimento._formatar_historico_para_tabela)
 
-        print(f"\nExibindo histórico para: {suprimento_obj.nome}")
-        historico = suprimento_obj.historico_custo_compra
-        tabela_historico = crud_suprimento._formatar_historico_para_tabela(historico)
-        print(tabela_historico)
+    except InterrompidoPeloUsuario:
+        print("\nOperação cancelada.")
 
+def _movimentos_estoque_suprimento_ui(db: Session):
+    print("--- Movimentos de Estoque de Suprimento ---")
+    try:
+        suprimento_obj = _selecionar_entidade_ui(db, "Suprimento", crud_suprimento.buscar_suprimento_id, crud_suprimento.buscar_suprimento_nome)
+        _exibir_movimentos_estoque_ui(db, 'Suprimento', suprimento_obj)
     except InterrompidoPeloUsuario:
         print("\nOperação cancelada.")
 
@@ -507,7 +611,9 @@ def _cadastrar_servico_ui(db: Session):
     except InterrompidoPeloUsuario:
         print("\nCadastro cancelado.")
 
-def _listar_servicos_ui(db: Session): _tratar_saida_relatorio(db, 'Serviços', crud_servico.listar_servicos(db), crud_servico._formatar_servicos_para_tabela, {})
+def _listar_servicos_ui(db: Session):
+    _tratar_saida_relatorio(db, 'Serviços', lambda: crud_servico.listar_servicos(db), lambda token: crud_servico.paginar_servicos(db, token),
+                            crud_servico._formatar_servicos_para_tabela, {})
 
 def _atualizar_servico_ui(db: Session):
     try:
@@ -548,7 +654,9 @@ def _cadastrar_fornecedor_ui(db: Session):
     except InterrompidoPeloUsuario:
         print("\nCadastro cancelado.")
 
-def _listar_fornecedores_ui(db: Session): _tratar_saida_relatorio(db, 'Fornecedores', crud_fornecedor.listar_fornecedores(db), crud_fornecedor._formatar_fornecedores_para_tabela, {})
+def _listar_fornecedores_ui(db: Session):
+    _tratar_saida_relatorio(db, 'Fornecedores', lambda: crud_fornecedor.listar_fornecedores(db), lambda token: crud_fornecedor.paginar_fornecedores(db, token),
+                            crud_fornecedor._formatar_fornecedores_para_tabela, {})
 
 def _atualizar_fornecedor_ui(db: Session):
     try:
@@ -591,7 +699,9 @@ def _cadastrar_maquina_ui(db: Session):
     except InterrompidoPeloUsuario:
         print("\nCadastro cancelado.")
 
-def _listar_maquinas_ui(db: Session): _tratar_saida_relatorio(db, 'Máquinas', crud_maquina.listar_maquinas(db), crud_maquina._formatar_maquinas_para_tabela, {})
+def _listar_maquinas_ui(db: Session):
+    _tratar_saida_relatorio(db, 'Máquinas', lambda: crud_maquina.listar_maquinas(db), lambda token: crud_maquina.paginar_maquinas(db, token),
+                            crud_maquina._formatar_maquinas_para_tabela, {})
 
 def _atualizar_maquina_ui(db: Session):
     try:
@@ -632,8 +742,16 @@ def _cadastrar_agenda_ui(db: Session):
         while True:
             inicio_obj = solicitar_data_hora("Data/Hora de Início")
             fim_obj = solicitar_data_hora("Data/Hora de Fim")
-            if fim_obj > inicio_obj: break
-            print("Erro: A data/hora de fim deve ser posterior à de início.")
+            if fim_obj <= inicio_obj:
+                print("Erro: A data/hora de fim deve ser posterior à de início.")
+                continue
+            if not crud_agenda.verificar_conflito_funcionario(db, func.id, inicio_obj, fim_obj): break
+            print(f"Erro: '{func.nome}' já possui agenda neste horário.")
+            sugestoes = crud_agenda.buscar_horarios_livres_funcionario(
+                db, func.id, inicio_obj, inicio_obj + timedelta(days=7), fim_obj - inicio_obj,
+                expediente=crud_agenda.EXPEDIENTE_PADRAO)
+            if sugestoes:
+                print("Próximos horários livres: " + ", ".join(h.strftime('%d/%m/%Y %H:%M') for h in sugestoes))
 
         itens_agendados, maquinas_agendadas, suprimentos_utilizados = [], [], []
 
@@ -650,6 +768,8 @@ def _cadastrar_agenda_ui(db: Session):
             print("\n--- Máquinas Disponíveis (Operando ou em Manutenção) ---")
             maquinas_disponiveis = [m for m in crud_maquina.listar_maquinas(db) if m.status != StatusMaquina.BAIXADO]
             print(crud_maquina._formatar_maquinas_para_tabela(db, maquinas_disponiveis))
+            ids_livres = crud_agenda.listar_maquinas_livres(db, [m.id for m in maquinas_disponiveis], inicio_obj, fim_obj)
+            print(f"Livres no horário solicitado (IDs): {', '.join(map(str, ids_livres)) or 'nenhuma'}")
             maquina_sel = _selecionar_objeto_ui(db, "Máquina", crud_maquina.buscar_maquina_id)
             if crud_agenda.verificar_conflito_maquina(db, maquina_sel.id, inicio_obj, fim_obj):
                 print(f"Erro: A máquina '{maquina_sel.nome}' já está em uso no horário solicitado.")
@@ -658,16 +778,19 @@ def _cadastrar_agenda_ui(db: Session):
                 print(f"Máquina '{maquina_sel.nome}' adicionada.")
 
         while solicitar_sim_nao("Vincular suprimento a esta agenda?"):
-            print("\n--- Suprimentos Disponíveis ---")
-            _listar_suprimentos_ui(db)
+            print("\n--- Suprimentos Disponíveis (estoque menos o reservado por agendas em aberto) ---")
+            print(crud_agenda._formatar_disponibilidade_suprimentos(db, crud_suprimento.listar_suprimentos(db)))
             suprimento_sel = _selecionar_objeto_ui(db, "Suprimento", crud_suprimento.buscar_suprimento_id)
+            # O disponível desconta o que esta agenda já separou do mesmo suprimento.
+            disponivel = crud_agenda.suprimentos_disponiveis(db, [suprimento_sel.id]).get(suprimento_sel.id, 0.0) - sum(
+                sup_ag.quantidade for sup_ag in suprimentos_utilizados if sup_ag.suprimento.id == suprimento_sel.id)
             while True:
                 qtd_sup = solicitar_float(f"Quantidade de '{suprimento_sel.nome}' necessária")
-                if qtd_sup <= suprimento_sel.estoque:
+                if qtd_sup <= disponivel:
                     suprimentos_utilizados.append(crud_agenda.SuprimentoAgendado(suprimento_sel, qtd_sup))
                     print(f"Suprimento '{suprimento_sel.nome}' adicionado.")
                     break
-                print(f"Erro: Estoque insuficiente. Disponível: {suprimento_sel.estoque:.2f} {suprimento_sel.unidade_medida}.")
+                print(f"Erro: Estoque insuficiente. Disponível: {max(disponivel, 0.0):.2f} {suprimento_sel.unidade_medida}.")
 
         if not itens_agendados:
             print("Uma agenda precisa de pelo menos um serviço ou produto. Operação cancelada.")
@@ -698,8 +821,9 @@ def _listar_agendas_ui(db: Session):
         print("\nFiltros cancelados. Listando todos os registros.")
         filtros = {}
 
-    agendas = crud_agenda.listar_agendas(db, **filtros)
-    _tratar_saida_relatorio(db, 'Agendas', agendas, crud_agenda._formatar_agendas_para_tabela, filtros)
+    consulta_agendas = crud_agenda.consultar_agendas(db, **filtros)
+    _tratar_saida_relatorio(db, 'Agendas', consulta_agendas, lambda token: crud_agenda.paginar_agendas(db, **filtros, token=token),
+                            crud_agenda._formatar_agendas_para_tabela, filtros, crud_agenda.RELATORIO_AGENDAS)
 
 def _atualizar_agenda_ui(db: Session):
     try:
@@ -717,6 +841,10 @@ def _atualizar_agenda_ui(db: Session):
             fim_atual = obj.data_hora_fim.strftime('%d/%m/%Y %H:%M')
             alteracoes['data_hora_fim'] = solicitar_data_hora(f"Novo Fim (atual: {fim_atual})")
             mudancas_realizadas = True
+        if obj.status == crud_agenda.AgendaStatus.AGENDADO and solicitar_sim_nao("Marcar como Não Realizada (libera os suprimentos reservados)?"):
+            alteracoes['status'] = crud_agenda.AgendaStatus.NAO_REALIZADO
+        elif obj.status == crud_agenda.AgendaStatus.NAO_REALIZADO and solicitar_sim_nao("Reabrir a agenda (reserva os suprimentos de novo)?"):
+            alteracoes['status'] = crud_agenda.AgendaStatus.AGENDADO
         if solicitar_sim_nao("Modificar itens da agenda?"):
             mudancas_realizadas = True
             while True:
@@ -834,8 +962,33 @@ def _listar_vendas_ui(db: Session):
         print("\nFiltros cancelados. Listando todos os registros.")
         filtros = {}
     
-    vendas = crud_venda.listar_vendas(db, **kwargs_query)
-    _tratar_saida_relatorio(db, 'Vendas', vendas, crud_venda._formatar_vendas_para_tabela, filtros)
+    consulta_vendas = crud_venda.consultar_vendas(db, **kwargs_query)
+    _tratar_saida_relatorio(db, 'Vendas', consulta_vendas, lambda token: crud_venda.paginar_vendas(db, **kwargs_query, token=token),
+                            crud_venda._formatar_vendas_para_tabela, filtros, crud_venda.RELATORIO_VENDAS)
+
+def _solicitar_periodo_resumo() -> tuple[Optional[date], Optional[date]]:
+    if solicitar_sim_nao("Filtrar por período?"):
+        return solicitar_data("Data de início"), solicitar_data("Data de fim")
+    return None, None
+
+def _resumo_vendas_ui(db: Session):
+    try:
+        data_inicio, data_fim = _solicitar_periodo_resumo()
+    except InterrompidoPeloUsuario:
+        print("\nResumo cancelado."); return
+
+    totais = resumos_diarios.resumir_vendas(db, data_inicio, data_fim)
+    print(f"Vendas no período: {int(totais['vendas'])}")
+    print(crud_venda._montar_resumo_vendas(totais))
+
+    por_funcionario = resumos_diarios.totais_vendas_por_funcionario(db, data_inicio, data_fim)
+    if por_funcionario:
+        nomes = crud_venda._buscar_nomes_pessoas(db, (linha.funcionario_id for linha in por_funcionario))
+        print("\n--- Por Funcionário ---")
+        print(tabulate.tabulate(
+            [[nomes.get(linha.funcionario_id, f"ID {linha.funcionario_id}"), int(linha.vendas), f"R${linha.produtos:.2f}",
+              f"R${linha.servicos:.2f}", f"R${linha.geral:.2f}"] for linha in por_funcionario],
+            headers=["Funcionário", "Vendas", "Produtos", "Serviços", "Total"], tablefmt="grid"))
 
 
 def _atualizar_venda_ui(db: Session):
@@ -864,7 +1017,8 @@ def _deletar_venda_ui(db: Session):
         print("\nOperação cancelada.")
 
 def _cadastrar_despesa_ui(db: Session):
-    opcoes = {"1": "Compra", "2": "Fixa/Terceiro", "3": "Salário", "4": "Comissão", "5": "Outros"}
+    opcoes = {"1": "Compra", "2": "Fixa/Terceiro", "3": "Salário", "4": "Comissão", "5": "Outros", "6": "Comissões do Período (todos os funcionários)",
+              "7": "Folha de Pagamento (funcionários ativos)"}
     try:
         print("--- Registrar Nova Despesa ---")
         for k, v in opcoes.items(): print(f"{k}. {v}")
@@ -902,8 +1056,14 @@ def _cadastrar_despesa_ui(db: Session):
             _executar_crud(crud_despesa.criar_salario, db, funcionario_obj=func, salario_bruto=bruto, descontos=descontos, data_despesa_obj=data_obj)
         elif tipo == "4":
             func = _selecionar_entidade_ui(db, "Funcionário", crud_funcionario.buscar_funcionario_por_id, crud_funcionario.buscar_funcionarios_por_nome)
-            servicos = solicitar_float("Soma Serviços")
-            produtos = solicitar_float("Soma Produtos")
+            if solicitar_sim_nao("Calcular as somas a partir das vendas de um período?"):
+                inicio_periodo = solicitar_data("Início do período")
+                fim_periodo = solicitar_data("Fim do período")
+                servicos, produtos = crud_despesa.calcular_comissao(db, func, inicio_periodo, fim_periodo)
+                print(f"Soma Serviços: R${servicos:.2f} | Soma Produtos: R${produtos:.2f}")
+            else:
+                servicos = solicitar_float("Soma Serviços")
+                produtos = solicitar_float("Soma Produtos")
             taxa_s_perc = solicitar_float("Taxa de comissão de Serviços (%)", 0)
             taxa_p_perc = solicitar_float("Taxa de comissão de Produtos (%)", 0)
             taxa_s = taxa_s_perc / 100.0
@@ -915,6 +1075,32 @@ def _cadastrar_despesa_ui(db: Session):
             vlr = solicitar_float("Valor", 0.01)
             data_obj = solicitar_data("Data")
             _executar_crud(crud_despesa.criar_outros, db, valor=vlr, tipo_despesa_str=desc, data_despesa_obj=data_obj)
+        elif tipo == "6":
+            inicio_periodo = solicitar_data("Início do período")
+            fim_periodo = solicitar_data("Fim do período")
+            taxa_s = solicitar_float("Taxa de comissão de Serviços (%)", 0) / 100.0
+            taxa_p = solicitar_float("Taxa de comissão de Produtos (%)", 0) / 100.0
+            data_obj = solicitar_data("Data de lançamento")
+            try:
+                geradas = crud_despesa.gerar_comissoes_em_lote(db, inicio_periodo, fim_periodo, taxa_s, taxa_p, data_obj)
+                print(f"\n{geradas} comissão(ões) lançada(s).")
+            except Exception as e:
+                db.rollback()
+                print(f"\nErro na operação: {e}")
+        elif tipo == "7":
+            inicio_periodo = solicitar_data("Início do período")
+            fim_periodo = solicitar_data("Fim do período")
+            percentual = solicitar_float("Descontos (% do bruto)", 0, 100) / 100.0
+            data_obj = solicitar_data("Data de pagamento")
+            parametros = dict(data_pagamento=data_obj, calcular_descontos=lambda bruto: bruto * percentual)
+            try:
+                previa = crud_despesa.gerar_folha_pagamento(db, inicio_periodo, fim_periodo, simular=True, **parametros)
+                print(f"\n{previa}")
+                if previa.salarios and solicitar_sim_nao("Lançar a folha?"):
+                    print(crud_despesa.gerar_folha_pagamento(db, inicio_periodo, fim_periodo, **parametros))
+            except Exception as e:
+                db.rollback()
+                print(f"\nErro na operação: {e}")
     except InterrompidoPeloUsuario:
         print("\nOperação cancelada.")
 
@@ -961,8 +1147,22 @@ def _listar_despesas_ui(db: Session):
         print("\nFiltros cancelados. Listando todos os registros.")
         filtros = {}
 
-    despesas = crud_despesa.listar_despesas(db, **kwargs_query)
-    _tratar_saida_relatorio(db, 'Despesas', despesas, crud_despesa._formatar_despesas_para_tabela, filtros)
+    consulta_despesas = crud_despesa.consultar_despesas(db, **kwargs_query)
+    _tratar_saida_relatorio(db, 'Despesas', consulta_despesas, lambda token: crud_despesa.paginar_despesas(db, **kwargs_query, token=token),
+                            crud_despesa._formatar_despesas_para_tabela, filtros, crud_despesa.RELATORIO_DESPESAS)
+
+def _resumo_despesas_ui(db: Session):
+    try:
+        data_inicio, data_fim = _solicitar_periodo_resumo()
+    except InterrompidoPeloUsuario:
+        print("\nResumo cancelado."); return
+
+    por_tipo = resumos_diarios.totais_despesas_por_tipo(db, data_inicio, data_fim)
+    if por_tipo:
+        print(tabulate.tabulate(
+            [[linha.tipo.replace('_', ' ').title(), int(linha.quantidade), f"R${linha.valor:.2f}"] for linha in por_tipo],
+            headers=["Tipo", "Quantidade", "Valor"], tablefmt="grid"))
+    print(crud_despesa._montar_resumo_despesas(resumos_diarios.resumir_despesas(db, data_inicio, data_fim)))
 
 
 def _atualizar_despesa_ui(db: Session):
@@ -1013,21 +1213,125 @@ def _deletar_despesa_ui(db: Session):
     except InterrompidoPeloUsuario:
         print("\nOperação cancelada.")
 
+def _exibir_diagnostico_ui(db: Session):
+    print("--- Diagnóstico ---")
+    print(f"Banco: {database.engine.url.render_as_string(hide_password=True)}")
+    metricas = database.obter_metricas_pool()
+    linhas = [[nome, f"{valor:.2f}" if isinstance(valor, float) else valor] for nome, valor in metricas.items()]
+    print(tabulate.tabulate(linhas, headers=["Métrica", "Valor"], tablefmt="grid"))
+
+    faltas = crud_venda.listar_faltas_suprimentos(db, data_inicio=date.today() - timedelta(days=30))
+    if faltas:
+        nomes_suprimentos = {sup.id: sup.nome for sup in crud_suprimento.listar_suprimentos(db)}
+        print(f"\n{len(faltas)} suprimento(s) consumido(s) abaixo do previsto nas vendas dos últimos 30 dias:")
+        print(tabulate.tabulate(
+            [[f.data.strftime("%d/%m/%Y"), f.venda_id, f.agenda_id, nomes_suprimentos.get(f.suprimento_id, f"ID {f.suprimento_id}"),
+              f"{f.quantidade_prevista:.2f}", f"{f.quantidade_faltante:.2f}"] for f in faltas],
+            headers=["Data", "Venda", "Agenda", "Suprimento", "Previsto", "Faltou"], tablefmt="grid"))
+
+    divergencias = crud_agenda.verificar_totais_agendas(db)
+    if not divergencias:
+        print("\nTotais das agendas consistentes com seus itens.")
+        return
+    print(f"\n{len(divergencias)} agenda(s) com valor total divergente dos itens:")
+    print(tabulate.tabulate([[id_agenda, f"R${armazenado:.2f}", f"R${calculado:.2f}"] for id_agenda, armazenado, calculado in divergencias],
+                            headers=["ID", "Armazenado", "Calculado"], tablefmt="grid"))
+    try:
+        if solicitar_sim_nao("Corrigir os totais divergentes?"):
+            crud_agenda.verificar_totais_agendas(db, corrigir=True)
+            print("Totais corrigidos.")
+    except InterrompidoPeloUsuario:
+        print("\nCorreção cancelada.")
+
+def _exportacao_analitica_ui(db: Session):
+    print("--- Exportação Analítica (colunar) ---")
+    formato = "Parquet" if exportacao_colunar.pa else "JSON colunar (.json.gz)"
+    print(f"Tabelas: {', '.join(exportacao_colunar.TABELAS_EXPORTACAO_COLUNAR)} | Formato: {formato}")
+    try:
+        data_inicio = data_fim = None
+        if solicitar_sim_nao("Filtrar por período?"):
+            data_inicio = solicitar_data("Data de início")
+            data_fim = solicitar_data("Data de fim")
+        destino = f"exportacao-{datetime.now().strftime('%d%m%Y%H%M%S')}"
+        resultado = exportacao_colunar.exportar_colunar(db, destino, data_inicio=data_inicio, data_fim=data_fim)
+    except InterrompidoPeloUsuario:
+        print("\nExportação cancelada.")
+        return
+    except OSError as e:
+        print(f"\nErro ao exportar: {e}")
+        return
+    linhas = [[nome_tabela, totais['linhas'], totais['arquivos']] for nome_tabela, totais in resultado.items()]
+    print(tabulate.tabulate(linhas, headers=["Tabela", "Registros", "Arquivos"], tablefmt="grid"))
+    print(f"\nArquivos gravados em: {destino}")
+
+def _demonstrativo_resultado_ui(db: Session):
+    print("--- Demonstrativo de Resultado ---")
+    try:
+        opcoes_periodicidade = {"1": "dia", "2": "semana", "3": "mes"}
+        while True:
+            escolha = solicitar_string("Agrupar por (1. Dia, 2. Semana, 3. Mês)")
+            if escolha in opcoes_periodicidade: break
+            print("Opção inválida.")
+        data_inicio = solicitar_data("Data de início")
+        data_fim = solicitar_data("Data de fim")
+        por_funcionario = solicitar_sim_nao("Detalhar por funcionário?")
+        linhas = resultado_financeiro.gerar_resultado(db, data_inicio, data_fim, opcoes_periodicidade[escolha], por_funcionario)
+    except InterrompidoPeloUsuario:
+        print("\nRelatório cancelado."); return
+    except ValueError as e:
+        print(f"\nErro: {e}"); return
+
+    nomes = crud_venda._buscar_nomes_pessoas(db, (l.funcionario_id for l in linhas if l.funcionario_id)) if por_funcionario else {}
+    dados_tabela = []
+    for l in linhas:
+        periodo = l.inicio.strftime('%d/%m/%Y') if l.inicio == l.fim else f"{l.inicio.strftime('%d/%m/%Y')} a {l.fim.strftime('%d/%m/%Y')}"
+        despesas_str = "\n".join(f"{tipo.replace('_', ' ').title()}: R${valor:.2f}" for tipo, valor in sorted(l.despesas.items())) or "-"
+        coluna_funcionario = [nomes.get(l.funcionario_id, f"ID {l.funcionario_id}")] if por_funcionario else []
+        dados_tabela.append([periodo] + coluna_funcionario + [
+            l.vendas, f"R${l.receita:.2f}", f"R${l.custo_mercadorias:.2f}", f"R${l.lucro_bruto:.2f}",
+            despesas_str, f"R${l.resultado_liquido:.2f}", f"{l.margem_liquida:.1%}"
+        ])
+    cabecalhos = ["Período"] + (["Funcionário"] if por_funcionario else []) + \
+                 ["Vendas", "Receita", "Custo Mercadorias", "Lucro Bruto", "Despesas", "Resultado", "Margem"]
+    print(tabulate.tabulate(dados_tabela, headers=cabecalhos, tablefmt="grid") if dados_tabela else "Nenhum resultado no período.")
+
 def main():
     database.criar_banco()
+    with database.SessionLocal() as db:
+        registros_migrados = crud_historico.migrar_historico_json(db)
+    if registros_migrados:
+        print(f"{registros_migrados} registro(s) de custo migrados para o histórico de compras.")
+    with database.SessionLocal() as db:
+        if resumos_diarios.inicializar_resumos(db):
+            print("Resumos diários de vendas e despesas gerados a partir dos registros existentes.")
+    with database.SessionLocal() as db:
+        if movimentos_estoque.inicializar_movimentos(db):
+            print("Estoque atual registrado como saldo de abertura do razão de estoque.")
+    with database.SessionLocal() as db:
+        nomes_indexados = busca_nomes.inicializar_busca_nomes(db, [mod_pessoa.Pessoa, crud_fornecedor.Fornecedor])
+    if nomes_indexados:
+        print(f"{nomes_indexados} nome(s) indexados para a busca por nome.")
+    with database.SessionLocal() as db:
+        for modelo in (crud_produto.Produto, crud_servico.Servico, crud_suprimento.Suprimento):
+            _, conflitos = busca_nomes.preencher_chaves_unicas(db, modelo)
+            for nome in conflitos:
+                print(f"Aviso: '{nome}' ({modelo.__tablename__}) repete outro nome sem maiúsculas/acentos; renomeie-o para que seja encontrado pelo nome.")
+    with database.SessionLocal() as db:
+        documentos.preencher_chaves_documento(db, mod_pessoa.Pessoa, 'cpf', 'cpf_numero')
+        documentos.preencher_chaves_documento(db, crud_fornecedor.Fornecedor, 'cnpj', 'cnpj_numero')
     menu_principal = {
         "1": "Agendas", "2": "Vendas", "3": "Despesas", "4": "Clientes",
         "5": "Produtos", "6": "Suprimentos", "7": "Fornecedores", "8": "Máquinas",
         "9": "Serviços", "10": "Funcionários"
     }
-    opcoes_submenu_texto = {"1": "Cadastrar", "2": "Listar", "3": "Atualizar", "4": "Deletar", "5": "Ver Histórico de Compras"}
+    opcoes_submenu_texto = {"1": "Cadastrar", "2": "Listar", "3": "Atualizar", "4": "Deletar", "5": "Ver Histórico de Compras", "6": "Resumo do Período", "7": "Movimentos de Estoque"}
     submenus = {
         "1": {"1": _cadastrar_agenda_ui, "2": _listar_agendas_ui, "3": _atualizar_agenda_ui, "4": _deletar_agenda_ui},
-        "2": {"1": _cadastrar_venda_ui, "2": _listar_vendas_ui, "3": _atualizar_venda_ui, "4": _deletar_venda_ui},
-        "3": {"1": _cadastrar_despesa_ui, "2": _listar_despesas_ui, "3": _atualizar_despesa_ui, "4": _deletar_despesa_ui},
+        "2": {"1": _cadastrar_venda_ui, "2": _listar_vendas_ui, "3": _atualizar_venda_ui, "4": _deletar_venda_ui, "6": _resumo_vendas_ui},
+        "3": {"1": _cadastrar_despesa_ui, "2": _listar_despesas_ui, "3": _atualizar_despesa_ui, "4": _deletar_despesa_ui, "6": _resumo_despesas_ui},
         "4": {"1": _cadastrar_cliente_ui, "2": _listar_clientes_ui, "3": _atualizar_cliente_ui, "4": _deletar_cliente_ui},
-        "5": {"1": _cadastrar_produto_ui, "2": _listar_produtos_ui, "3": _atualizar_produto_ui, "4": _deletar_produto_ui, "5": _ver_historico_compras_produto_ui},
-        "6": {"1": _cadastrar_suprimento_ui, "2": _listar_suprimentos_ui, "3": _atualizar_suprimento_ui, "4": _deletar_suprimento_ui, "5": _ver_historico_compras_suprimento_ui},
+        "5": {"1": _cadastrar_produto_ui, "2": _listar_produtos_ui, "3": _atualizar_produto_ui, "4": _deletar_produto_ui, "5": _ver_historico_compras_produto_ui, "7": _movimentos_estoque_produto_ui},
+        "6": {"1": _cadastrar_suprimento_ui, "2": _listar_suprimentos_ui, "3": _atualizar_suprimento_ui, "4": _deletar_suprimento_ui, "5": _ver_historico_compras_suprimento_ui, "7": _movimentos_estoque_suprimento_ui},
         "7": {"1": _cadastrar_fornecedor_ui, "2": _listar_fornecedores_ui, "3": _atualizar_fornecedor_ui, "4": _deletar_fornecedor_ui},
         "8": {"1": _cadastrar_maquina_ui, "2": _listar_maquinas_ui, "3": _atualizar_maquina_ui, "4": _deletar_maquina_ui},
         "9": {"1": _cadastrar_servico_ui, "2": _listar_servicos_ui, "3": _atualizar_servico_ui, "4": _deletar_servico_ui},
@@ -1037,10 +1341,37 @@ def main():
     while True:
         limpar_tela(); print("--- Sistema de Gestão ---")
         for k, v in menu_principal.items(): print(f"{k}. Gerenciar {v}")
+        print("D. Diagnóstico")
+        print("E. Exportação analítica")
+        print("R. Demonstrativo de Resultado")
         print("0. Sair")
         try:
             escolha_menu = solicitar_string("Escolha um módulo", min_len=1)
             if escolha_menu == '0': sys.exit("\nSaindo...")
+            if escolha_menu.upper() == 'D':
+                db = database.SessionLocal()
+                try:
+                    limpar_tela(); _exibir_diagnostico_ui(db)
+                finally:
+                    db.close()
+                esperar_enter()
+                continue
+            if escolha_menu.upper() == 'E':
+                db = database.SessionLocal()
+                try:
+                    limpar_tela(); _exportacao_analitica_ui(db)
+                finally:
+                    db.close()
+                esperar_enter()
+                continue
+            if escolha_menu.upper() == 'R':
+                db = database.SessionLocal()
+                try:
+                    limpar_tela(); _demonstrativo_resultado_ui(db)
+                finally:
+                    db.close()
+                esperar_enter()
+                continue
 
             if escolha_menu in submenus:
                 submenu_atual = submenus[escolha_menu]
@@ -5,6 +5,7 @@ from typing import Optional, Any
 from enum import Enum as PyEnum
 
 from database import Base
+from paginacao import Pagina, paginar_consulta, TAMANHO_PAGINA
 
 class StatusMaquina(PyEnum):
     OPERANDO = "Operando"
@@ -60,6 +61,9 @@ def buscar_maquina_serie(db: Session, numero_serie: str) -> Optional[Maquina]:
 def listar_maquinas(db: Session) -> list[Maquina]:
     return db.query(Maquina).order_by(Maquina.id).all()
 
+def paginar_maquinas(db: Session, token: Optional[str] = None, tamanho_pagina: int = TAMANHO_PAGINA) -> Pagina:
+    return paginar_consulta(db.query(Maquina), [Maquina.id], token, tamanho_pagina)
+
 def criar_maquina(db: Session, nome: str, numero_serie: str, custo_aquisicao: float, status: StatusMaquina) -> Maquina:
     if buscar_maquina_serie(db, numero_serie):
         raise ValueError(f"Máquina com número de série '{numero_serie}' já existe.")
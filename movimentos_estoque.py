@@ -0,0 +1,245 @@
+from sqlalchemy import Select, select, insert, update, func, exists, bindparam
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional, Iterable
+
+from database import Base, movimentos_estoque_tabela, saldos_estoque_tabela, dividir_em_lotes
+
+# Razão de estoque: toda alteração do estoque de um produto ou suprimento
+# grava um movimento com o motivo. A coluna estoque do item continua sendo o
+# saldo atual (leitura O(1)); o razão responde "qual era o estoque no dia D"
+# a partir da fotografia mais próxima mais os movimentos entre ela e D. As
+# fotografias são do fim de cada mês e não são apagadas: um movimento com data
+# retroativa soma a sua quantidade nas fotografias a partir da data dele.
+# Invariante: estoque do item == soma dos seus movimentos.
+
+TIPOS_MOVIMENTO = ('venda', 'compra', 'estorno', 'consumo_agenda', 'ajuste')
+TABELA_POR_TIPO_ITEM = {'Produto': 'produtos', 'Suprimento': 'suprimentos'}
+
+ITENS_POR_PAGINA = 20
+
+def registrar_movimentos(db: Session, tipo: str, movimentos: Iterable[tuple[str, int, float, date, Optional[int]]]) -> None:
+    # movimentos: (item_tipo, item_id, quantidade com sinal, data, referencia_id).
+    if tipo not in TIPOS_MOVIMENTO:
+        raise ValueError(f"Tipo de movimento '{tipo}' inválido. Use um dos: {list(TIPOS_MOVIMENTO)}")
+    registrado_em = datetime.now()
+    linhas = [
+        {'item_tipo': item_tipo, 'item_id': item_id, 'tipo': tipo, 'quantidade': quantidade,
+         'data': data, 'referencia_id': referencia_id, 'registrado_em': registrado_em}
+        for item_tipo, item_id, quantidade, data, referencia_id in movimentos if quantidade
+    ]
+    if not linhas:
+        return
+    db.execute(insert(movimentos_estoque_tabela), linhas)
+    ajustar_fotografias(db, [(linha['item_tipo'], linha['item_id'], linha['quantidade'], linha['data']) for linha in linhas])
+
+def registrar_ajuste(db: Session, item_tipo: str, item_id: int, quantidade: float, data: Optional[date] = None) -> None:
+    registrar_movimentos(db, 'ajuste', [(item_tipo, item_id, quantidade, data or date.today(), None)])
+
+def ajustar_fotografias(db: Session, movimentos: Iterable[tuple[str, int, float, date]]) -> None:
+    # movimentos: (item_tipo, item_id, quantidade com sinal, data). Um
+    # movimento no dia D muda o saldo de todas as fotografias a partir de D;
+    # a quantidade é somada nelas (ou estornada, com o sinal trocado) em vez
+    # de apagá-las. Itens sem linha numa fotografia (cadastrados depois dela)
+    # ganham a linha com o próprio delta.
+    movimentos = list(movimentos)
+    if not movimentos:
+        return
+    t = saldos_estoque_tabela
+    datas_fotografias = db.execute(
+        select(t.c.data).where(t.c.data >= min(data for _, _, _, data in movimentos)).distinct()
+    ).scalars().all()
+    if not datas_fotografias:
+        return
+    deltas: dict[tuple[date, str, int], float] = defaultdict(float)
+    for item_tipo, item_id, quantidade, data in movimentos:
+        for data_fotografia in datas_fotografias:
+            if data_fotografia >= data:
+                deltas[(data_fotografia, item_tipo, item_id)] += quantidade
+    existentes: set[tuple[date, str, int]] = set()
+    for lote in dividir_em_lotes({item_id for _, item_id, _, _ in movimentos}):
+        existentes.update(db.execute(
+            select(t.c.data, t.c.item_tipo, t.c.item_id).where(t.c.data.in_(datas_fotografias), t.c.item_id.in_(lote))
+        ).all())
+    atualizar = [{'b_data': data, 'b_tipo': item_tipo, 'b_id': item_id, 'b_delta': delta}
+                 for (data, item_tipo, item_id), delta in deltas.items() if (data, item_tipo, item_id) in existentes]
+    if atualizar:
+        db.execute(
+            update(t).where(t.c.data == bindparam('b_data'), t.c.item_tipo == bindparam('b_tipo'), t.c.item_id == bindparam('b_id'))
+            .values(saldo=t.c.saldo + bindparam('b_delta')),
+            atualizar
+        )
+    novas = [{'data': data, 'item_tipo': item_tipo, 'item_id': item_id, 'saldo': delta}
+             for (data, item_tipo, item_id), delta in deltas.items() if (data, item_tipo, item_id) not in existentes]
+    if novas:
+        db.execute(insert(t), novas)
+
+def mover_movimentos(db: Session, tipos: Iterable[str], referencia_id: int, nova_data: date) -> None:
+    # Muda a data dos movimentos de um documento (ex: venda com a data
+    # corrigida): as fotografias entre a data antiga e a nova são ajustadas
+    # pelo estorno na data antiga e pelo lançamento na nova.
+    t = movimentos_estoque_tabela
+    filtro = t.c.tipo.in_(list(tipos)) & (t.c.referencia_id == referencia_id) & (t.c.data != nova_data)
+    movidos = db.execute(select(t.c.item_tipo, t.c.item_id, t.c.quantidade, t.c.data).where(filtro)).all()
+    if not movidos:
+        return
+    db.execute(update(t).where(filtro).values(data=nova_data))
+    ajustar_fotografias(db, [(item_tipo, item_id, -quantidade, data) for item_tipo, item_id, quantidade, data in movidos] +
+                            [(item_tipo, item_id, quantidade, nova_data) for item_tipo, item_id, quantidade, _ in movidos])
+
+def _executar_por_item(db: Session, consulta: Select, coluna_id, ids: Optional[Iterable[int]]) -> dict[int, float]:
+    # Consulta (item_id, valor) para todos os itens ou, com ids, em lotes de IN.
+    if ids is None:
+        return {item_id: valor or 0.0 for item_id, valor in db.execute(consulta)}
+    valores: dict[int, float] = {}
+    for lote in dividir_em_lotes(set(ids)):
+        valores.update((item_id, valor or 0.0) for item_id, valor in db.execute(consulta.where(coluna_id.in_(lote))))
+    return valores
+
+def _saldos_atuais(db: Session, item_tipo: str, ids: Optional[Iterable[int]]) -> dict[int, float]:
+    tabela = Base.metadata.tables[TABELA_POR_TIPO_ITEM[item_tipo]]
+    return _executar_por_item(db, select(tabela.c.id, tabela.c.estoque), tabela.c.id, ids)
+
+def _somar_movimentos(db: Session, item_tipo: str, ids: Optional[Iterable[int]],
+                      depois_de: Optional[date] = None, ate: Optional[date] = None) -> dict[int, float]:
+    t = movimentos_estoque_tabela
+    consulta = select(t.c.item_id, func.sum(t.c.quantidade)).where(t.c.item_tipo == item_tipo)
+    if depois_de:
+        consulta = consulta.where(t.c.data > depois_de)
+    if ate:
+        consulta = consulta.where(t.c.data <= ate)
+    return _executar_por_item(db, consulta.group_by(t.c.item_id), t.c.item_id, ids)
+
+def _saldos_fotografados(db: Session, item_tipo: str, ids: Optional[Iterable[int]], data: date) -> dict[int, float]:
+    t = saldos_estoque_tabela
+    consulta = select(t.c.item_id, t.c.saldo).where(t.c.data == data, t.c.item_tipo == item_tipo)
+    return _executar_por_item(db, consulta, t.c.item_id, ids)
+
+def fim_do_mes(data: date) -> date:
+    return date(data.year + data.month // 12, data.month % 12 + 1, 1) - timedelta(days=1)
+
+def datas_fotografia(inicio: date, fim: date) -> list[date]:
+    # Os fins de mês entre inicio e fim, inclusive.
+    datas = []
+    data = fim_do_mes(inicio)
+    while data <= fim:
+        datas.append(data)
+        data = fim_do_mes(data + timedelta(days=1))
+    return datas
+
+def fotografar_estoque(db: Session, ate: Optional[date] = None) -> int:
+    # Cria as fotografias de fim de mês que faltam, do mês do primeiro
+    # movimento até `ate` (padrão: o último mês encerrado). Vão da mais
+    # recente para a mais antiga: saldo no fim do dia = saldo da âncora
+    # seguinte (outra fotografia ou o saldo atual) - movimentos entre as duas,
+    # então cada movimento é lido uma vez. Devolve o número de linhas gravadas.
+    ate = ate or date.today().replace(day=1) - timedelta(days=1)
+    primeira = db.execute(select(func.min(movimentos_estoque_tabela.c.data))).scalar()
+    if primeira is None:
+        return 0
+    datas = datas_fotografia(primeira, ate)
+    existentes = set(db.execute(select(saldos_estoque_tabela.c.data).where(saldos_estoque_tabela.c.data.in_(datas)).distinct()).scalars())
+    if not datas or existentes.issuperset(datas):
+        return 0
+
+    saldos = {item_tipo: _saldos_atuais(db, item_tipo, None) for item_tipo in TABELA_POR_TIPO_ITEM}
+    ancora: Optional[date] = None
+    linhas = []
+    for data in reversed(datas):
+        for item_tipo in TABELA_POR_TIPO_ITEM:
+            if data in existentes:
+                saldos[item_tipo] = _saldos_fotografados(db, item_tipo, None, data)
+                continue
+            saldos_dia = dict(saldos[item_tipo])
+            for item_id, quantidade in _somar_movimentos(db, item_tipo, None, depois_de=data, ate=ancora).items():
+                saldos_dia[item_id] = saldos_dia.get(item_id, 0.0) - quantidade
+            saldos[item_tipo] = saldos_dia
+            linhas.extend({'data': data, 'item_tipo': item_tipo, 'item_id': item_id, 'saldo': saldo} for item_id, saldo in saldos_dia.items())
+        ancora = data
+    for lote in dividir_em_lotes(linhas):
+        db.execute(insert(saldos_estoque_tabela), lote)
+    db.commit()
+    return len(linhas)
+
+def saldos_em(db: Session, item_tipo: str, data: date, ids: Optional[Iterable[int]] = None) -> dict[int, float]:
+    # Saldo no fim do dia `data`. Parte da âncora mais próxima (a fotografia
+    # anterior, a posterior ou o saldo atual), somando ou subtraindo só os
+    # movimentos entre ela e a data pedida.
+    if item_tipo not in TABELA_POR_TIPO_ITEM:
+        raise ValueError(f"Tipo de item '{item_tipo}' não tem estoque. Use um dos: {list(TABELA_POR_TIPO_ITEM)}")
+    ids = list(ids) if ids is not None else None
+    t = saldos_estoque_tabela
+    anterior = db.execute(select(func.max(t.c.data)).where(t.c.data <= data)).scalar()
+    posterior = db.execute(select(func.min(t.c.data)).where(t.c.data > data)).scalar()
+    distancia_posterior = (posterior - data).days if posterior else max((date.today() - data).days, 0)
+
+    if anterior and (data - anterior).days <= distancia_posterior:
+        saldos = _saldos_fotografados(db, item_tipo, ids, anterior)
+        deltas, sinal = _somar_movimentos(db, item_tipo, ids, depois_de=anterior, ate=data), 1
+    elif posterior:
+        saldos = _saldos_fotografados(db, item_tipo, ids, posterior)
+        deltas, sinal = _somar_movimentos(db, item_tipo, ids, depois_de=data, ate=posterior), -1
+    else:
+        saldos = _saldos_atuais(db, item_tipo, ids)
+        deltas, sinal = _somar_movimentos(db, item_tipo, ids, depois_de=data), -1
+
+    for item_id, quantidade in deltas.items():
+        saldos[item_id] = saldos.get(item_id, 0.0) + sinal * quantidade
+    if ids is not None:
+        return {item_id: saldos.get(item_id, 0.0) for item_id in ids}
+    return saldos
+
+def saldo_em(db: Session, item_tipo: str, item_id: int, data: date) -> float:
+    return saldos_em(db, item_tipo, data, [item_id])[item_id]
+
+def somar_movimentos_da_referencia(db: Session, tipo: str, referencia_id: int) -> dict[tuple[str, int], float]:
+    # Quanto um documento (venda, compra) movimentou de cada item; base dos
+    # estornos, que devolvem exatamente o que foi baixado.
+    t = movimentos_estoque_tabela
+    consulta = (select(t.c.item_tipo, t.c.item_id, func.sum(t.c.quantidade))
+                .where(t.c.tipo == tipo, t.c.referencia_id == referencia_id).group_by(t.c.item_tipo, t.c.item_id))
+    return {(item_tipo, item_id): quantidade for item_tipo, item_id, quantidade in db.execute(consulta) if quantidade}
+
+def _filtro_item(item_tipo: str, item_id: int):
+    return (movimentos_estoque_tabela.c.item_tipo == item_tipo) & (movimentos_estoque_tabela.c.item_id == item_id)
+
+def contar_movimentos(db: Session, item_tipo: str, item_id: int) -> int:
+    return db.execute(select(func.count()).select_from(movimentos_estoque_tabela).where(_filtro_item(item_tipo, item_id))).scalar_one()
+
+def listar_movimentos(db: Session, item_tipo: str, item_id: int, pagina: int = 1, por_pagina: int = ITENS_POR_PAGINA) -> list:
+    # Mais recentes primeiro, pelo índice (item_tipo, item_id, data).
+    t = movimentos_estoque_tabela
+    consulta = select(t).where(_filtro_item(item_tipo, item_id)).order_by(t.c.data.desc(), t.c.id.desc())
+    return db.execute(consulta.limit(por_pagina).offset((max(pagina, 1) - 1) * por_pagina)).fetchall()
+
+def _data_abertura(db: Session, hoje: date) -> date:
+    # Vendas e compras gravadas antes do razão já estão no estoque atual, e
+    # as lançadas depois com data retroativa geram movimentos nessas datas:
+    # o ajuste de abertura fica no dia do documento mais antigo (ou hoje),
+    # para que nenhum saldo histórico desconte uma baixa sem a abertura.
+    vendas = Base.metadata.tables['vendas']
+    despesas = Base.metadata.tables['despesas']
+    datas = [
+        db.execute(select(func.min(vendas.c.data_venda))).scalar(),
+        db.execute(select(func.min(despesas.c.data_despesa)).where(despesas.c.tipo == 'compra')).scalar(),
+    ]
+    return min([hoje] + [data for data in datas if data])
+
+def inicializar_movimentos(db: Session, hoje: Optional[date] = None) -> bool:
+    # Bancos criados antes do razão: o estoque atual de cada item entra como
+    # ajuste de abertura, datado por _data_abertura (não há histórico anterior
+    # a ele). Depois cria as fotografias de fim de mês que faltarem, que
+    # ancoram as consultas por data.
+    hoje = hoje or date.today()
+    abertura = False
+    if not db.execute(select(exists().select_from(movimentos_estoque_tabela))).scalar():
+        data_abertura = _data_abertura(db, hoje)
+        for item_tipo in TABELA_POR_TIPO_ITEM:
+            saldos = _saldos_atuais(db, item_tipo, None)
+            registrar_movimentos(db, 'ajuste', ((item_tipo, item_id, saldo, data_abertura, None) for item_id, saldo in saldos.items()))
+            abertura = abertura or any(saldos.values())
+        db.commit()
+
+    fotografar_estoque(db, hoje.replace(day=1) - timedelta(days=1))
+    return abertura
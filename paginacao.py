@@ -0,0 +1,86 @@
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+from datetime import date, datetime
+from typing import Any, Optional
+import base64
+import binascii
+import json
+
+# Paginação por chave (keyset): cada página continua a partir da chave de
+# ordenação (coluna de ordem, id) da última linha da anterior, com
+# "WHERE chave > última ORDER BY chave LIMIT n". O custo de qualquer página é
+# o de uma leitura curta no índice, sem OFFSET percorrendo as linhas já
+# vistas. A chave da última linha vai para o cliente como um token opaco.
+
+TAMANHO_PAGINA = 20
+
+class Pagina:
+    def __init__(self, itens: list[Any], proximo_token: Optional[str]):
+        self.itens = itens
+        # None na última página.
+        self.proximo_token = proximo_token
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self) -> int:
+        return len(self.itens)
+
+def _serializar_valor(valor: Any) -> Any:
+    # datetime antes de date (é subclasse dela).
+    if isinstance(valor, datetime):
+        return {'t': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'d': valor.isoformat()}
+    return valor
+
+def _desserializar_valor(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        if 't' in valor:
+            return datetime.fromisoformat(valor['t'])
+        if 'd' in valor:
+            return date.fromisoformat(valor['d'])
+    return valor
+
+def codificar_token(valores: list[Any]) -> str:
+    texto = json.dumps([_serializar_valor(valor) for valor in valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_token(token: str, quantidade_chaves: int) -> list[Any]:
+    try:
+        texto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        valores = [_desserializar_valor(valor) for valor in json.loads(texto)]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("Token de paginação inválido.")
+    if len(valores) != quantidade_chaves:
+        raise ValueError("Token de paginação inválido.")
+    return valores
+
+def _depois_da_chave(colunas: list[Any], valores: list[Any], descendente: bool):
+    # (c1, c2, ...) > (v1, v2, ...) expandido em OR de prefixos iguais. O
+    # limite redundante c1 >= v1 dá ao otimizador uma faixa no índice da
+    # primeira coluna; sem ele o SQLite percorre o índice desde o início.
+    condicoes = []
+    for posicao, (coluna, valor) in enumerate(zip(colunas, valores)):
+        iguais = [anterior == valor_anterior for anterior, valor_anterior in zip(colunas[:posicao], valores[:posicao])]
+        condicoes.append(and_(*iguais, coluna < valor if descendente else coluna > valor))
+    if len(colunas) == 1:
+        return condicoes[0]
+    faixa = colunas[0] <= valores[0] if descendente else colunas[0] >= valores[0]
+    return and_(faixa, or_(*condicoes))
+
+def paginar_consulta(consulta: Query, colunas: list[Any], token: Optional[str] = None,
+                     tamanho_pagina: int = TAMANHO_PAGINA, descendente: bool = False) -> Pagina:
+    # colunas: chave de ordenação, terminando no id para ser única. A ordem
+    # da consulta é substituída pela da chave.
+    if tamanho_pagina < 1:
+        raise ValueError("O tamanho da página deve ser maior que zero.")
+    if token:
+        consulta = consulta.filter(_depois_da_chave(colunas, decodificar_token(token, len(colunas)), descendente))
+    ordem = [coluna.desc() if descendente else coluna.asc() for coluna in colunas]
+    # Uma linha a mais indica se existe próxima página.
+    itens = consulta.order_by(None).order_by(*ordem).limit(tamanho_pagina + 1).all()
+    if len(itens) <= tamanho_pagina:
+        return Pagina(itens, None)
+    itens = itens[:tamanho_pagina]
+    return Pagina(itens, codificar_token([getattr(itens[-1], coluna.key) for coluna in colunas]))
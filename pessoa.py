@@ -1,10 +1,12 @@
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import Column, Integer, BigInteger, String, Date
+from sqlalchemy.orm import Session
 from sqlalchemy.orm import validates
 from datetime import date, datetime
-import random
 import re
-from typing import Union
+from typing import Union, Iterable
 from database import Base
+import busca_nomes as mod_busca
+import documentos as mod_documentos
 
 def analisar_data_flexivel(data_str: str, is_datetime: bool = False) -> Union[date, datetime]:
     padrao_data = r"(?P<dia>\d{1,2})[/\-\s]?(?P<mes>\d{1,2})[/\-\s]?(?P<ano>\d{2}(?:\d{2})?)"
@@ -53,8 +55,12 @@ class Pessoa(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(255), nullable=False)
+    # Chave de busca do nome (ver busca_nomes); NULL até ser indexada.
+    nome_busca = Column(String(255), nullable=True, index=True)
     nascimento = Column(Date, nullable=False)
     cpf = Column(String(14), unique=True, index=True, nullable=False)
+    # Dígitos do CPF como inteiro (ver documentos); NULL até ser preenchida.
+    cpf_numero = Column(BigInteger, unique=True, index=True, nullable=True)
     tipo = Column(String(50))
 
     telefone = Column(String(50), nullable=True)
@@ -76,6 +82,7 @@ class Pessoa(Base):
     def validar_nome_basico(self, key, nome_str):
         if not nome_str or not nome_str.strip():
             raise ValueError("O nome não pode ser vazio.")
+        self.nome_busca = mod_busca.normalizar_nome(nome_str)
         return nome_str
 
     @validates('nascimento')
@@ -92,70 +99,24 @@ class Pessoa(Base):
 
     @validates('cpf')
     def validar_cpf(self, key, cpf_str):
-        cpf_limpo = "".join(filter(str.isdigit, cpf_str))
+        cpf_limpo = mod_documentos.digitos(cpf_str)
         if not Pessoa._eh_cpf_valido(cpf_limpo):
             raise ValueError("CPF inválido.")
-        return f"{cpf_limpo[:3]}.{cpf_limpo[3:6]}.{cpf_limpo[6:9]}-{cpf_limpo[9:]}"
+        self.cpf_numero = int(cpf_limpo)
+        return mod_documentos.formatar_cpf(cpf_limpo)
 
     @staticmethod
     def _eh_cpf_valido(numeros_cpf: str) -> bool:
-        if not numeros_cpf.isdigit() or len(numeros_cpf) != 11:
-            return False
-        if len(set(numeros_cpf)) == 1:
-            return False
-        
-        soma_val: int = 0
-        for i in range(9):
-            soma_val += int(numeros_cpf[i]) * (10 - i)
-        primeiro_verificador: int = 11 - (soma_val % 11)
-        if primeiro_verificador > 9:
-            primeiro_verificador = 0
-        if primeiro_verificador != int(numeros_cpf[9]):
-            return False
-        
-        soma_val = 0
-        for i in range(10):
-            soma_val += int(numeros_cpf[i]) * (11 - i)
-        segundo_verificador: int = 11 - (soma_val % 11)
-        if segundo_verificador > 9:
-            segundo_verificador = 0
-        return segundo_verificador == int(numeros_cpf[10])
+        return mod_documentos.eh_documento_valido(numeros_cpf, mod_documentos.TAMANHO_CPF)
 
-def gerar_cpf_valido() -> str:
-    nove_digitos = [str(random.randint(0, 9)) for _ in range(9)]
-    soma_val = sum(int(nove_digitos[i]) * (10 - i) for i in range(9))
-    primeiro_verificador = 11 - (soma_val % 11)
-    if primeiro_verificador > 9: primeiro_verificador = 0
-    
-    dez_digitos = nove_digitos + [str(primeiro_verificador)]
-    soma_val = sum(int(dez_digitos[i]) * (11 - i) for i in range(10))
-    segundo_verificador = 11 - (soma_val % 11)
-    if segundo_verificador > 9: segundo_verificador = 0
+mod_busca.registrar_indexacao(Pessoa)
 
-    cpf_final = "".join(dez_digitos + [str(segundo_verificador)])
-    return cpf_final
+def buscar_pessoas_por_cpfs(db: Session, cpfs: Iterable[str]) -> dict[str, Pessoa]:
+    # Clientes e funcionários juntos, cada um já com a sua classe.
+    return mod_documentos.buscar_por_documentos(db, Pessoa, Pessoa.cpf_numero, cpfs, mod_documentos.TAMANHO_CPF)
+
+def gerar_cpf_valido() -> str:
+    return mod_documentos.gerar_documento(mod_documentos.TAMANHO_CPF)
 
 def gerar_cnpj_valido() -> str:
-    doze_digitos: list[str] = [str(random.randint(0, 9)) for _ in range(12)]
-
-    soma_val1: int = 0
-    multiplicadores1: list[int] = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-    for i in range(12):
-        soma_val1 += int(doze_digitos[i]) * multiplicadores1[i]
-    primeiro_dv: int = 11 - (soma_val1 % 11)
-    if primeiro_dv > 9:
-        primeiro_dv = 0
-
-    treze_digitos: list[str] = doze_digitos + [str(primeiro_dv)]
-
-    soma_val2: int = 0
-    multiplicadores2: list[int] = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-    for i in range(13):
-        soma_val2 += int(treze_digitos[i]) * multiplicadores2[i]
-    segundo_dv: int = 11 - (soma_val2 % 11)
-    if segundo_dv > 9:
-        segundo_dv = 0
-
-    cnpj_completo_digitos: str = "".join(doze_digitos + [str(primeiro_dv), str(segundo_dv)])
-    
-    return f"{cnpj_completo_digitos[:2]}.{cnpj_completo_digitos[2:5]}.{cnpj_completo_digitos[5:8]}/{cnpj_completo_digitos[8:12]}-{cnpj_completo_digitos[12:]}"
+    return mod_documentos.formatar_cnpj(mod_documentos.gerar_documento(mod_documentos.TAMANHO_CNPJ))
@@ -1,19 +1,27 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, func
+from sqlalchemy import Column, Integer, String, Float, JSON
 from sqlalchemy.orm import Session, synonym
-from datetime import datetime
 from tabulate import tabulate
 from typing import Optional, Any
 
 from database import Base
+import historico_custos as mod_historico
+import movimentos_estoque as mod_movimentos
+import busca_nomes as mod_busca
+from paginacao import Pagina, paginar_consulta, TAMANHO_PAGINA
 
 class Produto(Base):
     __tablename__ = 'produtos'
 
     id = Column(Integer, primary_key=True, index=True)
     _nome = Column("nome", String(255), unique=True, index=True, nullable=False)
+    # Nome sem maiúsculas, acentos nem espaços extras; a unicidade e as buscas
+    # por nome usam esta coluna (ver busca_nomes.chave_unica_nome).
+    _nome_chave = Column("nome_chave", String(255), unique=True, index=True, nullable=True)
     _preco = Column("preco", Float, nullable=False)
     _estoque = Column("estoque", Float, nullable=False, default=0.0)
     _custo_compra = Column("custo_compra", Float, nullable=False, default=0.0)
+    # Legado: o histórico agora fica em historico_custos; a coluna só é lida
+    # por historico_custos.migrar_historico_json.
     _historico_custo_compra = Column("historico_custo_compra", JSON, nullable=True)
 
     def __init__(self, nome: str, preco: float, estoque: float, **kwargs):
@@ -21,7 +29,8 @@ class Produto(Base):
         self.preco = preco
         self.estoque = estoque
         self.custo_compra = kwargs.get('custo_compra', 0.0)
-        self.historico_custo_compra = kwargs.get('historico_custo_compra', [])
+        if 'historico_custo_compra' in kwargs:
+            self.historico_custo_compra = kwargs['historico_custo_compra']
 
     def __str__(self) -> str:
         custo_str = f", Custo Última Compra: R${self.custo_compra:.2f}" if self.custo_compra > 0 else ""
@@ -30,7 +39,7 @@ class Produto(Base):
 
     nome = synonym('_nome', descriptor=property(
         lambda self: self._nome,
-        lambda self, valor: setattr(self, '_nome', self._valida_nome(valor))
+        lambda self, valor: self._atribuir_nome(valor)
     ))
 
     preco = synonym('_preco', descriptor=property(
@@ -53,6 +62,10 @@ class Produto(Base):
         lambda self, valor: setattr(self, '_historico_custo_compra', valor)
     ))
 
+    def _atribuir_nome(self, nome_str: str) -> None:
+        self._nome = self._valida_nome(nome_str)
+        self._nome_chave = mod_busca.chave_unica_nome(self._nome)
+
     def _valida_nome(self, nome_str: str) -> str:
         nome_limpo = nome_str.strip()
         if not nome_limpo:
@@ -81,8 +94,7 @@ class Produto(Base):
         return valor_num
 
 def buscar_produto(db: Session, nome_produto: str) -> Optional[Produto]:
-    nome_busca_lower = nome_produto.lower().strip()
-    return db.query(Produto).filter(func.lower(Produto._nome) == nome_busca_lower).first()
+    return db.query(Produto).filter(Produto._nome_chave == mod_busca.chave_unica_nome(nome_produto)).first()
 
 def buscar_produto_id(db: Session, id_produto: int) -> Optional[Produto]:
     return db.query(Produto).filter(Produto.id == id_produto).first()
@@ -90,6 +102,9 @@ def buscar_produto_id(db: Session, id_produto: int) -> Optional[Produto]:
 def listar_produtos(db: Session) -> list[Produto]:
     return db.query(Produto).order_by(Produto.id).all()
 
+def paginar_produtos(db: Session, token: Optional[str] = None, tamanho_pagina: int = TAMANHO_PAGINA) -> Pagina:
+    return paginar_consulta(db.query(Produto), [Produto.id], token, tamanho_pagina)
+
 def criar_produto(db: Session, nome: str, preco: float, estoque: float) -> Produto:
     produto_existente = buscar_produto(db, nome)
     if produto_existente:
@@ -97,6 +112,8 @@ def criar_produto(db: Session, nome: str, preco: float, estoque: float) -> Produ
 
     novo_produto = Produto(nome=nome, preco=preco, estoque=estoque)
     db.add(novo_produto)
+    db.flush()
+    mod_movimentos.registrar_ajuste(db, 'Produto', novo_produto.id, novo_produto.estoque)
     db.commit()
     db.refresh(novo_produto)
     return novo_produto
@@ -112,9 +129,11 @@ def atualizar_dados_produto(db: Session, id_produto: int, **kwargs: Any) -> Prod
         if conflito and conflito.id != id_produto:
             raise ValueError(f"Não foi possível atualizar. Já existe um produto com o nome '{novo_nome}'.")
 
+    estoque_anterior = produto_existente.estoque
     for chave, valor in kwargs.items():
         if hasattr(produto_existente, chave):
             setattr(produto_existente, chave, valor)
+    mod_movimentos.registrar_ajuste(db, 'Produto', id_produto, produto_existente.estoque - estoque_anterior)
 
     db.commit()
     db.refresh(produto_existente)
@@ -149,19 +168,23 @@ def _formatar_produtos_para_tabela(db: Session, produtos: list[Produto]) -> str:
     
     return tabulate(dados_tabela, headers=cabecalhos, tablefmt="grid")
 
-def _formatar_historico_para_tabela(historico: list) -> str:
-    if not historico:
+def _formatar_historico_para_tabela(db: Session, id_produto: int, pagina: int = 1,
+                                    por_pagina: int = mod_historico.ITENS_POR_PAGINA) -> str:
+    total_registros = mod_historico.contar_historico(db, 'Produto', id_produto)
+    if not total_registros:
         return "Nenhum histórico de compras para este produto."
     
     cabecalhos = ["Data", "Quantidade", "Valor Unitário", "Fornecedor"]
     dados_tabela = []
 
-    for registro in historico:
+    for registro in mod_historico.listar_historico(db, 'Produto', id_produto, pagina, por_pagina):
         dados_tabela.append([
-            datetime.fromisoformat(registro["data"]).strftime("%d/%m/%Y"),
-            registro["quantidade"],
-            f"R${registro['valor_unitario']:.2f}",
-            registro.get("fornecedor_nome", "N/A")
+            registro.data_compra.strftime("%d/%m/%Y"),
+            registro.quantidade,
+            f"R${registro.valor_unitario:.2f}",
+            registro.fornecedor_nome or "N/A"
         ])
     
-    return tabulate(dados_tabela, headers=cabecalhos, tablefmt="grid")
+    total_paginas = -(-total_registros // por_pagina)
+    rodape = f"\nPágina {pagina} de {total_paginas} ({total_registros} compras)"
+    return tabulate(dados_tabela, headers=cabecalhos, tablefmt="grid") + rodape
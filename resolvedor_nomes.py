@@ -0,0 +1,78 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from typing import Optional, Iterable, Any
+
+from database import dividir_em_lotes
+import produto as mod_produto
+import servico as mod_servico
+import suprimento as mod_suprimento
+
+# Tipos aceitos nas colunas item_tipo de agenda_itens, venda_itens e compras.
+MODELOS_POR_TIPO: dict[str, Any] = {
+    'Produto': mod_produto.Produto,
+    'Servico': mod_servico.Servico,
+    'Suprimento': mod_suprimento.Suprimento,
+}
+
+class ResolvedorNomes:
+    def __init__(self, db: Session):
+        self.db = db
+        self._nomes: dict[tuple[str, int], Optional[str]] = {}
+        self.acertos = 0
+        self.falhas = 0
+        self.consultas = 0
+        # O cache acompanha o ciclo de vida dos objetos da sessão: um commit ou
+        # rollback pode ter renomeado ou removido itens.
+        event.listen(db, "after_commit", self._limpar_cache)
+        event.listen(db, "after_rollback", self._limpar_cache)
+
+    def _limpar_cache(self, _sessao: Session) -> None:
+        self._nomes.clear()
+
+    def carregar(self, pares: Iterable[tuple[str, Optional[int]]]) -> None:
+        ids_pendentes: dict[str, set[int]] = defaultdict(set)
+        for item_tipo, item_id in pares:
+            if item_tipo not in MODELOS_POR_TIPO or item_id is None:
+                continue
+            if (item_tipo, item_id) in self._nomes or item_id in ids_pendentes[item_tipo]:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+                ids_pendentes[item_tipo].add(item_id)
+
+        for item_tipo, ids in ids_pendentes.items():
+            modelo = MODELOS_POR_TIPO[item_tipo]
+            for lote in dividir_em_lotes(ids):
+                self.consultas += 1
+                encontrados = dict(self.db.query(modelo.id, modelo._nome).filter(modelo.id.in_(lote)))
+                for item_id in lote:
+                    self._nomes[(item_tipo, item_id)] = encontrados.get(item_id)
+
+    def carregar_linhas(self, linhas: Iterable[Any]) -> None:
+        self.carregar((linha.item_tipo, linha.item_id) for linha in linhas)
+
+    def nome(self, item_tipo: str, item_id: Optional[int]) -> Optional[str]:
+        if item_tipo not in MODELOS_POR_TIPO or item_id is None:
+            return None
+        chave = (item_tipo, item_id)
+        if chave in self._nomes:
+            self.acertos += 1
+            return self._nomes[chave]
+        self.carregar([chave])
+        return self._nomes.get(chave)
+
+    def estatisticas(self) -> dict[str, int]:
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'consultas': self.consultas,
+            'nomes_em_cache': len(self._nomes),
+        }
+
+def obter_resolvedor(db: Session) -> ResolvedorNomes:
+    resolvedor = db.info.get('resolvedor_nomes')
+    if resolvedor is None:
+        resolvedor = ResolvedorNomes(db)
+        db.info['resolvedor_nomes'] = resolvedor
+    return resolvedor
@@ -0,0 +1,227 @@
+from sqlalchemy import select, insert, delete, func, case, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Optional, Iterable
+
+from database import Base, venda_itens_tabela, agenda_itens_tabela, resultados_fechados_tabela
+
+# Demonstrativo de resultado (DRE): receita das vendas, custo das mercadorias
+# vendidas (custo_compra do Produto / custo do Servico, itens avulsos e da
+# agenda), despesas por tipo e resultado líquido, por período e por
+# funcionário. O banco agrupa por dia (e funcionário); os dias são somados em
+# semanas/meses aqui, o que mantém a semana igual em SQLite e MySQL.
+#
+# Períodos encerrados (fim antes de hoje) são gravados em resultados_fechados
+# e não são recalculados. Uma venda/despesa gravada com data num período
+# encerrado apaga o resultado guardado dele (ver invalidar_resultados_fechados);
+# mudanças de custo de produtos e serviços não alteram períodos já encerrados.
+
+PERIODICIDADES = ('dia', 'semana', 'mes')
+ID_EMPRESA = 0
+TIPOS_DESPESA_PESSOAL = ('salario', 'comissao')
+
+class LinhaResultado:
+    def __init__(self, inicio: date, fim: date, funcionario_id: Optional[int] = None, vendas: int = 0,
+                 receita: float = 0.0, custo_mercadorias: float = 0.0, despesas: Optional[dict[str, float]] = None):
+        self.inicio = inicio
+        self.fim = fim
+        # None na linha da empresa inteira.
+        self.funcionario_id = funcionario_id
+        self.vendas = vendas
+        self.receita = receita
+        self.custo_mercadorias = custo_mercadorias
+        self.despesas: dict[str, float] = despesas if despesas is not None else {}
+
+    @property
+    def lucro_bruto(self) -> float:
+        return self.receita - self.custo_mercadorias
+
+    @property
+    def total_despesas(self) -> float:
+        return sum(self.despesas.values())
+
+    @property
+    def resultado_liquido(self) -> float:
+        return self.lucro_bruto - self.total_despesas
+
+    @property
+    def margem_liquida(self) -> float:
+        return self.resultado_liquido / self.receita if self.receita else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.inicio.strftime('%d/%m/%Y')} a {self.fim.strftime('%d/%m/%Y')}: Receita R${self.receita:.2f}, "
+                f"Resultado R${self.resultado_liquido:.2f} ({self.margem_liquida:.1%})")
+
+def _inicio_periodo(dia: date, periodicidade: str) -> date:
+    if periodicidade == 'semana':
+        return dia - timedelta(days=dia.weekday())
+    if periodicidade == 'mes':
+        return dia.replace(day=1)
+    return dia
+
+def _fim_periodo(inicio: date, periodicidade: str) -> date:
+    if periodicidade == 'semana':
+        return inicio + timedelta(days=6)
+    if periodicidade == 'mes':
+        return (inicio.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return inicio
+
+def _periodos_entre(data_inicio: date, data_fim: date, periodicidade: str) -> list[tuple[date, date]]:
+    # Períodos completos que cobrem o intervalo pedido.
+    periodos = []
+    inicio = _inicio_periodo(data_inicio, periodicidade)
+    while inicio <= data_fim:
+        fim = _fim_periodo(inicio, periodicidade)
+        periodos.append((inicio, fim))
+        inicio = fim + timedelta(days=1)
+    return periodos
+
+def _custo_unitario_item(coluna_tipo, produtos, servicos):
+    return func.coalesce(case((coluna_tipo == 'Produto', produtos.c.custo_compra),
+                              (coluna_tipo == 'Servico', servicos.c.custo), else_=0.0), 0.0)
+
+def _calcular(db: Session, inicio: date, fim: date, periodicidade: str) -> dict[date, dict[int, LinhaResultado]]:
+    vendas, despesas = Base.metadata.tables['vendas'], Base.metadata.tables['despesas']
+    produtos, servicos = Base.metadata.tables['produtos'], Base.metadata.tables['servicos']
+    salarios, comissoes = Base.metadata.tables['salarios'], Base.metadata.tables['comissoes']
+
+    linhas: dict[date, dict[int, LinhaResultado]] = defaultdict(dict)
+    def linha(dia: date, funcionario_id: int) -> LinhaResultado:
+        inicio_periodo = _inicio_periodo(dia, periodicidade)
+        por_funcionario = linhas[inicio_periodo]
+        if funcionario_id not in por_funcionario:
+            por_funcionario[funcionario_id] = LinhaResultado(inicio_periodo, _fim_periodo(inicio_periodo, periodicidade),
+                                                             None if funcionario_id == ID_EMPRESA else funcionario_id)
+        return por_funcionario[funcionario_id]
+
+    no_periodo = vendas.c.data_venda.between(inicio, fim)
+    for dia, funcionario_id, quantidade, receita in db.execute(
+        select(vendas.c.data_venda, vendas.c.funcionario_id, func.count(), func.sum(vendas.c.valor_total))
+        .where(no_periodo).group_by(vendas.c.data_venda, vendas.c.funcionario_id)
+    ):
+        for chave in (ID_EMPRESA, funcionario_id):
+            linha(dia, chave).vendas += quantidade
+            linha(dia, chave).receita += receita or 0.0
+
+    # Itens avulsos da venda e itens da agenda realizada pela venda.
+    fontes_itens = (
+        (venda_itens_tabela, venda_itens_tabela.c.venda_id == vendas.c.id),
+        (agenda_itens_tabela, agenda_itens_tabela.c.agenda_id == vendas.c.agenda_id),
+    )
+    for tabela_itens, juncao_venda in fontes_itens:
+        custo_unitario = _custo_unitario_item(tabela_itens.c.item_tipo, produtos, servicos)
+        consulta = (
+            select(vendas.c.data_venda, vendas.c.funcionario_id, func.sum(tabela_itens.c.quantidade * custo_unitario))
+            .select_from(
+                tabela_itens.join(vendas, juncao_venda)
+                .outerjoin(produtos, and_(tabela_itens.c.item_tipo == 'Produto', produtos.c.id == tabela_itens.c.item_id))
+                .outerjoin(servicos, and_(tabela_itens.c.item_tipo == 'Servico', servicos.c.id == tabela_itens.c.item_id))
+            )
+            .where(no_periodo)
+            .group_by(vendas.c.data_venda, vendas.c.funcionario_id)
+        )
+        for dia, funcionario_id, custo in db.execute(consulta):
+            for chave in (ID_EMPRESA, funcionario_id):
+                linha(dia, chave).custo_mercadorias += custo or 0.0
+
+    despesas_no_periodo = despesas.c.data_despesa.between(inicio, fim)
+    for dia, tipo, valor in db.execute(
+        select(despesas.c.data_despesa, despesas.c.tipo, func.sum(despesas.c.valor_total))
+        .where(despesas_no_periodo).group_by(despesas.c.data_despesa, despesas.c.tipo)
+    ):
+        despesas_empresa = linha(dia, ID_EMPRESA).despesas
+        despesas_empresa[tipo] = despesas_empresa.get(tipo, 0.0) + (valor or 0.0)
+
+    # Salários e comissões também entram no resultado do funcionário.
+    funcionario_da_despesa = func.coalesce(salarios.c.funcionario_id, comissoes.c.funcionario_id)
+    for dia, funcionario_id, tipo, valor in db.execute(
+        select(despesas.c.data_despesa, funcionario_da_despesa, despesas.c.tipo, func.sum(despesas.c.valor_total))
+        .select_from(despesas.outerjoin(salarios, salarios.c.id == despesas.c.id).outerjoin(comissoes, comissoes.c.id == despesas.c.id))
+        .where(despesas_no_periodo, despesas.c.tipo.in_(TIPOS_DESPESA_PESSOAL))
+        .group_by(despesas.c.data_despesa, funcionario_da_despesa, despesas.c.tipo)
+    ):
+        despesas_funcionario = linha(dia, funcionario_id).despesas
+        despesas_funcionario[tipo] = despesas_funcionario.get(tipo, 0.0) + (valor or 0.0)
+
+    return linhas
+
+def _carregar_fechados(db: Session, periodicidade: str, inicios: list[date]) -> dict[date, dict[int, LinhaResultado]]:
+    if not inicios:
+        return {}
+    t = resultados_fechados_tabela
+    guardados: dict[date, dict[int, LinhaResultado]] = defaultdict(dict)
+    for registro in db.execute(select(t).where(t.c.periodicidade == periodicidade, t.c.inicio.between(min(inicios), max(inicios)))):
+        guardados[registro.inicio][registro.funcionario_id] = LinhaResultado(
+            registro.inicio, registro.fim, None if registro.funcionario_id == ID_EMPRESA else registro.funcionario_id,
+            registro.vendas, registro.receita, registro.custo_mercadorias, dict(registro.despesas)
+        )
+    # Todo período gravado tem a linha da empresa; sem ela o período não foi
+    # gravado por inteiro.
+    return {inicio: linhas for inicio, linhas in guardados.items() if ID_EMPRESA in linhas}
+
+def _gravar_fechados(db: Session, periodicidade: str, periodos: dict[date, dict[int, LinhaResultado]]) -> None:
+    registros = [
+        {
+            'periodicidade': periodicidade, 'inicio': inicio, 'funcionario_id': funcionario_id, 'fim': linha.fim,
+            'vendas': linha.vendas, 'receita': linha.receita, 'custo_mercadorias': linha.custo_mercadorias, 'despesas': linha.despesas,
+        }
+        for inicio, linhas in periodos.items() for funcionario_id, linha in linhas.items()
+    ]
+    if registros:
+        db.execute(insert(resultados_fechados_tabela), registros)
+
+def invalidar_resultados_fechados(db: Session, datas: Iterable[date]) -> None:
+    # Apaga só os períodos que contêm alguma das datas; os que ficam entre
+    # datas distantes continuam guardados.
+    datas = set(datas)
+    if datas:
+        t = resultados_fechados_tabela
+        db.execute(delete(t).where(or_(*(
+            and_(t.c.periodicidade == periodicidade, t.c.inicio.in_({_inicio_periodo(dia, periodicidade) for dia in datas}))
+            for periodicidade in PERIODICIDADES
+        ))))
+
+def gerar_resultado(db: Session, data_inicio: date, data_fim: date, periodicidade: str = 'mes',
+                    por_funcionario: bool = False, hoje: Optional[date] = None) -> list[LinhaResultado]:
+    if periodicidade not in PERIODICIDADES:
+        raise ValueError(f"Periodicidade '{periodicidade}' inválida. Use uma das: {list(PERIODICIDADES)}")
+    if data_inicio > data_fim:
+        raise ValueError("A data de início deve ser anterior à data de fim.")
+
+    hoje = hoje or date.today()
+    periodos = _periodos_entre(data_inicio, data_fim, periodicidade)
+    resultado = _carregar_fechados(db, periodicidade, [inicio for inicio, fim in periodos if fim < hoje])
+
+    # Só os trechos contíguos de períodos ainda não gravados vão ao banco.
+    trechos: list[list[tuple[date, date]]] = []
+    for periodo in periodos:
+        if periodo[0] in resultado:
+            continue
+        if trechos and trechos[-1][-1][1] + timedelta(days=1) == periodo[0]:
+            trechos[-1].append(periodo)
+        else:
+            trechos.append([periodo])
+
+    novos_fechados: dict[date, dict[int, LinhaResultado]] = {}
+    for trecho in trechos:
+        calculados = _calcular(db, trecho[0][0], trecho[-1][1], periodicidade)
+        for inicio, fim in trecho:
+            linhas = calculados.get(inicio, {})
+            linhas.setdefault(ID_EMPRESA, LinhaResultado(inicio, fim))
+            resultado[inicio] = linhas
+            if fim < hoje:
+                novos_fechados[inicio] = linhas
+    if novos_fechados:
+        try:
+            _gravar_fechados(db, periodicidade, novos_fechados)
+            db.commit()
+        except IntegrityError:
+            # Outra sessão gravou os mesmos períodos ao mesmo tempo.
+            db.rollback()
+
+    if por_funcionario:
+        return [resultado[inicio][funcionario_id] for inicio, _ in periodos
+                for funcionario_id in sorted(resultado[inicio]) if funcionario_id != ID_EMPRESA]
+    return [resultado[inicio][ID_EMPRESA] for inicio, _ in periodos]
@@ -0,0 +1,186 @@
+from sqlalchemy import Table, select, update, insert, delete, func, case, exists
+from sqlalchemy.dialects import sqlite, mysql
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import date
+from typing import Optional, Iterable
+
+from database import (Base, venda_itens_tabela, agenda_itens_tabela, resumo_vendas_diario_tabela,
+                      resumo_despesas_diario_tabela, dividir_em_lotes, agrupar_linhas_por)
+from resultado_financeiro import invalidar_resultados_fechados
+
+# Os resumos são mantidos por deltas: cada escrita subtrai (sinal=-1) a
+# contribuição das vendas/despesas afetadas antes de alterá-las e soma
+# (sinal=1) a contribuição depois, sempre lendo o estado atual do banco. As
+# mesmas datas apagam o demonstrativo guardado dos períodos encerrados.
+
+ITEM_TIPO_VENDA = 'Venda'
+
+def _acumular(deltas: dict[tuple, list[float]], chave: tuple, sinal: int, quantidade: float, valor: float) -> None:
+    acumulado = deltas[chave]
+    acumulado[0] += sinal * quantidade
+    acumulado[1] += sinal * valor
+
+def _somar_deltas(db: Session, tabela: Table, deltas: dict[tuple, list[float]]) -> None:
+    if not deltas:
+        return
+    colunas_chave = [coluna.name for coluna in tabela.primary_key.columns]
+    linhas = [{**dict(zip(colunas_chave, chave)), 'quantidade': quantidade, 'valor': valor}
+              for chave, (quantidade, valor) in deltas.items()]
+
+    # Upsert nativo soma o delta na linha existente numa única instrução,
+    # sem corrida entre o UPDATE e o INSERT de escritas concorrentes.
+    dialeto = db.connection().dialect.name
+    if dialeto == 'sqlite':
+        instrucao = sqlite.insert(tabela)
+        instrucao = instrucao.on_conflict_do_update(index_elements=colunas_chave, set_={
+            'quantidade': tabela.c.quantidade + instrucao.excluded.quantidade,
+            'valor': tabela.c.valor + instrucao.excluded.valor,
+        })
+        db.execute(instrucao, linhas)
+    elif dialeto == 'mysql':
+        instrucao = mysql.insert(tabela)
+        instrucao = instrucao.on_duplicate_key_update(
+            quantidade=tabela.c.quantidade + instrucao.inserted.quantidade,
+            valor=tabela.c.valor + instrucao.inserted.valor,
+        )
+        db.execute(instrucao, linhas)
+    else:
+        for linha in linhas:
+            filtro_chave = [tabela.c[nome] == linha[nome] for nome in colunas_chave]
+            atualizadas = db.execute(update(tabela).where(*filtro_chave).values(
+                quantidade=tabela.c.quantidade + linha['quantidade'], valor=tabela.c.valor + linha['valor']
+            )).rowcount
+            if not atualizadas:
+                db.execute(insert(tabela).values(**linha))
+
+def aplicar_vendas(db: Session, ids_vendas: Iterable[int], sinal: int = 1) -> None:
+    db.flush()
+    vendas = Base.metadata.tables['vendas']
+    cabecalhos = []
+    for lote in dividir_em_lotes(set(ids_vendas)):
+        cabecalhos.extend(db.execute(
+            select(vendas.c.id, vendas.c.data_venda, vendas.c.funcionario_id, vendas.c.cliente_id,
+                   vendas.c.agenda_id, vendas.c.valor_total).where(vendas.c.id.in_(lote))
+        ))
+    if not cabecalhos:
+        return
+
+    itens_por_venda = agrupar_linhas_por(db, venda_itens_tabela, 'venda_id', (v.id for v in cabecalhos))
+    itens_por_agenda = agrupar_linhas_por(db, agenda_itens_tabela, 'agenda_id', (v.agenda_id for v in cabecalhos if v.agenda_id))
+
+    deltas: dict[tuple, list[float]] = defaultdict(lambda: [0.0, 0.0])
+    for venda in cabecalhos:
+        base = (venda.data_venda, venda.funcionario_id, venda.cliente_id)
+        _acumular(deltas, base + (ITEM_TIPO_VENDA,), sinal, 1, venda.valor_total)
+        for item in itens_por_venda.get(venda.id, []):
+            _acumular(deltas, base + (item.item_tipo,), sinal, item.quantidade, item.quantidade * item.preco_unitario_vendido)
+        for item in itens_por_agenda.get(venda.agenda_id, []) if venda.agenda_id else []:
+            _acumular(deltas, base + (item.item_tipo,), sinal, item.quantidade, item.quantidade * item.valor_negociado)
+    _somar_deltas(db, resumo_vendas_diario_tabela, deltas)
+    invalidar_resultados_fechados(db, {venda.data_venda for venda in cabecalhos})
+
+def aplicar_vendas_da_agenda(db: Session, id_agenda: int, sinal: int = 1) -> None:
+    # Os itens de uma agenda entram no resumo das vendas que a realizaram.
+    vendas = Base.metadata.tables['vendas']
+    ids_vendas = db.execute(select(vendas.c.id).where(vendas.c.agenda_id == id_agenda)).scalars().all()
+    if ids_vendas:
+        aplicar_vendas(db, ids_vendas, sinal)
+
+def aplicar_despesas(db: Session, ids_despesas: Iterable[int], sinal: int = 1) -> None:
+    db.flush()
+    despesas = Base.metadata.tables['despesas']
+    deltas: dict[tuple, list[float]] = defaultdict(lambda: [0.0, 0.0])
+    for lote in dividir_em_lotes(set(ids_despesas)):
+        for despesa in db.execute(select(despesas.c.data_despesa, despesas.c.tipo, despesas.c.valor_total).where(despesas.c.id.in_(lote))):
+            _acumular(deltas, (despesa.data_despesa, despesa.tipo), sinal, 1, despesa.valor_total)
+    _somar_deltas(db, resumo_despesas_diario_tabela, deltas)
+    invalidar_resultados_fechados(db, {data_despesa for data_despesa, _ in deltas})
+
+def reconstruir_resumos(db: Session) -> None:
+    db.execute(delete(resumo_vendas_diario_tabela))
+    db.execute(delete(resumo_despesas_diario_tabela))
+    vendas, despesas = Base.metadata.tables['vendas'], Base.metadata.tables['despesas']
+    for lote in dividir_em_lotes(db.execute(select(vendas.c.id)).scalars().all()):
+        aplicar_vendas(db, lote)
+    for lote in dividir_em_lotes(db.execute(select(despesas.c.id)).scalars().all()):
+        aplicar_despesas(db, lote)
+    db.commit()
+
+def inicializar_resumos(db: Session) -> bool:
+    # Bancos criados antes dos resumos: gera tudo uma vez a partir das vendas
+    # e despesas existentes.
+    vendas, despesas = Base.metadata.tables['vendas'], Base.metadata.tables['despesas']
+    resumos_vazios = not db.execute(select(exists().select_from(resumo_vendas_diario_tabela))).scalar() and \
+                     not db.execute(select(exists().select_from(resumo_despesas_diario_tabela))).scalar()
+    if not resumos_vazios:
+        return False
+    if not db.execute(select(exists().select_from(vendas))).scalar() and not db.execute(select(exists().select_from(despesas))).scalar():
+        return False
+    reconstruir_resumos(db)
+    return True
+
+def _filtrar_periodo(consulta, tabela: Table, data_inicio: Optional[date], data_fim: Optional[date]):
+    if data_inicio:
+        consulta = consulta.where(tabela.c.data >= data_inicio)
+    if data_fim:
+        consulta = consulta.where(tabela.c.data <= data_fim)
+    return consulta
+
+def resumir_vendas(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None,
+                   cliente_id: Optional[int] = None, funcionario_id: Optional[int] = None) -> dict[str, float]:
+    # Mesmas chaves dos totais de venda._preparar_linhas_vendas, mais a
+    # quantidade de vendas.
+    t = resumo_vendas_diario_tabela
+    consulta = _filtrar_periodo(select(t.c.item_tipo, func.sum(t.c.quantidade), func.sum(t.c.valor)), t, data_inicio, data_fim)
+    if cliente_id:
+        consulta = consulta.where(t.c.cliente_id == cliente_id)
+    if funcionario_id:
+        consulta = consulta.where(t.c.funcionario_id == funcionario_id)
+
+    totais = {'produtos': 0.0, 'servicos': 0.0, 'geral': 0.0, 'vendas': 0.0}
+    for item_tipo, quantidade, valor in db.execute(consulta.group_by(t.c.item_tipo)):
+        if item_tipo == ITEM_TIPO_VENDA:
+            totais['geral'], totais['vendas'] = valor, quantidade
+        elif item_tipo == 'Produto':
+            totais['produtos'] = valor
+        elif item_tipo == 'Servico':
+            totais['servicos'] = valor
+    return totais
+
+def totais_vendas_por_funcionario(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> list:
+    # (funcionario_id, vendas, produtos, servicos, geral), maior faturamento primeiro.
+    t = resumo_vendas_diario_tabela
+    def soma_do_tipo(item_tipo: str, coluna):
+        return func.sum(case((t.c.item_tipo == item_tipo, coluna), else_=0.0))
+    geral = soma_do_tipo(ITEM_TIPO_VENDA, t.c.valor)
+    consulta = select(
+        t.c.funcionario_id,
+        soma_do_tipo(ITEM_TIPO_VENDA, t.c.quantidade).label('vendas'),
+        soma_do_tipo('Produto', t.c.valor).label('produtos'),
+        soma_do_tipo('Servico', t.c.valor).label('servicos'),
+        geral.label('geral'),
+    )
+    # Funcionários cujas vendas do período foram todas excluídas ficam com
+    # linhas zeradas no resumo.
+    consulta = (_filtrar_periodo(consulta, t, data_inicio, data_fim).group_by(t.c.funcionario_id)
+                .having(soma_do_tipo(ITEM_TIPO_VENDA, t.c.quantidade) != 0).order_by(geral.desc()))
+    return db.execute(consulta).fetchall()
+
+def resumir_despesas(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None,
+                     tipos: Optional[list[str]] = None) -> dict[str, float]:
+    t = resumo_despesas_diario_tabela
+    consulta = _filtrar_periodo(select(func.sum(t.c.quantidade), func.sum(t.c.valor)), t, data_inicio, data_fim)
+    if tipos:
+        consulta = consulta.where(t.c.tipo.in_(tipos))
+    quantidade, valor = db.execute(consulta).one()
+    return {'despesas': valor or 0.0, 'quantidade': quantidade or 0.0}
+
+def totais_despesas_por_tipo(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> list:
+    # (tipo, quantidade, valor), maior valor primeiro.
+    t = resumo_despesas_diario_tabela
+    valor = func.sum(t.c.valor)
+    consulta = select(t.c.tipo, func.sum(t.c.quantidade).label('quantidade'), valor.label('valor'))
+    consulta = (_filtrar_periodo(consulta, t, data_inicio, data_fim).group_by(t.c.tipo)
+                .having(func.sum(t.c.quantidade) != 0).order_by(valor.desc()))
+    return db.execute(consulta).fetchall()
@@ -0,0 +1,566 @@
+import os
+import sys
+import time
+import random
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+# Os cenários criam os próprios engines; o engine global de database (criado
+# na importação) fica no SQLite em memória, salvo escolha explícita.
+os.environ.setdefault('PI5_DATABASE_BACKEND', 'memoria')
+
+from sqlalchemy import event, select, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+import tabulate
+
+import database
+import pessoa
+import info as mod_info
+import funcionario as mod_funcionario
+import cliente as mod_cliente
+import produto as mod_produto
+import servico as mod_servico
+import suprimento as mod_suprimento
+import maquina as mod_maquina
+import fornecedor as mod_fornecedor
+import agenda as mod_agenda
+import venda as mod_venda
+import despesa as mod_despesa
+import paginacao
+import busca_nomes
+import documentos
+
+# --- Infraestrutura comum aos cenários ---
+
+class ContadorConsultas:
+    def __init__(self, engine: Engine):
+        self.total = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *_args) -> None:
+        self.total += 1
+
+    def zerar(self) -> None:
+        self.total = 0
+
+# Por padrão cada cenário roda num SQLite em memória; PI5_BENCHMARK_DATABASE_URL
+# aponta os mesmos cenários para outro backend (arquivo SQLite, MySQL...).
+# Bancos persistentes são recriados do zero a cada sessão.
+def _criar_sessao_benchmark() -> tuple[Session, ContadorConsultas]:
+    engine = database.criar_engine(os.environ.get('PI5_BENCHMARK_DATABASE_URL', "sqlite://"))
+    if engine.url.database not in (None, '', ':memory:'):
+        database.Base.metadata.drop_all(bind=engine)
+    database.Base.metadata.create_all(bind=engine)
+    return Session(bind=engine, autoflush=False), ContadorConsultas(engine)
+
+def _medir(contador: ContadorConsultas, funcao: Callable[[], object]) -> tuple[float, int]:
+    contador.zerar()
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio, contador.total
+
+def _cpfs_unicos(quantidade: int) -> list[str]:
+    return documentos.gerar_cpfs_validos(quantidade)
+
+def _popular_cadastros(db: Session, num_pessoas: int = 50, num_itens: int = 50) -> dict[str, list]:
+    contato = mod_info.Informacao("11999990000", "bench@teste.com", "Rua Bench, 1", "")
+    cpfs = _cpfs_unicos(num_pessoas * 2)
+    funcionarios = [
+        mod_funcionario.Funcionario(f"Funcionario Bench {i}", date(1990, 1, 1), cpfs[i], f"CTPS{i}",
+                                    contato, 2500.0, date(2020, 1, 1))
+        for i in range(num_pessoas)
+    ]
+    clientes = [
+        mod_cliente.Cliente(f"Cliente Bench {i}", date(1995, 1, 1), cpfs[num_pessoas + i], contato)
+        for i in range(num_pessoas)
+    ]
+    produtos = [mod_produto.Produto(f"Produto Bench {i}", 10.0 + i, 1_000_000.0) for i in range(num_itens)]
+    servicos = [mod_servico.Servico(f"Servico Bench {i}", 50.0 + i, 20.0 + i) for i in range(num_itens)]
+    db.add_all(funcionarios + clientes + produtos + servicos)
+    db.commit()
+    return {'funcionarios': funcionarios, 'clientes': clientes, 'produtos': produtos, 'servicos': servicos}
+
+def _popular_vendas(db: Session, cadastros: dict[str, list], num_vendas: int, fracao_com_agenda: float = 0.1) -> None:
+    ids_funcionarios = [f.id for f in cadastros['funcionarios']]
+    ids_clientes = [c.id for c in cadastros['clientes']]
+    itens_disponiveis = [('Produto', p.id, p.preco) for p in cadastros['produtos']] + \
+                        [('Servico', s.id, s.valor_venda) for s in cadastros['servicos']]
+    data_base = date(2024, 1, 1)
+
+    agendas, agenda_itens, vendas, venda_itens = [], [], [], []
+    for id_venda in range(1, num_vendas + 1):
+        id_funcionario = random.choice(ids_funcionarios)
+        id_cliente = random.choice(ids_clientes)
+        data_venda = data_base + timedelta(days=random.randint(0, 364))
+        total = 0.0
+
+        id_agenda = None
+        if random.random() < fracao_com_agenda:
+            id_agenda = len(agendas) + 1
+            item_tipo, item_id, preco = random.choice(itens_disponiveis)
+            inicio = datetime.combine(data_venda, datetime.min.time()) + timedelta(hours=9)
+            agendas.append({
+                'id': id_agenda, 'data_hora_inicio': inicio, 'data_hora_fim': inicio + timedelta(hours=1),
+                'status': mod_agenda.AgendaStatus.REALIZADO, 'valor_total': preco,
+                'funcionario_id': id_funcionario, 'cliente_id': id_cliente
+            })
+            agenda_itens.append({'agenda_id': id_agenda, 'item_tipo': item_tipo, 'item_id': item_id,
+                                 'quantidade': 1.0, 'valor_negociado': preco})
+            total += preco
+
+        for _ in range(random.randint(1, 3)):
+            item_tipo, item_id, preco = random.choice(itens_disponiveis)
+            quantidade = float(random.randint(1, 3))
+            venda_itens.append({'venda_id': id_venda, 'item_tipo': item_tipo, 'item_id': item_id,
+                                'quantidade': quantidade, 'preco_unitario_vendido': preco})
+            total += quantidade * preco
+
+        vendas.append({'id': id_venda, 'data_venda': data_venda, 'valor_total': total,
+                       'funcionario_id': id_funcionario, 'cliente_id': id_cliente, 'agenda_id': id_agenda})
+
+    if agendas:
+        db.execute(mod_agenda.Agenda.__table__.insert(), agendas)
+        db.execute(database.agenda_itens_tabela.insert(), agenda_itens)
+    db.execute(mod_venda.Venda.__table__.insert(), vendas)
+    db.execute(database.venda_itens_tabela.insert(), venda_itens)
+    db.commit()
+
+def _imprimir_resultados(titulo: str, cabecalhos: list[str], linhas: list[list]) -> None:
+    print(f"\n--- {titulo} ---")
+    print(tabulate.tabulate(linhas, headers=cabecalhos, tablefmt="grid"))
+
+# --- Cenário: relatório de vendas ---
+
+# Reprodução do formatador antigo (uma consulta por venda, por item e por
+# relacionamento), mantida apenas como referência de comparação.
+def _formatar_vendas_legado(db: Session, vendas: list) -> str:
+    dados_tabela = []
+    for venda in vendas:
+        itens_str_list = []
+        itens_avulsos = db.execute(database.venda_itens_tabela.select().where(database.venda_itens_tabela.c.venda_id == venda.id)).fetchall()
+        for item in itens_avulsos:
+            nome_item = ""
+            if item.item_tipo == 'Produto':
+                prod = mod_produto.buscar_produto_id(db, item.item_id)
+                if prod: nome_item = prod.nome
+            elif item.item_tipo == 'Servico':
+                serv = mod_servico.buscar_servico_id(db, item.item_id)
+                if serv: nome_item = serv.nome
+            itens_str_list.append(f"{item.quantidade}x {nome_item}")
+        if venda.agenda:
+            itens_da_agenda = db.execute(database.agenda_itens_tabela.select().where(database.agenda_itens_tabela.c.agenda_id == venda.agenda_id)).fetchall()
+            for item_agenda in itens_da_agenda:
+                if item_agenda.item_tipo == 'Produto':
+                    mod_produto.buscar_produto_id(db, item_agenda.item_id)
+                elif item_agenda.item_tipo == 'Servico':
+                    mod_servico.buscar_servico_id(db, item_agenda.item_id)
+        dados_tabela.append([venda.id, venda.funcionario.nome, venda.cliente.nome, ", ".join(itens_str_list)])
+    return tabulate.tabulate(dados_tabela, tablefmt="grid")
+
+def benchmark_relatorio_vendas(escalas: list[int]) -> None:
+    linhas = []
+    for escala in escalas:
+        db, contador = _criar_sessao_benchmark()
+        _popular_vendas(db, _popular_cadastros(db), escala)
+
+        for nome_caminho, formatador in (("legado (N+1)", _formatar_vendas_legado),
+                                         ("em lote", mod_venda._formatar_vendas_para_tabela)):
+            db.expunge_all()
+            vendas = mod_venda.listar_vendas(db)
+            duracao, consultas = _medir(contador, lambda: formatador(db, vendas))
+            linhas.append([f"{escala:,}", nome_caminho, consultas, f"{duracao:.3f}"])
+        db.close()
+
+    _imprimir_resultados("Relatório de Vendas (_formatar_vendas_para_tabela)",
+                         ["Vendas", "Caminho", "Consultas", "Tempo (s)"], linhas)
+
+# --- Cenário: importação de vendas em lote ---
+
+def _montar_vendas_importadas(cadastros: dict[str, list], quantidade: int) -> list[mod_venda.VendaEmLote]:
+    itens_disponiveis = cadastros['produtos'] + cadastros['servicos']
+    return [
+        mod_venda.VendaEmLote(
+            random.choice(cadastros['funcionarios']), random.choice(cadastros['clientes']),
+            date(2024, 1, 1) + timedelta(days=random.randint(0, 364)),
+            [mod_venda.ItemVenda(random.choice(itens_disponiveis), random.randint(1, 3)) for _ in range(random.randint(1, 3))]
+        )
+        for _ in range(quantidade)
+    ]
+
+def benchmark_vendas_em_lote(escalas: list[int]) -> None:
+    linhas = []
+    for escala in escalas:
+        for nome_caminho in ("criar_venda (uma por vez)", "criar_vendas_em_lote"):
+            db, contador = _criar_sessao_benchmark()
+            cadastros = _popular_cadastros(db)
+            vendas_importadas = _montar_vendas_importadas(cadastros, escala)
+            if nome_caminho == "criar_vendas_em_lote":
+                duracao, consultas = _medir(contador, lambda: mod_venda.criar_vendas_em_lote(db, vendas_importadas))
+            else:
+                duracao, consultas = _medir(contador, lambda: [
+                    mod_venda.criar_venda(db, v.funcionario_obj, v.cliente_obj, v.data_venda_obj, v.itens_venda)
+                    for v in vendas_importadas
+                ])
+            linhas.append([f"{escala:,}", nome_caminho, consultas, f"{duracao:.3f}"])
+            db.close()
+
+    _imprimir_resultados("Importação de Vendas", ["Vendas", "Caminho", "Consultas", "Tempo (s)"], linhas)
+
+# --- Cenário: consumo dos suprimentos da agenda na venda ---
+
+NUM_AGENDAS_CONSUMO = 20
+
+def _consumir_suprimentos_legado(db: Session, venda: mod_venda.Venda) -> None:
+    # Caminho antigo de criar_venda: uma busca e um UPDATE por suprimento.
+    suprimentos_da_agenda = db.execute(
+        database.agenda_suprimentos_tabela.select().where(database.agenda_suprimentos_tabela.c.agenda_id == venda.agenda_id)
+    ).fetchall()
+    for sup_agendado in suprimentos_da_agenda:
+        suprimento_db = mod_suprimento.buscar_suprimento_id(db, sup_agendado.suprimento_id)
+        if suprimento_db:
+            suprimento_db.estoque = max(suprimento_db.estoque - sup_agendado.quantidade, 0.0)
+            db.add(suprimento_db)
+    db.flush()
+
+def _popular_agendas_com_suprimentos(db: Session, cadastros: dict[str, list], suprimentos_por_agenda: int) -> list[mod_venda.Venda]:
+    # Metade dos suprimentos fica sem estoque para exercitar as faltas.
+    suprimentos = [mod_suprimento.Suprimento(f"Suprimento Bench {i}", "un", 1.0, 0.0 if i % 2 else 1_000.0)
+                   for i in range(suprimentos_por_agenda)]
+    db.add_all(suprimentos)
+    db.commit()
+    vendas = []
+    for i in range(NUM_AGENDAS_CONSUMO):
+        inicio = datetime(2024, 1, 1, 8) + timedelta(days=i)
+        agenda = mod_agenda.Agenda(cadastros['funcionarios'][0], cadastros['clientes'][0], inicio, inicio + timedelta(hours=1))
+        db.add(agenda)
+        db.flush()
+        db.execute(database.agenda_suprimentos_tabela.insert(),
+                   [{'agenda_id': agenda.id, 'suprimento_id': sup.id, 'quantidade': 2.0} for sup in suprimentos])
+        venda = mod_venda.Venda(cadastros['funcionarios'][0], cadastros['clientes'][0], inicio.date(), agenda_obj=agenda)
+        db.add(venda)
+        vendas.append(venda)
+    db.commit()
+    return vendas
+
+def benchmark_consumo_suprimentos(escalas: list[int]) -> None:
+    # escala = suprimentos por agenda; cada caminho consome as agendas de
+    # NUM_AGENDAS_CONSUMO vendas, uma venda por vez, como criar_venda.
+    linhas = []
+    for escala in escalas:
+        for nome_caminho in ("legado (uma busca por suprimento)", "em lote (IN + executemany)"):
+            db, contador = _criar_sessao_benchmark()
+            vendas = _popular_agendas_com_suprimentos(db, _popular_cadastros(db, num_pessoas=1, num_itens=1), escala)
+            if nome_caminho.startswith("legado"):
+                consumir = lambda venda: _consumir_suprimentos_legado(db, venda)
+            else:
+                consumir = lambda venda: mod_venda._consumir_suprimentos_das_agendas(db, {venda.agenda_id: venda})
+            def consumir_todas() -> None:
+                for venda in vendas:
+                    consumir(venda)
+                    db.commit()
+            duracao, consultas = _medir(contador, consumir_todas)
+            faltas = len(mod_venda.listar_faltas_suprimentos(db))
+            linhas.append([escala, nome_caminho, consultas, faltas, f"{duracao:.3f}"])
+            db.close()
+
+    _imprimir_resultados(f"Consumo de Suprimentos da Agenda ({NUM_AGENDAS_CONSUMO} vendas)",
+                         ["Suprimentos/Agenda", "Caminho", "Consultas", "Faltas Auditadas", "Tempo (s)"], linhas)
+
+# --- Cenário: listagem paginada ---
+
+def benchmark_paginacao_vendas(escalas: list[int]) -> None:
+    # A listagem antiga materializa a tabela inteira; OFFSET percorre as linhas
+    # já vistas; a paginação por chave lê só a página, em qualquer posição.
+    linhas = []
+    tamanho = paginacao.TAMANHO_PAGINA
+    for escala in escalas:
+        db, contador = _criar_sessao_benchmark()
+        _popular_vendas(db, _popular_cadastros(db, num_pessoas=20, num_itens=20), escala)
+        penultima = mod_venda.consultar_vendas(db).offset(max(escala - 2 * tamanho, 0)).first()
+        token_final = paginacao.codificar_token([penultima.data_venda, penultima.id])
+        caminhos = [
+            ("listar_vendas (tudo)", lambda: mod_venda.listar_vendas(db)),
+            ("OFFSET (última página)", lambda: mod_venda.consultar_vendas(db).offset(escala - tamanho).limit(tamanho).all()),
+            ("por chave (primeira página)", lambda: mod_venda.paginar_vendas(db).itens),
+            ("por chave (última página)", lambda: mod_venda.paginar_vendas(db, token=token_final).itens),
+        ]
+        for nome_caminho, listar in caminhos:
+            db.expire_all()
+            lidas = []
+            duracao, consultas = _medir(contador, lambda: lidas.extend(listar()))
+            linhas.append([f"{escala:,}", nome_caminho, consultas, len(lidas), f"{duracao:.4f}"])
+        db.close()
+
+    _imprimir_resultados("Listagem Paginada de Vendas", ["Vendas", "Caminho", "Consultas", "Linhas Lidas", "Tempo (s)"], linhas)
+
+# --- Cenário: busca de pessoas por nome ---
+
+PRIMEIROS_NOMES = ["João", "Maria", "José", "Ana", "Antônio", "Francisca", "Carlos", "Paulo", "Lúcia", "Luiz",
+                   "Márcia", "Pedro", "Sebastião", "Raimunda", "Marcos", "Sandra", "Rafael", "Letícia", "Cláudio", "Fábio"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+              "Ribeiro", "Carvalho", "Araújo", "Conceição", "Simões", "Magalhães", "Brandão", "Gonçalves", "Nogueira", "Peçanha"]
+NOME_RARO = "Wolfgang Anastácio Quaresma"
+TAMANHO_LOTE_PESSOAS = 50_000
+
+def _mascarar_cpf(cpf_limpo: str) -> str:
+    return f"{cpf_limpo[:3]}.{cpf_limpo[3:6]}.{cpf_limpo[6:9]}-{cpf_limpo[9:]}"
+
+def _popular_pessoas_em_massa(db: Session, quantidade: int) -> None:
+    # Carga direta, sem ORM, como uma importação: nome_busca fica NULL até
+    # busca_nomes.indexar_pendentes e cpf_numero até
+    # documentos.preencher_chaves_documento. Um nome raro entra a cada 100 mil.
+    pessoas, clientes = pessoa.Pessoa.__table__, mod_cliente.Cliente.__table__
+    for inicio in range(1, quantidade + 1, TAMANHO_LOTE_PESSOAS):
+        ids = range(inicio, min(inicio + TAMANHO_LOTE_PESSOAS, quantidade + 1))
+        db.execute(pessoas.insert(), [
+            {'id': i, 'nome': NOME_RARO if i % 100_000 == 1 else
+                f"{random.choice(PRIMEIROS_NOMES)} {random.choice(SOBRENOMES)} {random.choice(SOBRENOMES)}",
+             'nascimento': date(1990, 1, 1), 'cpf': _mascarar_cpf(f"{i:011d}"), 'tipo': 'cliente'}
+            for i in ids
+        ])
+        db.execute(clientes.insert(), [{'id': i} for i in ids])
+    db.commit()
+
+def _buscar_clientes_legado(db: Session, nome_parcial: str) -> list:
+    nome_lower = f"%{nome_parcial.lower().strip()}%"
+    return db.query(mod_cliente.Cliente).filter(func.lower(mod_cliente.Cliente.nome).like(nome_lower)).all()
+
+def benchmark_busca_nomes(escalas: list[int]) -> None:
+    linhas = []
+    buscas = [("wolfgang", 'infixo'), ("quaresm", 'prefixo'), ("anastacio", 'infixo'), ("volfgang anastasio", 'aproximado'),
+              ("silva", 'infixo'), ("mag", 'prefixo')]
+    for escala in escalas:
+        db, contador = _criar_sessao_benchmark()
+        _popular_pessoas_em_massa(db, escala)
+        duracao_indexacao, _ = _medir(contador, lambda: busca_nomes.indexar_pendentes(db, pessoa.Pessoa))
+        linhas.append([f"{escala:,}", "(indexação inicial)", "", "", "", f"{duracao_indexacao:.2f}"])
+        for texto, modo in buscas:
+            caminhos = [("legado (lower LIKE)", lambda: _buscar_clientes_legado(db, texto))] if modo != 'aproximado' else []
+            caminhos.append((f"trigramas ({modo})", lambda: mod_cliente.buscar_clientes_por_nome(db, texto, modo)))
+            for nome_caminho, buscar in caminhos:
+                db.expire_all()
+                encontrados = []
+                duracao, consultas = _medir(contador, lambda: encontrados.extend(buscar()))
+                linhas.append([f"{escala:,}", texto, nome_caminho, consultas, len(encontrados), f"{duracao:.4f}"])
+        db.close()
+
+    _imprimir_resultados("Busca de Clientes por Nome",
+                         ["Pessoas", "Texto", "Caminho", "Consultas", "Resultados", "Tempo (s)"], linhas)
+
+# --- Cenário: produto pelo nome ---
+
+NUM_BUSCAS_PRODUTO = 1_000
+
+def _buscar_produto_legado(db: Session, nome_produto: str):
+    return db.query(mod_produto.Produto).filter(func.lower(mod_produto.Produto._nome) == nome_produto.lower().strip()).first()
+
+def benchmark_busca_produtos(escalas: list[int]) -> None:
+    # escala = produtos cadastrados; cada caminho faz NUM_BUSCAS_PRODUTO
+    # buscas por nome, como as checagens de duplicidade de criar_produto.
+    linhas = []
+    for escala in escalas:
+        db, contador = _criar_sessao_benchmark()
+        _popular_cadastros(db, num_pessoas=1, num_itens=escala)
+        nomes = [f"  PRODUTO bench {random.randrange(escala)} " for _ in range(NUM_BUSCAS_PRODUTO)]
+        for nome_caminho, buscar in (("legado (lower(nome) = x)", _buscar_produto_legado), ("chave (nome_chave = x)", mod_produto.buscar_produto)):
+            encontrados = []
+            duracao, consultas = _medir(contador, lambda: encontrados.extend(buscar(db, nome) for nome in nomes))
+            linhas.append([f"{escala:,}", nome_caminho, consultas, sum(1 for p in encontrados if p), f"{duracao:.3f}"])
+        db.close()
+
+    _imprimir_resultados(f"Busca de Produto pelo Nome ({NUM_BUSCAS_PRODUTO} buscas)",
+                         ["Produtos", "Caminho", "Consultas", "Encontrados", "Tempo (s)"], linhas)
+
+# --- Cenário: clientes pelo CPF ---
+
+NUM_CPFS_IMPORTACAO = 5_000
+
+def _buscar_cliente_cpf_legado(db: Session, cpf: str):
+    # Caminho antigo: remonta a máscara e compara o texto.
+    return db.query(mod_cliente.Cliente).filter(mod_cliente.Cliente.cpf == _mascarar_cpf("".join(filter(str.isdigit, cpf)))).first()
+
+def benchmark_busca_documentos(escalas: list[int]) -> None:
+    # escala = clientes cadastrados; cada caminho resolve uma lista de
+    # NUM_CPFS_IMPORTACAO CPFs (metade com máscara, 10% não cadastrados),
+    # como na importação de uma lista de clientes.
+    linhas = []
+    for escala in escalas:
+        db, contador = _criar_sessao_benchmark()
+        _popular_pessoas_em_massa(db, escala)
+        duracao_preenchimento, _ = _medir(contador, lambda: documentos.preencher_chaves_documento(db, pessoa.Pessoa, 'cpf', 'cpf_numero'))
+        linhas.append([f"{escala:,}", "(preenchimento das chaves)", "", "", f"{duracao_preenchimento:.2f}"])
+        cpfs = [f"{random.randint(1, escala * 10 // 9):011d}" for _ in range(NUM_CPFS_IMPORTACAO)]
+        cpfs = [_mascarar_cpf(cpf) if posicao % 2 else cpf for posicao, cpf in enumerate(cpfs)]
+        caminhos = (
+            ("legado (um a um, cpf = máscara)", lambda: [c for c in (_buscar_cliente_cpf_legado(db, cpf) for cpf in cpfs) if c]),
+            ("chave (um a um, cpf_numero = n)", lambda: [c for c in (mod_cliente.buscar_cliente_cpf(db, cpf) for cpf in cpfs) if c]),
+            ("chave em lote (cpf_numero IN)", lambda: list(mod_cliente.buscar_clientes_por_cpfs(db, cpfs).values())),
+        )
+        for nome_caminho, buscar in caminhos:
+            db.expire_all()
+            encontrados = []
+            duracao, consultas = _medir(contador, lambda: encontrados.extend(buscar()))
+            linhas.append([f"{escala:,}", nome_caminho, consultas, len({c.id for c in encontrados}), f"{duracao:.3f}"])
+        db.close()
+
+    _imprimir_resultados(f"Busca de Clientes pelo CPF ({NUM_CPFS_IMPORTACAO} CPFs)",
+                         ["Clientes", "Caminho", "Consultas", "Encontrados", "Tempo (s)"], linhas)
+
+# --- Cenário: validação e geração de documentos em lote ---
+
+def _gerar_unicos_legado(gerar: Callable[[], str], quantidade: int) -> list[str]:
+    documentos_gerados: set[str] = set()
+    while len(documentos_gerados) < quantidade:
+        documentos_gerados.add(gerar())
+    return list(documentos_gerados)
+
+def benchmark_documentos_lote(escalas: list[int]) -> None:
+    # escala = documentos gerados e depois validados. "um a um" é o laço por
+    # documento (pessoa.gerar_*_valido, _eh_*_valido); "lote" as funções de
+    # documentos (numpy quando instalado).
+    linhas = []
+    for escala in escalas:
+        for tipo, gerar_um, gerar_lote, validar_um, validar_lote in (
+            ("CPF", pessoa.gerar_cpf_valido, documentos.gerar_cpfs_validos,
+             lambda cpf: pessoa.Pessoa._eh_cpf_valido(documentos.digitos(cpf)), documentos.validar_cpfs),
+            ("CNPJ", pessoa.gerar_cnpj_valido, documentos.gerar_cnpjs_validos,
+             lambda cnpj: mod_fornecedor.Fornecedor._eh_cnpj_valido(documentos.digitos(cnpj)), documentos.validar_cnpjs),
+        ):
+            inicio = time.perf_counter()
+            gerados = _gerar_unicos_legado(gerar_um, escala)
+            duracao_gerar_um = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            validos_um = sum(map(validar_um, gerados))
+            duracao_validar_um = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            gerados = gerar_lote(escala)
+            duracao_gerar_lote = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            validos_lote = sum(validar_lote(gerados))
+            duracao_validar_lote = time.perf_counter() - inicio
+
+            linhas.append([f"{escala:,}", tipo, "um a um", validos_um, f"{duracao_gerar_um:.3f}", f"{duracao_validar_um:.3f}"])
+            linhas.append([f"{escala:,}", tipo, "lote", validos_lote, f"{duracao_gerar_lote:.3f}", f"{duracao_validar_lote:.3f}"])
+
+    _imprimir_resultados("Validação e Geração de CPF/CNPJ",
+                         ["Documentos", "Tipo", "Caminho", "Válidos", "Gerar (s)", "Validar (s)"], linhas)
+
+# --- Cenário: vendas concorrentes do mesmo produto ---
+
+THREADS_CONCORRENCIA = 8
+
+def _criar_engine_concorrencia() -> Engine:
+    # As threads precisam de conexões próprias: o SQLite em memória (uma única
+    # conexão compartilhada) é trocado por um arquivo temporário.
+    url = os.environ.get('PI5_BENCHMARK_DATABASE_URL')
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="pi5_concorrencia_"), "estoque.db")
+    engine = database.criar_engine(url, 'relatorio')
+    if engine.url.database not in (None, '', ':memory:'):
+        database.Base.metadata.drop_all(bind=engine)
+    database.Base.metadata.create_all(bind=engine)
+    return engine
+
+def _vender_legado(db: Session, funcionario, cliente, produto, quantidade: float) -> None:
+    # Caminho antigo: confere e baixa o saldo de um objeto já carregado.
+    if produto.estoque < quantidade:
+        raise ValueError(f"Estoque insuficiente para o produto '{produto.nome}'.")
+    venda = mod_venda.Venda(funcionario_obj=funcionario, cliente_obj=cliente, data_venda=date.today())
+    venda.valor_total = quantidade * produto.preco
+    db.add(venda)
+    produto.estoque -= quantidade
+    db.commit()
+
+def _disparar_vendas_concorrentes(engine: Engine, ids: dict[str, int], tentativas: int, legado: bool) -> dict[str, int]:
+    contagem = {'vendas': 0, 'rejeitadas': 0, 'erros': 0}
+    trava_contagem = threading.Lock()
+    largada = threading.Barrier(THREADS_CONCORRENCIA)
+
+    def vendedor(tentativas_da_thread: int) -> None:
+        with Session(bind=engine, autoflush=False) as db:
+            funcionario = db.get(mod_funcionario.Funcionario, ids['funcionario'])
+            cliente = db.get(mod_cliente.Cliente, ids['cliente'])
+            largada.wait()
+            for _ in range(tentativas_da_thread):
+                # Cada tentativa relê o produto, como uma nova ação no menu.
+                produto = db.get(mod_produto.Produto, ids['produto'], populate_existing=True)
+                try:
+                    if legado:
+                        _vender_legado(db, funcionario, cliente, produto, 1)
+                    else:
+                        mod_venda.criar_venda(db, funcionario, cliente, date.today(), [mod_venda.ItemVenda(produto, 1)])
+                    resultado = 'vendas'
+                except ValueError:
+                    resultado = 'rejeitadas'
+                except Exception:
+                    db.rollback()
+                    resultado = 'erros'
+                with trava_contagem:
+                    contagem[resultado] += 1
+
+    por_thread = [tentativas // THREADS_CONCORRENCIA + (i < tentativas % THREADS_CONCORRENCIA) for i in range(THREADS_CONCORRENCIA)]
+    threads = [threading.Thread(target=vendedor, args=(quantidade,)) for quantidade in por_thread]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return contagem
+
+def benchmark_concorrencia_estoque(escalas: list[int]) -> None:
+    # escala = tentativas de venda de 1 unidade; o estoque inicial cobre só
+    # metade delas. Sobrevenda = vendas registradas além do estoque inicial.
+    linhas = []
+    for escala in escalas:
+        estoque_inicial = escala // 2
+        for nome_caminho, legado in (("legado (confere e baixa no Python)", True), ("UPDATE condicional", False)):
+            engine = _criar_engine_concorrencia()
+            with Session(bind=engine, autoflush=False) as db:
+                cadastros = _popular_cadastros(db, num_pessoas=2, num_itens=1)
+                produto = cadastros['produtos'][0]
+                produto.estoque = estoque_inicial
+                db.commit()
+                ids = {'produto': produto.id, 'funcionario': cadastros['funcionarios'][0].id, 'cliente': cadastros['clientes'][0].id}
+
+            inicio = time.perf_counter()
+            contagem = _disparar_vendas_concorrentes(engine, ids, escala, legado)
+            duracao = time.perf_counter() - inicio
+
+            with Session(bind=engine) as db:
+                vendas_gravadas = db.execute(select(func.count()).select_from(mod_venda.Venda.__table__)).scalar_one()
+                estoque_final = db.get(mod_produto.Produto, ids['produto']).estoque
+            sobrevenda = max(vendas_gravadas - estoque_inicial, 0)
+            if not legado:
+                assert sobrevenda == 0 and estoque_final == estoque_inicial - vendas_gravadas, \
+                    f"Sobrevenda: {vendas_gravadas} vendas para {estoque_inicial} unidades, estoque final {estoque_final}"
+            linhas.append([f"{escala:,}", nome_caminho, THREADS_CONCORRENCIA, vendas_gravadas, contagem['rejeitadas'], contagem['erros'],
+                           f"{estoque_final:.0f}", sobrevenda, f"{escala / duracao:.0f}"])
+            engine.dispose()
+
+    _imprimir_resultados("Vendas Concorrentes do Mesmo Produto",
+                         ["Tentativas", "Caminho", "Threads", "Vendas", "Rejeitadas", "Erros", "Estoque Final", "Sobrevenda", "Tentativas/s"], linhas)
+
+CENARIOS: dict[str, Callable[[list[int]], None]] = {
+    'relatorio_vendas': benchmark_relatorio_vendas,
+    'vendas_em_lote': benchmark_vendas_em_lote,
+    'concorrencia_estoque': benchmark_concorrencia_estoque,
+    'consumo_suprimentos': benchmark_consumo_suprimentos,
+    'paginacao_vendas': benchmark_paginacao_vendas,
+    'busca_nomes': benchmark_busca_nomes,
+    'busca_produtos': benchmark_busca_produtos,
+    'busca_documentos': benchmark_busca_documentos,
+    'documentos_lote': benchmark_documentos_lote,
+}
+
+ESCALAS_PADRAO = [1_000, 10_000, 100_000]
+
+# Uso: python run_benchmarks.py [cenario] [escala ...]
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    cenarios_escolhidos = [argumentos.pop(0)] if argumentos and argumentos[0] in CENARIOS else list(CENARIOS)
+    escalas_escolhidas = [int(valor) for valor in argumentos] or ESCALAS_PADRAO
+    for nome_cenario in cenarios_escolhidos:
+        CENARIOS[nome_cenario](escalas_escolhidas)
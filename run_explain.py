@@ -0,0 +1,155 @@
+import os
+import sys
+import random
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+# Como em run_benchmarks: o banco analisado é criado pelos cenários.
+os.environ.setdefault('PI5_DATABASE_BACKEND', 'memoria')
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import tabulate
+
+import database
+import info as mod_info
+import agenda as mod_agenda
+import venda as mod_venda
+import despesa as mod_despesa
+import maquina as mod_maquina
+import fornecedor as mod_fornecedor
+from disponibilidade import obter_indice_maquinas, buscar_agendas_sobrepostas
+from run_benchmarks import _criar_sessao_benchmark, _popular_cadastros, _popular_vendas
+
+# Roda EXPLAIN sobre cada consulta emitida pelas funções de listagem, com um
+# volume de dados realista, e aponta as que varrem a tabela inteira.
+
+class CapturadorConsultas:
+    def __init__(self, engine):
+        self.consultas: list[tuple[str, object]] = []
+        self.ativo = False
+        event.listen(engine, "before_cursor_execute", self._capturar)
+
+    def _capturar(self, _conn, _cursor, statement, parameters, _context, executemany) -> None:
+        if self.ativo and not executemany and statement.lstrip().upper().startswith("SELECT"):
+            self.consultas.append((statement, parameters))
+
+    def executar(self, funcao: Callable[[], object]) -> list[tuple[str, object]]:
+        self.consultas = []
+        self.ativo = True
+        try:
+            funcao()
+        finally:
+            self.ativo = False
+        # Carregamentos por PK (ex: subclasses de Despesa) repetem o mesmo texto.
+        unicas: dict[str, object] = {}
+        for statement, parametros in self.consultas:
+            unicas.setdefault(statement, parametros)
+        return list(unicas.items())
+
+def _popular_agendas_e_despesas(db: Session, cadastros: dict[str, list], num_despesas: int) -> None:
+    contato = mod_info.Informacao("11999990000", "explain@teste.com", "Rua Explain, 1", "")
+    fornecedor = mod_fornecedor.Fornecedor("Fornecedor Explain", "11.222.333/0001-81", contato)
+    maquinas = [mod_maquina.Maquina(f"Maquina Explain {i}", f"SERIE-EXPLAIN-{i}", 1000.0, mod_maquina.StatusMaquina.OPERANDO)
+                for i in range(10)]
+    db.add_all([fornecedor] + maquinas)
+    db.commit()
+
+    ids_agendas = [id_agenda for (id_agenda,) in db.query(mod_agenda.Agenda.id)]
+    db.execute(database.agenda_maquinas_tabela.insert(),
+               [{'agenda_id': id_agenda, 'maquina_id': random.choice(maquinas).id} for id_agenda in ids_agendas])
+
+    ids_funcionarios = [f.id for f in cadastros['funcionarios']]
+    despesas, salarios, fixos = [], [], []
+    for id_despesa in range(1, num_despesas + 1):
+        data_despesa = date(2024, 1, 1) + timedelta(days=random.randint(0, 364))
+        if id_despesa % 2:
+            despesas.append({'id': id_despesa, 'valor_total': 2000.0, 'data_despesa': data_despesa, 'tipo': 'salario'})
+            salarios.append({'id': id_despesa, 'salario_bruto': 2500.0, 'descontos': 500.0,
+                             'funcionario_id': random.choice(ids_funcionarios)})
+        else:
+            despesas.append({'id': id_despesa, 'valor_total': 300.0, 'data_despesa': data_despesa, 'tipo': 'fixo_terceiro'})
+            fixos.append({'id': id_despesa, 'tipo_despesa_str': "Aluguel", 'fornecedor_id': fornecedor.id})
+    db.execute(mod_despesa.Despesa.__table__.insert(), despesas)
+    db.execute(mod_despesa.Salario.__table__.insert(), salarios)
+    db.execute(mod_despesa.FixoTerceiro.__table__.insert(), fixos)
+    db.commit()
+
+def _montar_casos(db: Session, cadastros: dict[str, list]) -> dict[str, Callable[[], object]]:
+    inicio, fim = date(2024, 3, 1), date(2024, 3, 31)
+    id_cliente = cadastros['clientes'][0].id
+    id_funcionario = cadastros['funcionarios'][0].id
+    id_maquina = db.query(mod_maquina.Maquina.id).first()[0]
+    id_fornecedor = db.query(mod_fornecedor.Fornecedor.id).first()[0]
+    ids_vendas = [id_venda for (id_venda,) in db.query(mod_venda.Venda.id).limit(200)]
+    ids_agendas = [id_agenda for (id_agenda,) in db.query(mod_agenda.Agenda.id).limit(200)]
+    return {
+        "listar_vendas()": lambda: mod_venda.listar_vendas(db),
+        "listar_vendas(período)": lambda: mod_venda.listar_vendas(db, data_inicio=inicio, data_fim=fim),
+        "listar_vendas(cliente)": lambda: mod_venda.listar_vendas(db, cliente_id=id_cliente),
+        "listar_vendas(funcionário, período)": lambda: mod_venda.listar_vendas(db, data_inicio=inicio, data_fim=fim, funcionario_id=id_funcionario),
+        "itens das vendas": lambda: database.agrupar_linhas_por(db, database.venda_itens_tabela, 'venda_id', ids_vendas),
+        "listar_agendas(período)": lambda: mod_agenda.listar_agendas(db, data_inicio=datetime.combine(inicio, datetime.min.time()),
+                                                                    data_fim=datetime.combine(fim, datetime.max.time())),
+        "listar_agendas(cliente)": lambda: mod_agenda.listar_agendas(db, cliente_id=id_cliente),
+        "listar_agendas(funcionário)": lambda: mod_agenda.listar_agendas(db, funcionario_id=id_funcionario),
+        "itens das agendas": lambda: database.agrupar_linhas_por(db, database.agenda_itens_tabela, 'agenda_id', ids_agendas),
+        "suprimentos das agendas": lambda: database.agrupar_linhas_por(db, database.agenda_suprimentos_tabela, 'agenda_id', ids_agendas),
+        # Depois da carga (leitura única de agendas + agenda_maquinas) a
+        # verificação de conflito não vai mais ao banco.
+        "verificar_conflito_maquina (carga do índice)": lambda: (
+            obter_indice_maquinas(db).invalidar(),
+            mod_agenda.verificar_conflito_maquina(db, id_maquina, datetime(2024, 3, 10, 9), datetime(2024, 3, 10, 10))),
+        "conflito de funcionário/cliente": lambda: buscar_agendas_sobrepostas(
+            db, datetime(2024, 3, 10, 9), datetime(2024, 3, 10, 10), funcionario_id=id_funcionario, cliente_id=id_cliente),
+        "listar_despesas(período)": lambda: mod_despesa.listar_despesas(db, data_inicio=inicio, data_fim=fim),
+        "listar_despesas(tipos)": lambda: mod_despesa.listar_despesas(db, tipos=['salario']),
+        "listar_despesas(funcionário)": lambda: mod_despesa.listar_despesas(db, funcionario_id=id_funcionario),
+        "listar_despesas(fornecedor)": lambda: mod_despesa.listar_despesas(db, fornecedor_id=id_fornecedor),
+    }
+
+# Devolve (detalhes do plano, varre tabela inteira?, ordena fora do índice?).
+def _analisar_plano(db: Session, statement: str, parametros: object) -> tuple[list[str], bool, bool]:
+    conexao = db.connection()
+    if conexao.dialect.name == 'sqlite':
+        linhas = conexao.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parametros).fetchall()
+        detalhes = [linha[3] for linha in linhas]
+        # Percorrer o resultado de uma subconsulta (CO-ROUTINE/MATERIALIZE) não
+        # é varrer uma tabela do banco.
+        subconsultas = {d.split()[1] for d in detalhes if d.startswith(("CO-ROUTINE ", "MATERIALIZE "))}
+        varredura = any(d.startswith("SCAN ") and "USING" not in d and "CONSTANT ROW" not in d
+                        and d.split()[1] not in subconsultas for d in detalhes)
+        ordenacao = any("TEMP B-TREE" in d for d in detalhes)
+    else:
+        linhas = conexao.exec_driver_sql("EXPLAIN " + statement, parametros).mappings().fetchall()
+        detalhes = [f"{linha['table']}: {linha['type']} {linha['key'] or ''} {linha['Extra'] or ''}".strip() for linha in linhas]
+        varredura = any(linha['type'] == 'ALL' for linha in linhas)
+        ordenacao = any('filesort' in (linha['Extra'] or '') for linha in linhas)
+    return detalhes, varredura, ordenacao
+
+def verificar_planos(num_vendas: int) -> int:
+    db, contador = _criar_sessao_benchmark()
+    cadastros = _popular_cadastros(db)
+    _popular_vendas(db, cadastros, num_vendas)
+    _popular_agendas_e_despesas(db, cadastros, num_vendas // 2)
+    capturador = CapturadorConsultas(db.get_bind())
+
+    linhas, total_varreduras = [], 0
+    for nome_caso, funcao in _montar_casos(db, cadastros).items():
+        for statement, parametros in capturador.executar(funcao):
+            detalhes, varredura, ordenacao = _analisar_plano(db, statement, parametros)
+            total_varreduras += varredura
+            linhas.append([nome_caso, "VARREDURA" if varredura else "ok", "sim" if ordenacao else "", "\n".join(detalhes)])
+        db.expunge_all()
+    db.close()
+
+    print(f"\n--- Planos de Consulta ({num_vendas:,} vendas) ---")
+    print(tabulate.tabulate(linhas, headers=["Caso", "Resultado", "Ordenação extra", "Plano"], tablefmt="grid"))
+    print(f"\nConsultas com varredura completa: {total_varreduras}")
+    return total_varreduras
+
+# Uso: python run_explain.py [num_vendas]
+# Com PI5_BENCHMARK_DATABASE_URL o mesmo teste roda contra outro backend.
+if __name__ == "__main__":
+    num_vendas_escolhido = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    sys.exit(1 if verificar_planos(num_vendas_escolhido) else 0)
@@ -1,15 +1,20 @@
-from sqlalchemy import Column, Integer, String, Float, func
+from sqlalchemy import Column, Integer, String, Float
 from sqlalchemy.orm import Session, synonym
 from tabulate import tabulate
 from typing import Optional, Any
 
 from database import Base
+import busca_nomes as mod_busca
+from paginacao import Pagina, paginar_consulta, TAMANHO_PAGINA
 
 class Servico(Base):
     __tablename__ = 'servicos'
 
     id = Column(Integer, primary_key=True, index=True)
     _nome = Column("nome", String(255), unique=True, index=True, nullable=False)
+    # Nome sem maiúsculas, acentos nem espaços extras; a unicidade e as buscas
+    # por nome usam esta coluna (ver busca_nomes.chave_unica_nome).
+    _nome_chave = Column("nome_chave", String(255), unique=True, index=True, nullable=True)
     _valor_venda = Column("valor_venda", Float, nullable=False)
     _custo = Column("custo", Float, nullable=False)
 
@@ -28,7 +33,7 @@ class Servico(Base):
 
     nome = synonym('_nome', descriptor=property(
         lambda self: self._nome,
-        lambda self, nome_str: setattr(self, '_nome', self._validar_nome(nome_str))
+        lambda self, nome_str: self._atribuir_nome(nome_str)
     ))
 
     valor_venda = synonym('_valor_venda', descriptor=property(
@@ -41,6 +46,10 @@ class Servico(Base):
         lambda self, valor: setattr(self, '_custo', self._validar_custo(valor))
     ))
 
+    def _atribuir_nome(self, nome_str: str) -> None:
+        self._nome = self._validar_nome(nome_str)
+        self._nome_chave = mod_busca.chave_unica_nome(self._nome)
+
     def _validar_nome(self, nome_str: str) -> str:
         nome_limpo = nome_str.strip()
         if not nome_limpo:
@@ -70,8 +79,7 @@ class Servico(Base):
         return valor_num
 
 def buscar_servico(db: Session, nome_servico: str) -> Optional[Servico]:
-    nome_busca_lower = nome_servico.lower().strip()
-    return db.query(Servico).filter(func.lower(Servico.nome) == nome_busca_lower).first()
+    return db.query(Servico).filter(Servico._nome_chave == mod_busca.chave_unica_nome(nome_servico)).first()
 
 def buscar_servico_id(db: Session, id_servico: int) -> Optional[Servico]:
     return db.query(Servico).filter(Servico.id == id_servico).first()
@@ -79,6 +87,9 @@ def buscar_servico_id(db: Session, id_servico: int) -> Optional[Servico]:
 def listar_servicos(db: Session) -> list[Servico]:
     return db.query(Servico).order_by(Servico.id).all()
 
+def paginar_servicos(db: Session, token: Optional[str] = None, tamanho_pagina: int = TAMANHO_PAGINA) -> Pagina:
+    return paginar_consulta(db.query(Servico), [Servico.id], token, tamanho_pagina)
+
 def criar_servico(db: Session, nome: str, valor_venda: float, custo: float) -> Servico:
     servico_existente = buscar_servico(db, nome)
     if servico_existente:
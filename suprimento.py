@@ -1,19 +1,27 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, func
+from sqlalchemy import Column, Integer, String, Float, JSON
 from sqlalchemy.orm import Session, synonym
 from tabulate import tabulate
 from typing import Optional, Any
-from datetime import datetime
 
 from database import Base
+import historico_custos as mod_historico
+import movimentos_estoque as mod_movimentos
+import busca_nomes as mod_busca
+from paginacao import Pagina, paginar_consulta, TAMANHO_PAGINA
 
 class Suprimento(Base):
     __tablename__ = 'suprimentos'
 
     id = Column(Integer, primary_key=True, index=True)
     _nome = Column("nome", String(255), unique=True, index=True, nullable=False)
+    # Nome sem maiúsculas, acentos nem espaços extras; a unicidade e as buscas
+    # por nome usam esta coluna (ver busca_nomes.chave_unica_nome).
+    _nome_chave = Column("nome_chave", String(255), unique=True, index=True, nullable=True)
     _unidade_medida = Column("unidade_medida", String(50), nullable=False)
     _custo_unitario = Column("custo_unitario", Float, nullable=False)
     _estoque = Column("estoque", Float, nullable=False)
+    # Legado: o histórico agora fica em historico_custos; a coluna só é lida
+    # por historico_custos.migrar_historico_json.
     _historico_custo_compra = Column("historico_custo_compra", JSON, nullable=True)
 
     def __init__(self, nome: str, unidade_medida: str, custo_unitario: float, estoque: float, **kwargs):
@@ -21,11 +29,12 @@ class Suprimento(Base):
         self.unidade_medida = unidade_medida
         self.custo_unitario = custo_unitario
         self.estoque = estoque
-        self.historico_custo_compra = kwargs.get('historico_custo_compra', [])
+        if 'historico_custo_compra' in kwargs:
+            self.historico_custo_compra = kwargs['historico_custo_compra']
 
     nome = synonym('_nome', descriptor=property(
         lambda self: self._nome,
-        lambda self, valor: setattr(self, '_nome', self._validar_string_nao_vazia(valor))
+        lambda self, valor: self._atribuir_nome(valor)
     ))
 
     unidade_medida = synonym('_unidade_medida', descriptor=property(
@@ -48,6 +57,10 @@ class Suprimento(Base):
         lambda self, valor: setattr(self, '_historico_custo_compra', valor)
     ))
 
+    def _atribuir_nome(self, nome_str: str) -> None:
+        self._nome = self._validar_string_nao_vazia(nome_str)
+        self._nome_chave = mod_busca.chave_unica_nome(self._nome)
+
     def _validar_string_nao_vazia(self, valor_str: str) -> str:
         valor_limpo = valor_str.strip()
         if not valor_limpo:
@@ -68,16 +81,21 @@ def buscar_suprimento_id(db: Session, id_suprimento: int) -> Optional[Suprimento
     return db.query(Suprimento).filter(Suprimento.id == id_suprimento).first()
 
 def buscar_suprimento_nome(db: Session, nome_suprimento: str) -> Optional[Suprimento]:
-    return db.query(Suprimento).filter(func.lower(Suprimento._nome) == nome_suprimento.lower().strip()).first()
+    return db.query(Suprimento).filter(Suprimento._nome_chave == mod_busca.chave_unica_nome(nome_suprimento)).first()
 
 def listar_suprimentos(db: Session) -> list[Suprimento]:
     return db.query(Suprimento).order_by(Suprimento.id).all()
 
+def paginar_suprimentos(db: Session, token: Optional[str] = None, tamanho_pagina: int = TAMANHO_PAGINA) -> Pagina:
+    return paginar_consulta(db.query(Suprimento), [Suprimento.id], token, tamanho_pagina)
+
 def criar_suprimento(db: Session, nome: str, unidade_medida: str, custo_unitario: float, estoque: float) -> Suprimento:
     if buscar_suprimento_nome(db, nome):
         raise ValueError(f"Suprimento com nome '{nome}' já existe.")
     novo_suprimento = Suprimento(nome=nome, unidade_medida=unidade_medida, custo_unitario=custo_unitario, estoque=estoque)
     db.add(novo_suprimento)
+    db.flush()
+    mod_movimentos.registrar_ajuste(db, 'Suprimento', novo_suprimento.id, novo_suprimento.estoque)
     db.commit()
     db.refresh(novo_suprimento)
     return novo_suprimento
@@ -90,8 +108,10 @@ def atualizar_dados_suprimento(db: Session, id_suprimento: int, **kwargs: Any) -
         conflito = buscar_suprimento_nome(db, kwargs['nome'])
         if conflito and conflito.id != id_suprimento:
             raise ValueError(f"Outro suprimento já usa o nome '{kwargs['nome']}'.")
+    estoque_anterior = suprimento_existente.estoque
     for chave, valor in kwargs.items():
         setattr(suprimento_existente, chave, valor)
+    mod_movimentos.registrar_ajuste(db, 'Suprimento', id_suprimento, suprimento_existente.estoque - estoque_anterior)
     db.commit()
     db.refresh(suprimento_existente)
     return suprimento_existente
@@ -112,19 +132,23 @@ def _formatar_suprimentos_para_tabela(db: Session, suprimentos: list[Suprimento]
         ])
     return tabulate(dados_tabela, headers=cabecalhos, tablefmt="grid")
 
-def _formatar_historico_para_tabela(historico: list) -> str:
-    if not historico:
+def _formatar_historico_para_tabela(db: Session, id_suprimento: int, pagina: int = 1,
+                                    por_pagina: int = mod_historico.ITENS_POR_PAGINA) -> str:
+    total_registros = mod_historico.contar_historico(db, 'Suprimento', id_suprimento)
+    if not total_registros:
         return "Nenhum histórico de compras para este suprimento."
     
     cabecalhos = ["Data", "Quantidade", "Valor Unitário", "Fornecedor"]
     dados_tabela = []
 
-    for registro in historico:
+    for registro in mod_historico.listar_historico(db, 'Suprimento', id_suprimento, pagina, por_pagina):
         dados_tabela.append([
-            datetime.fromisoformat(registro["data"]).strftime("%d/%m/%Y"),
-            registro["quantidade"],
-            f"R${registro['valor_unitario']:.2f}",
-            registro.get("fornecedor_nome", "N/A")
+            registro.data_compra.strftime("%d/%m/%Y"),
+            registro.quantidade,
+            f"R${registro.valor_unitario:.2f}",
+            registro.fornecedor_nome or "N/A"
         ])
     
-    return tabulate(dados_tabela, headers=cabecalhos, tablefmt="grid")
+    total_paginas = -(-total_registros // por_pagina)
+    rodape = f"\nPágina {pagina} de {total_paginas} ({total_registros} compras)"
+    return tabulate(dados_tabela, headers=cabecalhos, tablefmt="grid") + rodape
@@ -0,0 +1,68 @@
+import pytest
+import sys
+import os
+from datetime import date
+
+# Adiciona o diretório pai (raiz do projeto) ao sys.path
+# para que os módulos da aplicação possam ser importados.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Cada teste cria o próprio banco; o engine global de database fica no
+# SQLite em memória.
+os.environ.setdefault('PI5_DATABASE_BACKEND', 'memoria')
+
+from sqlalchemy.orm import sessionmaker
+
+import database
+import info
+import pessoa
+import cliente
+import funcionario
+import produto
+import servico
+import suprimento
+import maquina
+import fornecedor
+import agenda
+import venda
+import despesa
+
+@pytest.fixture(autouse=True)
+def limpar_dados_globais():
+    # Substitui a fixture de mesmo nome do conftest da raiz, que limpa os
+    # registros em memória das classes; aqui o estado fica no banco de cada
+    # teste.
+    yield
+
+@pytest.fixture
+def engine(tmp_path):
+    # Banco em arquivo: os testes de concorrência abrem uma conexão por thread.
+    engine_teste = database.criar_engine(f"sqlite:///{tmp_path / 'pi5_teste.db'}", 'relatorio')
+    database.Base.metadata.create_all(bind=engine_teste)
+    yield engine_teste
+    engine_teste.dispose()
+
+@pytest.fixture
+def fabrica_sessoes(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def db(fabrica_sessoes):
+    with fabrica_sessoes() as sessao:
+        yield sessao
+
+@pytest.fixture
+def cadastros(db):
+    # Um cliente, um funcionário, um produto e um suprimento gravados.
+    contato = info.Informacao("11999990000", "teste@teste.com", "Rua Teste, 1", "")
+    cadastro = {
+        'cliente': cliente.Cliente("Ana Souza", date(1990, 1, 1), pessoa.gerar_cpf_valido(), contato),
+        'funcionario': funcionario.Funcionario("Beto Lima", date(1985, 5, 10), pessoa.gerar_cpf_valido(), "12345678901",
+                                               info.Informacao("11999990001", "beto@teste.com", "Rua Teste, 2", ""),
+                                               2000.0, date(2020, 1, 1)),
+        'produto': produto.Produto("Shampoo Neutro", 25.0, 10.0),
+        'suprimento': suprimento.Suprimento("Gel Fixador", "un", 5.0, 10.0),
+    }
+    db.add_all(cadastro.values())
+    db.commit()
+    return cadastro
@@ -0,0 +1,61 @@
+import pytest
+from datetime import date
+from sqlalchemy import select
+
+import busca_nomes
+import cliente
+import info
+import pessoa
+from database import trigramas_pessoas_tabela
+
+@pytest.fixture
+def clientes(db):
+    nomes = ["Conceição Araújo", "João da Silva", "Joana Siqueira", "Mariana Souza"]
+    novos = [cliente.Cliente(nome, date(1990, 1, 1), pessoa.gerar_cpf_valido(),
+                             info.Informacao(f"1199999{indice:04d}", f"cliente{indice}@teste.com", "Rua Teste, 1", ""))
+             for indice, nome in enumerate(nomes)]
+    db.add_all(novos)
+    db.commit()
+    return {novo.nome: novo for novo in novos}
+
+def _nomes(resultado) -> list[str]:
+    return [registro.nome for registro in resultado]
+
+def _trigramas_indexados(db, registro_id: int) -> set[str]:
+    t = trigramas_pessoas_tabela
+    return set(db.execute(select(t.c.trigrama).where(t.c.registro_id == registro_id)).scalars())
+
+def test_modos_de_busca(db, clientes):
+    # Testa prefixo (início de alguma palavra), infixo (qualquer ponto) e a
+    # ordem: quem começa com o texto vem antes, depois os nomes mais curtos.
+    assert _nomes(cliente.buscar_clientes_por_nome(db, "sil", 'prefixo')) == ["João da Silva"]
+    assert _nomes(cliente.buscar_clientes_por_nome(db, "ana", 'prefixo')) == []
+    assert _nomes(cliente.buscar_clientes_por_nome(db, "ana", 'infixo')) == ["Mariana Souza", "Joana Siqueira"]
+    assert _nomes(cliente.buscar_clientes_por_nome(db, "jo", 'prefixo')) == ["João da Silva", "Joana Siqueira"]
+
+def test_busca_sem_acentos_e_aproximada(db, clientes):
+    # Testa que acentos e maiúsculas não importam e que a busca aproximada
+    # encontra nomes com erro de digitação.
+    assert _nomes(cliente.buscar_clientes_por_nome(db, "CONCEICAO")) == ["Conceição Araújo"]
+    assert _nomes(cliente.buscar_clientes_por_nome(db, "joão")) == ["João da Silva"]
+    assert _nomes(cliente.buscar_clientes_por_nome(db, "Concesao Araujo", 'aproximado'))[:1] == ["Conceição Araújo"]
+    assert _nomes(cliente.buscar_clientes_por_nome(db, "Mariana Sousa", 'aproximado'))[:1] == ["Mariana Souza"]
+    assert cliente.buscar_clientes_por_nome(db, "Concesao Araujo", 'infixo') == []
+
+def test_renomear_reindexa(db, clientes):
+    # Testa que, ao renomear, o nome antigo deixa de ser encontrado e o novo
+    # passa a ser, pelos eventos do mapper.
+    renomeado = clientes["Mariana Souza"]
+    cliente.atualizar_dados_cliente(db, renomeado.id, nome="Beatriz Lopes")
+    assert cliente.buscar_clientes_por_nome(db, "mariana") == []
+    assert cliente.buscar_clientes_por_nome(db, "mariana souza", 'aproximado') == []
+    assert _nomes(cliente.buscar_clientes_por_nome(db, "lopes")) == ["Beatriz Lopes"]
+    assert _trigramas_indexados(db, renomeado.id) == busca_nomes.trigramas_do_nome("beatriz lopes")
+
+def test_excluir_remove_do_indice(db, clientes):
+    # Testa que excluir o cliente apaga os trigramas dele.
+    excluido_id = clientes["Joana Siqueira"].id
+    assert _trigramas_indexados(db, excluido_id)
+    cliente.deletar_cliente(db, excluido_id)
+    assert _trigramas_indexados(db, excluido_id) == set()
+    assert _nomes(cliente.buscar_clientes_por_nome(db, "jo", 'prefixo')) == ["João da Silva"]
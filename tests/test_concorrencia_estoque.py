@@ -0,0 +1,48 @@
+import threading
+from datetime import date
+
+import produto
+import venda
+
+def _vender_em_paralelo(fabrica_sessoes, ids: dict[str, int], tentativas: int) -> list[str]:
+    # Cada thread tem a própria sessão e espera as demais na barreira para
+    # que todas as vendas disputem o estoque ao mesmo tempo.
+    barreira = threading.Barrier(tentativas)
+    resultados: list[str] = []
+    trava = threading.Lock()
+
+    def vendedor() -> None:
+        with fabrica_sessoes() as db:
+            funcionario_obj = db.get(venda.mod_funcionario.Funcionario, ids['funcionario'])
+            cliente_obj = db.get(venda.mod_cliente.Cliente, ids['cliente'])
+            produto_obj = db.get(produto.Produto, ids['produto'])
+            barreira.wait()
+            try:
+                venda.criar_venda(db, funcionario_obj, cliente_obj, date.today(), [venda.ItemVenda(produto_obj, 1)])
+                resultado = 'vendida'
+            except ValueError as erro:
+                resultado = str(erro)
+            with trava:
+                resultados.append(resultado)
+
+    threads = [threading.Thread(target=vendedor) for _ in range(tentativas)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultados
+
+def test_vendas_concorrentes_da_ultima_unidade(db, fabrica_sessoes, cadastros):
+    # Testa que, com uma unidade em estoque, só uma de várias vendas
+    # simultâneas é registrada e o estoque termina em zero, sem ficar negativo.
+    cadastros['produto'].estoque = 1
+    db.commit()
+    ids = {nome: cadastros[nome].id for nome in ('funcionario', 'cliente', 'produto')}
+
+    resultados = _vender_em_paralelo(fabrica_sessoes, ids, tentativas=8)
+
+    assert resultados.count('vendida') == 1
+    assert all("Estoque insuficiente" in resultado for resultado in resultados if resultado != 'vendida')
+    db.expire_all()
+    assert db.get(produto.Produto, ids['produto']).estoque == 0
+    assert db.query(venda.Venda).count() == 1
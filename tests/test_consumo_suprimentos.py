@@ -0,0 +1,92 @@
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import update
+
+import agenda
+import suprimento
+import venda
+import movimentos_estoque
+
+INICIO = datetime(2030, 1, 7, 9, 0)
+
+@pytest.fixture
+def agenda_com_suprimento(db, cadastros):
+    # Agenda que reserva 8 das 10 unidades do suprimento.
+    return agenda.criar_agenda(db, cadastros['funcionario'], cadastros['cliente'], INICIO, INICIO + timedelta(hours=1),
+                               [agenda.ItemAgendado(cadastros['produto'], 1)],
+                               suprimentos_utilizados=[agenda.SuprimentoAgendado(cadastros['suprimento'], 8)])
+
+def test_venda_da_agenda_consome_suprimentos(db, cadastros, agenda_com_suprimento):
+    # Testa que a venda da agenda baixa o previsto, grava o movimento e não
+    # registra falta.
+    nova_venda = venda.criar_venda(db, cadastros['funcionario'], cadastros['cliente'], date.today(), [],
+                                   agenda_obj=agenda_com_suprimento)
+    id_suprimento = cadastros['suprimento'].id
+    assert db.get(suprimento.Suprimento, id_suprimento).estoque == 2
+    assert movimentos_estoque.somar_movimentos_da_referencia(db, 'consumo_agenda', nova_venda.id) == {('Suprimento', id_suprimento): -8}
+    assert venda.listar_faltas_suprimentos(db) == []
+    assert agenda.quantidades_reservadas(db, [id_suprimento]) == {}
+
+def test_consumo_abaixo_do_previsto_registra_falta(db, cadastros, agenda_com_suprimento):
+    # Testa que, sem estoque para tudo o que foi reservado, a venda consome o
+    # que existe, o estoque não fica negativo e a diferença vira falta.
+    id_suprimento = cadastros['suprimento'].id
+    tabela_suprimentos = suprimento.Suprimento.__table__
+    db.execute(update(tabela_suprimentos).where(tabela_suprimentos.c.id == id_suprimento).values(estoque=3))
+    db.commit()
+
+    nova_venda = venda.criar_venda(db, cadastros['funcionario'], cadastros['cliente'], date.today(), [],
+                                   agenda_obj=agenda_com_suprimento)
+    db.expire_all()
+    assert db.get(suprimento.Suprimento, id_suprimento).estoque == 0
+    assert movimentos_estoque.somar_movimentos_da_referencia(db, 'consumo_agenda', nova_venda.id) == {('Suprimento', id_suprimento): -3}
+    faltas = venda.listar_faltas_suprimentos(db)
+    assert [(falta.venda_id, falta.suprimento_id, falta.quantidade_prevista, falta.quantidade_faltante) for falta in faltas] == \
+        [(nova_venda.id, id_suprimento, 8, 5)]
+
+def test_agenda_realizada_nao_e_vendida_de_novo(db, cadastros, agenda_com_suprimento):
+    # Testa que vender outra vez uma agenda já realizada é recusado antes de
+    # qualquer baixa de produtos ou suprimentos.
+    venda.criar_venda(db, cadastros['funcionario'], cadastros['cliente'], date.today(), [], agenda_obj=agenda_com_suprimento)
+    with pytest.raises(ValueError, match=r"já foi realizada"):
+        venda.criar_venda(db, cadastros['funcionario'], cadastros['cliente'], date.today(),
+                          [venda.ItemVenda(cadastros['produto'], 1)], agenda_obj=agenda_com_suprimento)
+    db.expire_all()
+    assert db.query(venda.Venda).count() == 1
+    assert db.get(suprimento.Suprimento, cadastros['suprimento'].id).estoque == 2
+    assert db.get(venda.mod_produto.Produto, cadastros['produto'].id).estoque == 10
+
+def test_venda_em_lote_recusa_agenda_repetida(db, cadastros, agenda_com_suprimento):
+    # Testa que o lote vende a agenda uma vez só e consome os suprimentos uma vez.
+    vendas = [venda.VendaEmLote(cadastros['funcionario'], cadastros['cliente'], date.today(), [], agenda_com_suprimento)
+              for _ in range(2)]
+    resultado = venda.criar_vendas_em_lote(db, vendas)
+    assert len(resultado.vendas_criadas) == 1
+    assert list(resultado.falhas) == [1]
+    db.expire_all()
+    assert db.get(suprimento.Suprimento, cadastros['suprimento'].id).estoque == 2
+
+def test_venda_em_lote_com_status_desatualizado(db, cadastros, agenda_com_suprimento, monkeypatch):
+    # Testa que o lote não realiza de novo uma agenda vendida por outra sessão
+    # depois da leitura dos status: a primeira leitura devolve o status antigo,
+    # a marcação condicional detecta o conflito e a nova tentativa recusa a venda.
+    venda.criar_venda(db, cadastros['funcionario'], cadastros['cliente'], date.today(), [], agenda_obj=agenda_com_suprimento)
+    carregar_original = venda._carregar_por_ids
+    leituras_desatualizadas = []
+
+    def carregar_com_status_antigo(db_sessao, colunas, coluna_id, ids, bloquear=False):
+        valores = carregar_original(db_sessao, colunas, coluna_id, ids, bloquear)
+        if coluna_id is agenda.Agenda.id and not leituras_desatualizadas:
+            leituras_desatualizadas.append(True)
+            return {id_agenda: agenda.AgendaStatus.AGENDADO for id_agenda in valores}
+        return valores
+
+    monkeypatch.setattr(venda, '_carregar_por_ids', carregar_com_status_antigo)
+    resultado = venda.criar_vendas_em_lote(db, [
+        venda.VendaEmLote(cadastros['funcionario'], cadastros['cliente'], date.today(), [], agenda_com_suprimento)
+    ])
+    assert resultado.vendas_criadas == []
+    assert "já foi realizada" in resultado.falhas[0]
+    db.expire_all()
+    assert db.query(venda.Venda).count() == 1
+    assert db.get(suprimento.Suprimento, cadastros['suprimento'].id).estoque == 2
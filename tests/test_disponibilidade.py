@@ -0,0 +1,91 @@
+import pytest
+from datetime import date, datetime, timedelta
+
+import agenda
+import cliente
+import disponibilidade
+import funcionario
+import info
+import maquina
+import pessoa
+
+INICIO = datetime(2030, 1, 7, 9, 0)
+FIM = INICIO + timedelta(hours=1)
+
+@pytest.fixture
+def outro_cliente(db):
+    novo_cliente = cliente.Cliente("Caio Reis", date(1992, 3, 4), pessoa.gerar_cpf_valido(),
+                                   info.Informacao("11999990002", "caio@teste.com", "Rua Teste, 3", ""))
+    db.add(novo_cliente)
+    db.commit()
+    return novo_cliente
+
+@pytest.fixture
+def maquinas(db):
+    novas = [maquina.Maquina(f"Cadeira {numero}", f"SERIE-{numero}", 1000.0, maquina.StatusMaquina.OPERANDO) for numero in (1, 2)]
+    db.add_all(novas)
+    db.commit()
+    return novas
+
+def _agendar(db, cadastros, cliente_obj, inicio: datetime = INICIO, fim: datetime = FIM, maquinas_agendadas=None) -> agenda.Agenda:
+    return agenda.criar_agenda(db, cadastros['funcionario'], cliente_obj, inicio, fim, [agenda.ItemAgendado(cadastros['produto'], 1)],
+                               maquinas_agendadas=maquinas_agendadas)
+
+def test_horario_ocupado_e_recusado(db, cadastros, outro_cliente):
+    # Testa que o funcionário não recebe duas agendas no mesmo horário.
+    _agendar(db, cadastros, cadastros['cliente'])
+    with pytest.raises(ValueError, match=r"O funcionário já possui a agenda ID"):
+        _agendar(db, cadastros, outro_cliente, INICIO + timedelta(minutes=30), FIM + timedelta(minutes=30))
+
+def test_agenda_nao_realizada_libera_horario(db, cadastros, outro_cliente):
+    # Testa que o horário de uma agenda não realizada pode ser agendado de
+    # novo e volta a aparecer entre os horários livres.
+    cancelada = _agendar(db, cadastros, cadastros['cliente'])
+    id_funcionario = cadastros['funcionario'].id
+    assert INICIO not in disponibilidade.horarios_livres_funcionario(db, id_funcionario, INICIO, FIM, timedelta(hours=1))
+
+    agenda.atualizar_agenda(db, cancelada.id, status=agenda.AgendaStatus.NAO_REALIZADO)
+    assert disponibilidade.horarios_livres_funcionario(db, id_funcionario, INICIO, FIM, timedelta(hours=1)) == [INICIO]
+
+    nova = _agendar(db, cadastros, outro_cliente)
+    assert nova.status == agenda.AgendaStatus.AGENDADO
+    assert [linha.id for linha in disponibilidade.buscar_agendas_sobrepostas(db, INICIO, FIM, funcionario_id=id_funcionario)] == [nova.id]
+
+def test_reabrir_agenda_com_horario_tomado_e_recusado(db, cadastros, outro_cliente):
+    # Testa que a agenda não realizada não volta a AGENDADO se o horário já
+    # foi tomado por outra.
+    cancelada = _agendar(db, cadastros, cadastros['cliente'])
+    agenda.atualizar_agenda(db, cancelada.id, status=agenda.AgendaStatus.NAO_REALIZADO)
+    _agendar(db, cadastros, outro_cliente)
+    with pytest.raises(ValueError, match=r"O funcionário já possui a agenda ID"):
+        agenda.atualizar_agenda(db, cancelada.id, status=agenda.AgendaStatus.AGENDADO)
+    assert db.get(agenda.Agenda, cancelada.id).status == agenda.AgendaStatus.NAO_REALIZADO
+
+def test_trocar_maquinas_atualiza_indice(db, cadastros, maquinas):
+    # Testa que, depois de trocar as máquinas de uma agenda, o índice de
+    # ocupação passa a responder pelas máquinas novas.
+    primeira, segunda = maquinas
+    agendada = _agendar(db, cadastros, cadastros['cliente'], maquinas_agendadas=[primeira])
+    assert agenda.listar_maquinas_livres(db, [primeira.id, segunda.id], INICIO, FIM) == [segunda.id]
+
+    agenda.atualizar_agenda(db, agendada.id, maquinas_agendadas=[segunda])
+    assert agenda.listar_maquinas_livres(db, [primeira.id, segunda.id], INICIO, FIM) == [primeira.id]
+    assert not agenda.verificar_conflito_maquina(db, primeira.id, INICIO, FIM)
+
+def test_mover_agenda_para_maquina_ocupada_e_recusado(db, cadastros, outro_cliente, maquinas):
+    # Testa que mudar o horário de uma agenda para quando a máquina dela já
+    # está em uso é recusado e a agenda continua no horário antigo.
+    primeira, _ = maquinas
+    _agendar(db, cadastros, cadastros['cliente'], maquinas_agendadas=[primeira])
+    depois = INICIO + timedelta(hours=3)
+    outro_funcionario = funcionario.Funcionario("Davi Melo", date(1988, 8, 8), pessoa.gerar_cpf_valido(), "12345678902",
+                                                info.Informacao("11999990003", "davi@teste.com", "Rua Teste, 4", ""),
+                                                2000.0, date(2020, 1, 1))
+    db.add(outro_funcionario)
+    db.commit()
+    movida = agenda.criar_agenda(db, outro_funcionario, outro_cliente, depois, depois + timedelta(hours=1),
+                                 [agenda.ItemAgendado(cadastros['produto'], 1)], maquinas_agendadas=[primeira])
+    movida_id = movida.id
+    with pytest.raises(ValueError, match=r"A máquina 'Cadeira 1' já está em uso"):
+        agenda.atualizar_agenda(db, movida_id, data_hora_inicio=INICIO + timedelta(minutes=30), data_hora_fim=FIM + timedelta(minutes=30))
+    assert db.get(agenda.Agenda, movida_id).data_hora_inicio == depois
@@ -0,0 +1,66 @@
+from datetime import date
+from sqlalchemy import select
+
+import movimentos_estoque
+import venda
+from database import saldos_estoque_tabela
+
+def _fotografias(db, id_produto: int) -> dict[date, float]:
+    t = saldos_estoque_tabela
+    consulta = select(t.c.data, t.c.saldo).where(t.c.item_tipo == 'Produto', t.c.item_id == id_produto)
+    return dict(db.execute(consulta).all())
+
+def _vender(db, cadastros, data_venda: date, quantidade: float) -> venda.Venda:
+    return venda.criar_venda(db, cadastros['funcionario'], cadastros['cliente'], data_venda,
+                             [venda.ItemVenda(cadastros['produto'], quantidade)])
+
+def test_fotografias_de_fim_de_mes(db, cadastros):
+    # Testa que as fotografias que faltam são criadas no fim de cada mês desde
+    # o primeiro movimento e que uma segunda chamada não grava nada.
+    produto_obj = cadastros['produto']
+    movimentos_estoque.registrar_ajuste(db, 'Produto', produto_obj.id, 10.0, date(2029, 11, 15))
+    db.commit()
+    _vender(db, cadastros, date(2030, 1, 5), 4)
+    _vender(db, cadastros, date(2030, 2, 20), 1)
+
+    assert movimentos_estoque.fotografar_estoque(db, date(2030, 3, 31)) > 0
+    assert _fotografias(db, produto_obj.id) == {
+        date(2029, 11, 30): 10, date(2029, 12, 31): 10, date(2030, 1, 31): 6, date(2030, 2, 28): 5, date(2030, 3, 31): 5,
+    }
+    assert movimentos_estoque.fotografar_estoque(db, date(2030, 3, 31)) == 0
+
+def test_movimento_retroativo_ajusta_fotografias(db, cadastros):
+    # Testa que uma venda com data passada soma a baixa nas fotografias a
+    # partir da data dela, sem apagá-las, e que o resultado é o mesmo de
+    # fotografar de novo do zero.
+    produto_obj = cadastros['produto']
+    movimentos_estoque.registrar_ajuste(db, 'Produto', produto_obj.id, 10.0, date(2029, 11, 15))
+    db.commit()
+    _vender(db, cadastros, date(2030, 1, 5), 4)
+    movimentos_estoque.fotografar_estoque(db, date(2030, 2, 28))
+
+    _vender(db, cadastros, date(2029, 12, 10), 3)
+    ajustadas = _fotografias(db, produto_obj.id)
+    assert ajustadas == {date(2029, 11, 30): 10, date(2029, 12, 31): 7, date(2030, 1, 31): 3, date(2030, 2, 28): 3}
+
+    db.execute(saldos_estoque_tabela.delete())
+    db.commit()
+    movimentos_estoque.fotografar_estoque(db, date(2030, 2, 28))
+    assert _fotografias(db, produto_obj.id) == ajustadas
+    assert [movimentos_estoque.saldo_em(db, 'Produto', produto_obj.id, dia)
+            for dia in (date(2029, 11, 14), date(2029, 12, 10), date(2030, 1, 4), date(2030, 1, 5))] == [0, 7, 7, 3]
+
+def test_mudar_data_da_venda_move_as_baixas(db, cadastros):
+    # Testa que corrigir a data de uma venda leva junto os movimentos dela:
+    # os saldos por data e as fotografias entre a data antiga e a nova
+    # passam a refletir a baixa na nova data.
+    produto_obj = cadastros['produto']
+    movimentos_estoque.registrar_ajuste(db, 'Produto', produto_obj.id, 10.0, date(2029, 11, 15))
+    db.commit()
+    nova_venda = _vender(db, cadastros, date(2030, 2, 10), 4)
+    movimentos_estoque.fotografar_estoque(db, date(2030, 2, 28))
+
+    venda.atualizar_dados_venda(db, nova_venda.id, data_venda=date(2029, 12, 20))
+    assert _fotografias(db, produto_obj.id) == {date(2029, 11, 30): 10, date(2029, 12, 31): 6, date(2030, 1, 31): 6, date(2030, 2, 28): 6}
+    assert [movimentos_estoque.saldo_em(db, 'Produto', produto_obj.id, dia)
+            for dia in (date(2029, 12, 19), date(2029, 12, 20), date(2030, 2, 9), date(2030, 2, 10))] == [10, 6, 6, 6]
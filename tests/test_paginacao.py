@@ -0,0 +1,74 @@
+import pytest
+from datetime import date, datetime, timedelta
+
+import agenda
+import paginacao
+import produto
+import venda
+
+def _todas_as_paginas(paginar, tamanho_pagina: int) -> list[list]:
+    # Segue os tokens até a última página, que não tem próximo token.
+    paginas = []
+    token = None
+    while True:
+        pagina = paginar(token, tamanho_pagina)
+        paginas.append(list(pagina))
+        if pagina.proximo_token is None:
+            return paginas
+        token = pagina.proximo_token
+
+def test_vendas_com_datas_repetidas(db, cadastros):
+    # Testa que, com muitas vendas no mesmo dia, as páginas seguem a ordem
+    # (data, id) sem pular nem repetir nenhuma venda.
+    vendas = [venda.Venda(funcionario_obj=cadastros['funcionario'], cliente_obj=cadastros['cliente'],
+                          data_venda=date(2030, 1, 1) + timedelta(days=indice % 3))
+              for indice in range(23)]
+    db.add_all(vendas)
+    db.commit()
+    esperado = [v.id for v in sorted(vendas, key=lambda v: (v.data_venda, v.id))]
+
+    paginas = _todas_as_paginas(lambda token, tamanho: venda.paginar_vendas(db, token=token, tamanho_pagina=tamanho), 5)
+    assert [len(pagina) for pagina in paginas] == [5, 5, 5, 5, 3]
+    assert [v.id for pagina in paginas for v in pagina] == esperado
+
+def test_agendas_descendentes_com_inicios_repetidos(db, cadastros):
+    # Testa a ordem decrescente por (início, id) com vários inícios iguais:
+    # a chave datetime atravessa o token e nenhuma agenda se perde.
+    inicio = datetime(2030, 1, 7, 9, 0)
+    agendas = [agenda.Agenda(cadastros['funcionario'], cadastros['cliente'], inicio + timedelta(hours=indice % 4),
+                             inicio + timedelta(hours=indice % 4, minutes=30))
+               for indice in range(14)]
+    db.add_all(agendas)
+    db.commit()
+    esperado = [a.id for a in sorted(agendas, key=lambda a: (a.data_hora_inicio, a.id), reverse=True)]
+
+    paginas = _todas_as_paginas(lambda token, tamanho: agenda.paginar_agendas(db, token=token, tamanho_pagina=tamanho), 4)
+    assert [a.id for pagina in paginas for a in pagina] == esperado
+
+def test_ultima_pagina_completa_nao_tem_proximo_token(db):
+    # Testa a borda do limite + 1: com exatamente duas páginas cheias, a
+    # segunda não aponta para uma terceira vazia.
+    db.add_all([produto.Produto(f"Produto {indice:02d}", 10.0, 1.0) for indice in range(10)])
+    db.commit()
+    primeira = produto.paginar_produtos(db, tamanho_pagina=5)
+    segunda = produto.paginar_produtos(db, primeira.proximo_token, tamanho_pagina=5)
+    assert len(primeira) == 5 and primeira.proximo_token is not None
+    assert len(segunda) == 5 and segunda.proximo_token is None
+    assert len(produto.paginar_produtos(db, tamanho_pagina=10)) == 10
+
+def test_token_preserva_datas():
+    # Testa que date e datetime voltam do token com o mesmo tipo.
+    valores = [datetime(2030, 1, 7, 9, 30), date(2030, 1, 7), 42]
+    assert paginacao.decodificar_token(paginacao.codificar_token(valores), 3) == valores
+
+@pytest.mark.parametrize("token", [
+    "isto não é base64!",
+    paginacao.codificar_token([1]),
+    paginacao.codificar_token([1, 2])[:-3],
+    "bnVsbA",
+])
+def test_token_adulterado_e_recusado(db, token):
+    # Testa que um token inválido, truncado ou com outra quantidade de
+    # chaves é recusado com ValueError em vez de virar um filtro qualquer.
+    with pytest.raises(ValueError, match=r"Token de paginação inválido"):
+        venda.paginar_vendas(db, token=token)
@@ -0,0 +1,40 @@
+import pytest
+from datetime import datetime, timedelta
+
+import agenda
+import suprimento
+
+INICIO = datetime(2030, 1, 7, 9, 0)
+
+def _agendar(db, cadastros, inicio: datetime, quantidade_suprimento: float) -> agenda.Agenda:
+    return agenda.criar_agenda(db, cadastros['funcionario'], cadastros['cliente'], inicio, inicio + timedelta(hours=1),
+                               [agenda.ItemAgendado(cadastros['produto'], 1)],
+                               suprimentos_utilizados=[agenda.SuprimentoAgendado(cadastros['suprimento'], quantidade_suprimento)])
+
+def test_agenda_reserva_suprimentos(db, cadastros):
+    # Testa que a agenda reserva os suprimentos sem baixar o estoque.
+    nova_agenda = _agendar(db, cadastros, INICIO, 8)
+    id_suprimento = cadastros['suprimento'].id
+    assert agenda.quantidades_reservadas(db, [id_suprimento]) == {id_suprimento: 8}
+    assert db.get(suprimento.Suprimento, id_suprimento).estoque == 10
+    assert nova_agenda.status == agenda.AgendaStatus.AGENDADO
+
+def test_agenda_recusada_sem_saldo_disponivel(db, cadastros):
+    # Testa que uma agenda que precisa de mais do que o estoque menos as
+    # reservas é recusada e nada é gravado.
+    _agendar(db, cadastros, INICIO, 8)
+    with pytest.raises(ValueError, match=r"Suprimento 'Gel Fixador' insuficiente: disponível 2.00 un, necessário 5.00"):
+        _agendar(db, cadastros, INICIO + timedelta(hours=2), 5)
+    assert db.query(agenda.Agenda).count() == 1
+    assert agenda.quantidades_reservadas(db, [cadastros['suprimento'].id]) == {cadastros['suprimento'].id: 8}
+
+def test_agenda_cancelada_libera_reserva(db, cadastros):
+    # Testa que uma agenda não realizada deixa de reservar, e que reabri-la
+    # sem saldo é recusado sem alterar o status.
+    primeira = _agendar(db, cadastros, INICIO, 8)
+    agenda.atualizar_agenda(db, primeira.id, status=agenda.AgendaStatus.NAO_REALIZADO)
+    _agendar(db, cadastros, INICIO + timedelta(hours=2), 5)
+
+    with pytest.raises(ValueError, match=r"insuficiente"):
+        agenda.atualizar_agenda(db, primeira.id, status=agenda.AgendaStatus.AGENDADO)
+    assert db.get(agenda.Agenda, primeira.id).status == agenda.AgendaStatus.NAO_REALIZADO
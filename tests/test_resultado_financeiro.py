@@ -0,0 +1,50 @@
+from datetime import date
+from sqlalchemy import select
+
+import resultado_financeiro
+import venda
+from database import resultados_fechados_tabela
+
+HOJE = date(2030, 6, 1)
+
+def _vender(db, cadastros, data_venda: date, quantidade: float) -> venda.Venda:
+    return venda.criar_venda(db, cadastros['funcionario'], cadastros['cliente'], data_venda,
+                             [venda.ItemVenda(cadastros['produto'], quantidade)])
+
+def _meses_guardados(db) -> set[date]:
+    t = resultados_fechados_tabela
+    return set(db.scalars(select(t.c.inicio).where(t.c.periodicidade == 'mes')).all())
+
+def test_venda_retroativa_recalcula_mes_fechado(db, cadastros):
+    # Testa que um mês encerrado fica guardado e que uma venda gravada depois
+    # com data nele apaga o resultado guardado, que volta a ser calculado com
+    # a venda nova.
+    _vender(db, cadastros, date(2030, 1, 10), 1)
+    resultado = resultado_financeiro.gerar_resultado(db, date(2030, 1, 1), date(2030, 1, 31), hoje=HOJE)
+    assert [(linha.vendas, linha.receita) for linha in resultado] == [(1, 25.0)]
+    assert _meses_guardados(db) == {date(2030, 1, 1)}
+
+    _vender(db, cadastros, date(2030, 1, 20), 2)
+    assert _meses_guardados(db) == set()
+    resultado = resultado_financeiro.gerar_resultado(db, date(2030, 1, 1), date(2030, 1, 31), hoje=HOJE)
+    assert [(linha.vendas, linha.receita) for linha in resultado] == [(2, 75.0)]
+    assert _meses_guardados(db) == {date(2030, 1, 1)}
+
+def test_invalidar_apaga_so_os_periodos_das_datas(db, cadastros):
+    # Testa que datas distantes apagam só os períodos que as contêm, e não
+    # os meses, semanas e dias que ficam entre elas.
+    _vender(db, cadastros, date(2030, 2, 12), 1)
+    for periodicidade in resultado_financeiro.PERIODICIDADES:
+        resultado_financeiro.gerar_resultado(db, date(2030, 1, 1), date(2030, 4, 30), periodicidade, hoje=HOJE)
+    t = resultados_fechados_tabela
+    antes = set(db.execute(select(t.c.periodicidade, t.c.inicio)).all())
+
+    resultado_financeiro.invalidar_resultados_fechados(db, [date(2030, 1, 15), date(2030, 4, 2)])
+    db.commit()
+    apagados = antes - set(db.execute(select(t.c.periodicidade, t.c.inicio)).all())
+    assert apagados == {
+        ('mes', date(2030, 1, 1)), ('mes', date(2030, 4, 1)),
+        ('semana', date(2030, 1, 14)), ('semana', date(2030, 4, 1)),
+        ('dia', date(2030, 1, 15)), ('dia', date(2030, 4, 2)),
+    }
+    assert date(2030, 2, 1) in _meses_guardados(db) and date(2030, 3, 1) in _meses_guardados(db)
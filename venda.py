@@ -1,16 +1,25 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
-from sqlalchemy.orm import Session, relationship
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index, select, update, bindparam, case
+from sqlalchemy.orm import Session, Query, relationship
+from collections import defaultdict
+from itertools import chain
 from datetime import date
-from typing import Optional, Union, List, Any
+from typing import Optional, Union, List, Any, Iterable
 import tabulate
 
-from database import Base, venda_itens_tabela, agenda_itens_tabela
+from database import (Base, venda_itens_tabela, agenda_itens_tabela, faltas_suprimentos_tabela, dividir_em_lotes,
+                      agrupar_linhas_por, executar_com_retentativas, ConflitoConcorrencia)
+from pessoa import Pessoa
 import funcionario as mod_funcionario
 import cliente as mod_cliente
 import servico as mod_servico
 import produto as mod_produto
 import agenda as mod_agenda
 import suprimento as mod_suprimento
+from resolvedor_nomes import obter_resolvedor
+from exportacao import RelatorioEmFluxo
+from paginacao import Pagina, paginar_consulta, TAMANHO_PAGINA
+import resumos_diarios as mod_resumos
+import movimentos_estoque as mod_movimentos
 
 class ItemVenda:
     def __init__(self, item: Union[mod_servico.Servico, mod_produto.Produto], quantidade: float, preco_unitario_vendido: Optional[float] = None):
@@ -21,6 +30,14 @@ class ItemVenda:
 
 class Venda(Base):
     __tablename__ = 'vendas'
+    # listar_vendas filtra por período e/ou pessoa e sempre ordena por data:
+    # o índice da data atende o período, os compostos (pessoa, data) atendem
+    # os filtros por pessoa já na ordem do relatório.
+    __table_args__ = (
+        Index('ix_vendas_data_venda', 'data_venda'),
+        Index('ix_vendas_cliente_data', 'cliente_id', 'data_venda'),
+        Index('ix_vendas_funcionario_data', 'funcionario_id', 'data_venda'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     data_venda = Column(Date, nullable=False)
@@ -29,7 +46,7 @@ class Venda(Base):
 
     funcionario_id = Column(Integer, ForeignKey('pessoas.id'), nullable=False)
     cliente_id = Column(Integer, ForeignKey('pessoas.id'), nullable=False)
-    agenda_id = Column(Integer, ForeignKey('agendas.id'), nullable=True)
+    agenda_id = Column(Integer, ForeignKey('agendas.id'), nullable=True, index=True)
 
     funcionario = relationship("Funcionario", foreign_keys=[funcionario_id])
     cliente = relationship("Cliente", foreign_keys=[cliente_id])
@@ -44,26 +61,82 @@ class Venda(Base):
         self.comentario = comentario
         self.valor_total = 0.0
 
+class VendaEmLote:
+    def __init__(self, funcionario_obj: mod_funcionario.Funcionario, cliente_obj: mod_cliente.Cliente,
+                 data_venda_obj: date, itens_venda: List[ItemVenda],
+                 agenda_obj: Optional[mod_agenda.Agenda] = None, comentario: Optional[str] = None):
+        self.funcionario_obj = funcionario_obj
+        self.cliente_obj = cliente_obj
+        self.data_venda_obj = data_venda_obj
+        self.itens_venda = itens_venda
+        self.agenda_obj = agenda_obj
+        self.comentario = comentario
+
+class ResultadoVendasEmLote:
+    def __init__(self):
+        self.vendas_criadas: List[Venda] = []
+        # Índice da venda na lista de entrada -> motivo da rejeição.
+        self.falhas: dict[int, str] = {}
+
+    def __str__(self) -> str:
+        return f"Vendas criadas: {len(self.vendas_criadas)}, Vendas rejeitadas: {len(self.falhas)}"
+
 # Funções de CRUD e Lógica de Negócio para Venda
 
 def criar_venda(db: Session, funcionario_obj: mod_funcionario.Funcionario, cliente_obj: mod_cliente.Cliente,
                 data_venda_obj: date, itens_venda: List[ItemVenda],
                 agenda_obj: Optional[mod_agenda.Agenda] = None, comentario: Optional[str] = None) -> Venda:
-
-    for item_v in itens_venda:
-        if isinstance(item_v.item, mod_produto.Produto):
-            if item_v.item.estoque < item_v.quantidade:
-                raise ValueError(f"Estoque insuficiente para o produto '{item_v.item.nome}'.")
+    # A venda inteira é uma transação, repetida em caso de conflito com
+    # outra sessão (deadlock, banco bloqueado).
+    return executar_com_retentativas(db, lambda: _criar_venda(
+        db, funcionario_obj, cliente_obj, data_venda_obj, itens_venda, agenda_obj, comentario
+    ))
+
+def _baixar_estoque_produtos(db: Session, itens_venda: List[ItemVenda]) -> None:
+    # UPDATE condicional: a verificação do saldo e a baixa são uma única
+    # instrução no banco, então duas sessões não vendem a mesma unidade. Os
+    # produtos são baixados em ordem de ID para que vendas concorrentes
+    # bloqueiem as linhas na mesma ordem.
+    tabela_produtos = mod_produto.Produto.__table__
+    nomes = {item_v.item.id: item_v.item.nome for item_v in itens_venda if isinstance(item_v.item, mod_produto.Produto)}
+    demanda = _demanda_por_produto(itens_venda)
+    for id_produto in sorted(demanda):
+        baixados = db.execute(
+            update(tabela_produtos)
+            .where(tabela_produtos.c.id == id_produto, tabela_produtos.c.estoque >= demanda[id_produto])
+            .values(estoque=tabela_produtos.c.estoque - demanda[id_produto])
+        ).rowcount
+        if not baixados:
+            db.rollback()
+            raise ValueError(f"Estoque insuficiente para o produto '{nomes[id_produto]}'.")
+
+def _criar_venda(db: Session, funcionario_obj: mod_funcionario.Funcionario, cliente_obj: mod_cliente.Cliente,
+                 data_venda_obj: date, itens_venda: List[ItemVenda],
+                 agenda_obj: Optional[mod_agenda.Agenda] = None, comentario: Optional[str] = None) -> Venda:
+    if agenda_obj:
+        # A agenda passa a REALIZADO num UPDATE condicional, antes de qualquer
+        # baixa: se ela já foi vendida (nesta ou em outra sessão), nada é
+        # gravado e os suprimentos não são consumidos duas vezes.
+        tabela_agendas = mod_agenda.Agenda.__table__
+        realizadas = db.execute(
+            update(tabela_agendas)
+            .where(tabela_agendas.c.id == agenda_obj.id, tabela_agendas.c.status != mod_agenda.AgendaStatus.REALIZADO)
+            .values(status=mod_agenda.AgendaStatus.REALIZADO)
+        ).rowcount
+        if not realizadas:
+            db.rollback()
+            raise ValueError(f"A Agenda ID {agenda_obj.id} já foi realizada.")
+    _baixar_estoque_produtos(db, itens_venda)
 
     nova_venda = Venda(
         funcionario_obj=funcionario_obj, cliente_obj=cliente_obj,
         data_venda=data_venda_obj, agenda_obj=agenda_obj, comentario=comentario
     )
     db.add(nova_venda)
-    db.commit()
-    db.refresh(nova_venda)
+    db.flush()
 
     total_venda = 0
+    movimentos_venda = []
     for item_v in itens_venda:
         db.execute(venda_itens_tabela.insert().values(
             venda_id=nova_venda.id,
@@ -75,32 +148,212 @@ def criar_venda(db: Session, funcionario_obj: mod_funcionario.Funcionario, clien
         total_venda += item_v.subtotal
 
         if isinstance(item_v.item, mod_produto.Produto):
-            item_v.item.estoque -= item_v.quantidade
-            db.add(item_v.item)
+            movimentos_venda.append(('Produto', item_v.item.id, -item_v.quantidade, data_venda_obj, nova_venda.id))
+    mod_movimentos.registrar_movimentos(db, 'venda', movimentos_venda)
 
     if agenda_obj:
         total_venda += agenda_obj.valor_total
-        agenda_obj.status = mod_agenda.AgendaStatus.REALIZADO
-        db.add(agenda_obj)
-
-        suprimentos_da_agenda = db.execute(
-            mod_agenda.agenda_suprimentos_tabela.select().where(mod_agenda.agenda_suprimentos_tabela.c.agenda_id == agenda_obj.id)
-        ).fetchall()
-
-        for sup_agendado in suprimentos_da_agenda:
-            suprimento_db = mod_suprimento.buscar_suprimento_id(db, sup_agendado.suprimento_id)
-            if suprimento_db:
-                suprimento_db.estoque -= sup_agendado.quantidade
-                if suprimento_db.estoque < 0:
-                    suprimento_db.estoque = 0
-                db.add(suprimento_db)
+        _consumir_suprimentos_das_agendas(db, {agenda_obj.id: nova_venda})
 
     nova_venda.valor_total = total_venda
+    mod_resumos.aplicar_vendas(db, [nova_venda.id])
     db.commit()
     db.refresh(nova_venda)
     return nova_venda
 
 
+def _demanda_por_produto(itens_venda: List[ItemVenda]) -> dict[int, float]:
+    demanda: dict[int, float] = defaultdict(float)
+    for item_v in itens_venda:
+        if isinstance(item_v.item, mod_produto.Produto):
+            demanda[item_v.item.id] += item_v.quantidade
+    return demanda
+
+def _carregar_por_ids(db: Session, colunas: tuple, coluna_id: Any, ids: Iterable[int], bloquear: bool = False) -> dict:
+    valores = {}
+    for lote in dividir_em_lotes(sorted(set(ids))):
+        consulta = db.query(*colunas).filter(coluna_id.in_(lote))
+        valores.update(consulta.with_for_update() if bloquear else consulta)
+    return valores
+
+def _consumir_suprimentos_das_agendas(db: Session, vendas_por_agenda: dict[int, Venda]) -> None:
+    consumo_por_suprimento: dict[int, float] = defaultdict(float)
+    suprimentos_por_agenda = agrupar_linhas_por(db, mod_agenda.agenda_suprimentos_tabela, 'agenda_id', vendas_por_agenda)
+    for sup_agendado in chain.from_iterable(suprimentos_por_agenda.values()):
+        consumo_por_suprimento[sup_agendado.suprimento_id] += sup_agendado.quantidade
+    if not consumo_por_suprimento:
+        return
+
+    # Uma leitura em lote (IN) do estoque, sob bloqueio, e um único UPDATE
+    # em executemany, qualquer que seja o número de suprimentos. O estoque
+    # lido dá a baixa efetiva de cada agenda para o razão: as agendas consomem
+    # na ordem dos IDs e a que encontrar o saldo zerado fica só com o que
+    # sobrou; a diferença vai para faltas_suprimentos.
+    tabela_suprimentos = mod_suprimento.Suprimento.__table__
+    estoque_atual: dict[int, float] = {}
+    for lote in dividir_em_lotes(consumo_por_suprimento):
+        estoque_atual.update(db.execute(
+            select(tabela_suprimentos.c.id, tabela_suprimentos.c.estoque)
+            .where(tabela_suprimentos.c.id.in_(lote)).with_for_update()
+        ).all())
+    movimentos_consumo, faltas = [], []
+    for id_agenda in sorted(suprimentos_por_agenda):
+        venda = vendas_por_agenda[id_agenda]
+        for sup_agendado in suprimentos_por_agenda[id_agenda]:
+            if sup_agendado.suprimento_id not in estoque_atual:
+                continue
+            baixa = min(sup_agendado.quantidade, max(estoque_atual[sup_agendado.suprimento_id], 0.0))
+            estoque_atual[sup_agendado.suprimento_id] -= baixa
+            movimentos_consumo.append(('Suprimento', sup_agendado.suprimento_id, -baixa, venda.data_venda, venda.id))
+            if baixa < sup_agendado.quantidade:
+                faltas.append({
+                    'venda_id': venda.id, 'agenda_id': id_agenda, 'suprimento_id': sup_agendado.suprimento_id,
+                    'data': venda.data_venda, 'quantidade_prevista': sup_agendado.quantidade,
+                    'quantidade_faltante': sup_agendado.quantidade - baixa,
+                })
+
+    estoque_restante = tabela_suprimentos.c.estoque - bindparam('b_quantidade')
+    db.execute(
+        update(tabela_suprimentos)
+        .where(tabela_suprimentos.c.id == bindparam('b_id'))
+        .values(estoque=case((estoque_restante < 0, 0.0), else_=estoque_restante)),
+        [{'b_id': id_sup, 'b_quantidade': qtd} for id_sup, qtd in consumo_por_suprimento.items()]
+    )
+    mod_movimentos.registrar_movimentos(db, 'consumo_agenda', movimentos_consumo)
+    if faltas:
+        db.execute(faltas_suprimentos_tabela.insert(), faltas)
+
+def listar_faltas_suprimentos(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> list:
+    t = faltas_suprimentos_tabela
+    consulta = t.select()
+    if data_inicio:
+        consulta = consulta.where(t.c.data >= data_inicio)
+    if data_fim:
+        consulta = consulta.where(t.c.data <= data_fim)
+    return db.execute(consulta.order_by(t.c.data.desc(), t.c.id.desc())).fetchall()
+
+def criar_vendas_em_lote(db: Session, vendas_lote: List[VendaEmLote]) -> ResultadoVendasEmLote:
+    return executar_com_retentativas(db, lambda: _criar_vendas_em_lote(db, vendas_lote))
+
+def _criar_vendas_em_lote(db: Session, vendas_lote: List[VendaEmLote]) -> ResultadoVendasEmLote:
+    resultado = ResultadoVendasEmLote()
+    if not vendas_lote:
+        return resultado
+
+    # O saldo é lido com bloqueio (SELECT ... FOR UPDATE) e a baixa abaixo
+    # ainda confere o saldo no próprio UPDATE, para os bancos que ignoram o
+    # bloqueio de leitura (SQLite).
+    tabela_produtos = mod_produto.Produto.__table__
+    estoque_disponivel: dict[int, float] = _carregar_por_ids(
+        db, (tabela_produtos.c.id, tabela_produtos.c.estoque), tabela_produtos.c.id,
+        (item_v.item.id for v in vendas_lote for item_v in v.itens_venda if isinstance(item_v.item, mod_produto.Produto)),
+        bloquear=True
+    )
+    status_agendas: dict[int, mod_agenda.AgendaStatus] = _carregar_por_ids(
+        db, (mod_agenda.Agenda.id, mod_agenda.Agenda.status), mod_agenda.Agenda.id,
+        (v.agenda_obj.id for v in vendas_lote if v.agenda_obj), bloquear=True
+    )
+
+    # A validação percorre o lote uma única vez, reservando o estoque em memória
+    # na ordem de entrada; vendas que não cabem no saldo restante são rejeitadas.
+    vendas_aceitas: list[tuple[VendaEmLote, Venda]] = []
+    baixas_por_produto: dict[int, float] = defaultdict(float)
+    agendas_realizadas: set[int] = set()
+    for indice, venda_lote in enumerate(vendas_lote):
+        try:
+            if not venda_lote.agenda_obj and not venda_lote.itens_venda:
+                raise ValueError("Uma venda sem agenda precisa ter pelo menos um item avulso.")
+
+            demanda = _demanda_por_produto(venda_lote.itens_venda)
+            for item_v in venda_lote.itens_venda:
+                if isinstance(item_v.item, mod_produto.Produto) and estoque_disponivel.get(item_v.item.id, 0.0) < demanda[item_v.item.id]:
+                    raise ValueError(f"Estoque insuficiente para o produto '{item_v.item.nome}'.")
+
+            if venda_lote.agenda_obj:
+                id_agenda = venda_lote.agenda_obj.id
+                if id_agenda not in status_agendas:
+                    raise ValueError(f"Agenda com ID {id_agenda} não encontrada.")
+                if status_agendas[id_agenda] == mod_agenda.AgendaStatus.REALIZADO or id_agenda in agendas_realizadas:
+                    raise ValueError(f"A Agenda ID {id_agenda} já foi realizada.")
+        except ValueError as erro:
+            resultado.falhas[indice] = str(erro)
+            continue
+
+        for id_produto, quantidade in demanda.items():
+            estoque_disponivel[id_produto] -= quantidade
+            baixas_por_produto[id_produto] += quantidade
+
+        nova_venda = Venda(
+            funcionario_obj=venda_lote.funcionario_obj, cliente_obj=venda_lote.cliente_obj,
+            data_venda=venda_lote.data_venda_obj, agenda_obj=venda_lote.agenda_obj, comentario=venda_lote.comentario
+        )
+        nova_venda.valor_total = sum(item_v.subtotal for item_v in venda_lote.itens_venda)
+        if venda_lote.agenda_obj:
+            nova_venda.valor_total += venda_lote.agenda_obj.valor_total
+            agendas_realizadas.add(venda_lote.agenda_obj.id)
+        vendas_aceitas.append((venda_lote, nova_venda))
+
+    if not vendas_aceitas:
+        return resultado
+
+    # Os IDs vêm do banco no flush (RETURNING ou o autoincremento de cada
+    # INSERT). Nenhum intervalo é reservado, então o lote não colide com
+    # vendas criadas ao mesmo tempo por outras sessões.
+    db.add_all([nova_venda for _, nova_venda in vendas_aceitas])
+    db.flush()
+
+    linhas_itens = [
+        {
+            'venda_id': nova_venda.id,
+            'item_tipo': item_v.item.__class__.__name__,
+            'item_id': item_v.item.id,
+            'quantidade': item_v.quantidade,
+            'preco_unitario_vendido': item_v.preco_unitario_vendido
+        }
+        for venda_lote, nova_venda in vendas_aceitas for item_v in venda_lote.itens_venda
+    ]
+    if linhas_itens:
+        db.execute(venda_itens_tabela.insert(), linhas_itens)
+
+    if baixas_por_produto:
+        baixados = db.execute(
+            update(tabela_produtos)
+            .where(tabela_produtos.c.id == bindparam('b_id'), tabela_produtos.c.estoque >= bindparam('b_quantidade'))
+            .values(estoque=tabela_produtos.c.estoque - bindparam('b_quantidade')),
+            [{'b_id': id_prod, 'b_quantidade': qtd} for id_prod, qtd in sorted(baixas_por_produto.items())]
+        ).rowcount
+        if baixados != len(baixas_por_produto):
+            # Outra sessão baixou o estoque depois da leitura: o lote é
+            # validado de novo com os saldos atuais.
+            raise ConflitoConcorrencia("Estoque alterado por outra sessão durante a importação.")
+        mod_movimentos.registrar_movimentos(db, 'venda', (
+            ('Produto', id_produto, -quantidade, nova_venda.data_venda, nova_venda.id)
+            for venda_lote, nova_venda in vendas_aceitas
+            for id_produto, quantidade in _demanda_por_produto(venda_lote.itens_venda).items()
+        ))
+
+    if agendas_realizadas:
+        tabela_agendas = mod_agenda.Agenda.__table__
+        for lote in dividir_em_lotes(sorted(agendas_realizadas)):
+            # Como em _criar_venda: só agendas ainda não realizadas mudam. Se
+            # outra sessão vendeu alguma depois da leitura, o lote é validado
+            # de novo e ela passa a ser recusada.
+            realizadas = db.execute(
+                update(tabela_agendas)
+                .where(tabela_agendas.c.id.in_(lote), tabela_agendas.c.status != mod_agenda.AgendaStatus.REALIZADO)
+                .values(status=mod_agenda.AgendaStatus.REALIZADO)
+            ).rowcount
+            if realizadas != len(lote):
+                raise ConflitoConcorrencia("Agenda realizada por outra sessão durante a importação.")
+        _consumir_suprimentos_das_agendas(db, {nova_venda.agenda_id: nova_venda for _, nova_venda in vendas_aceitas if nova_venda.agenda_id})
+
+    mod_resumos.aplicar_vendas(db, [nova_venda.id for _, nova_venda in vendas_aceitas])
+    db.commit()
+
+    resultado.vendas_criadas = [nova_venda for _, nova_venda in vendas_aceitas]
+    return resultado
+
+
 def buscar_venda(db: Session, id_venda: int) -> Optional[Venda]:
     return db.query(Venda).filter(Venda.id == id_venda).first()
 
@@ -109,27 +362,60 @@ def deletar_venda(db: Session, id_venda: int) -> None:
     if not venda:
         raise ValueError(f"Venda com ID {id_venda} não encontrada.")
 
+    mod_resumos.aplicar_vendas(db, [id_venda], sinal=-1)
     itens_vendidos = db.execute(venda_itens_tabela.select().where(venda_itens_tabela.c.venda_id == id_venda)).fetchall()
+    devolucao: dict[int, float] = {}
     for item_vendido in itens_vendidos:
         if item_vendido.item_tipo == 'Produto':
-            produto_obj = db.query(mod_produto.Produto).get(item_vendido.item_id)
-            if produto_obj:
-                produto_obj.estoque += item_vendido.quantidade
-                db.add(produto_obj)
+            devolucao[item_vendido.item_id] = devolucao.get(item_vendido.item_id, 0.0) + item_vendido.quantidade
+    # Como em _baixar_estoque_produtos: o estoque volta com um UPDATE sobre a
+    # própria coluna, em ordem de ID, sem depender do saldo lido na sessão.
+    tabela_produtos = mod_produto.Produto.__table__
+    movimentos_estorno = []
+    for id_produto in sorted(devolucao):
+        devolvidos = db.execute(
+            update(tabela_produtos).where(tabela_produtos.c.id == id_produto)
+            .values(estoque=tabela_produtos.c.estoque + devolucao[id_produto])
+        ).rowcount
+        if devolvidos:
+            movimentos_estorno.append(('Produto', id_produto, devolucao[id_produto], date.today(), id_venda))
+    mod_movimentos.registrar_movimentos(db, 'estorno', movimentos_estorno)
 
     if venda.agenda and venda.agenda.status == mod_agenda.AgendaStatus.REALIZADO:
+        # A agenda volta a AGENDADO e os suprimentos consumidos voltam ao
+        # estoque, reservados de novo para ela.
         venda.agenda.status = mod_agenda.AgendaStatus.AGENDADO
         db.add(venda.agenda)
+        tabela_suprimentos = mod_suprimento.Suprimento.__table__
+        consumidos = mod_movimentos.somar_movimentos_da_referencia(db, 'consumo_agenda', id_venda)
+        for (_, id_suprimento), quantidade in sorted(consumidos.items()):
+            db.execute(update(tabela_suprimentos).where(tabela_suprimentos.c.id == id_suprimento)
+                       .values(estoque=tabela_suprimentos.c.estoque - quantidade))
+        mod_movimentos.registrar_movimentos(db, 'estorno', (
+            (item_tipo, item_id, -quantidade, date.today(), id_venda) for (item_tipo, item_id), quantidade in consumidos.items()
+        ))
 
     db.execute(venda_itens_tabela.delete().where(venda_itens_tabela.c.venda_id == id_venda))
     db.delete(venda)
     db.commit()
 
-def _formatar_vendas_para_tabela(db: Session, vendas: list[Venda]) -> str:
-    if not vendas:
-        return "Nenhuma venda para exibir."
+def _buscar_nomes_pessoas(db: Session, ids: Iterable[int]) -> dict[int, str]:
+    nomes: dict[int, str] = {}
+    for lote in dividir_em_lotes(set(ids)):
+        nomes.update(db.query(Pessoa.id, Pessoa.nome).filter(Pessoa.id.in_(lote)))
+    return nomes
+
+CABECALHOS_RELATORIO_VENDAS = ["ID", "Data", "Funcionário", "Cliente", "Itens", "Valor Total"]
+
+def _preparar_linhas_vendas(db: Session, vendas: list[Venda]) -> tuple[list[list[Any]], dict[str, float]]:
+    # Todos os dados auxiliares são carregados em lote antes de montar a tabela,
+    # evitando uma consulta por venda, por item e por relacionamento.
+    itens_por_venda = agrupar_linhas_por(db, venda_itens_tabela, 'venda_id', (v.id for v in vendas))
+    itens_por_agenda = agrupar_linhas_por(db, agenda_itens_tabela, 'agenda_id', (v.agenda_id for v in vendas if v.agenda_id))
+    resolvedor = obter_resolvedor(db)
+    resolvedor.carregar_linhas(chain(chain.from_iterable(itens_por_venda.values()), chain.from_iterable(itens_por_agenda.values())))
+    nomes_pessoas = _buscar_nomes_pessoas(db, chain((v.funcionario_id for v in vendas), (v.cliente_id for v in vendas)))
 
-    cabecalhos = ["ID", "Data", "Funcionário", "Cliente", "Itens", "Valor Total"]
     dados_tabela = []
     total_geral = 0.0
     total_produtos = 0.0
@@ -139,37 +425,27 @@ def _formatar_vendas_para_tabela(db: Session, vendas: list[Venda]) -> str:
         itens_str_list = []
         
         # Itens avulsos da venda
-        itens_avulsos = db.execute(venda_itens_tabela.select().where(venda_itens_tabela.c.venda_id == venda.id)).fetchall()
-        for item in itens_avulsos:
-            nome_item = ""
+        for item in itens_por_venda.get(venda.id, []):
+            nome_item = resolvedor.nome(item.item_tipo, item.item_id) or ""
             subtotal = item.quantidade * item.preco_unitario_vendido
             if item.item_tipo == 'Produto':
-                prod = mod_produto.buscar_produto_id(db, item.item_id)
-                if prod: nome_item = prod.nome
                 total_produtos += subtotal
             elif item.item_tipo == 'Servico':
-                serv = mod_servico.buscar_servico_id(db, item.item_id)
-                if serv: nome_item = serv.nome
                 total_servicos += subtotal
             itens_str_list.append(f"{item.quantidade}x {nome_item} (R${item.preco_unitario_vendido:.2f})")
         
         # Itens da agenda, se houver
-        if venda.agenda:
-            itens_da_agenda = db.execute(agenda_itens_tabela.select().where(agenda_itens_tabela.c.agenda_id == venda.agenda_id)).fetchall()
+        if venda.agenda_id:
             agenda_str_list = []
-            for item_agenda in itens_da_agenda:
-                nome_item = ""
+            for item_agenda in itens_por_agenda.get(venda.agenda_id, []):
+                nome_item = resolvedor.nome(item_agenda.item_tipo, item_agenda.item_id) or ""
                 subtotal = item_agenda.quantidade * item_agenda.valor_negociado
                 if item_agenda.item_tipo == 'Produto':
-                    prod = mod_produto.buscar_produto_id(db, item_agenda.item_id)
-                    if prod: nome_item = prod.nome
                     total_produtos += subtotal
                 elif item_agenda.item_tipo == 'Servico':
-                    serv = mod_servico.buscar_servico_id(db, item_agenda.item_id)
-                    if serv: nome_item = serv.nome
                     total_servicos += subtotal
                 agenda_str_list.append(f"{item_agenda.quantidade}x {nome_item} (R${item_agenda.valor_negociado:.2f})")
-            itens_str_list.append(f"[Agenda ID:{venda.agenda.id}: {', '.join(agenda_str_list)}]")
+            itens_str_list.append(f"[Agenda ID:{venda.agenda_id}: {', '.join(agenda_str_list)}]")
 
         itens_str = ", ".join(itens_str_list) or "N/A"
         total_geral += venda.valor_total
@@ -177,23 +453,32 @@ def _formatar_vendas_para_tabela(db: Session, vendas: list[Venda]) -> str:
         dados_tabela.append([
             venda.id,
             venda.data_venda.strftime('%d/%m/%Y'),
-            venda.funcionario.nome,
-            venda.cliente.nome,
+            nomes_pessoas.get(venda.funcionario_id, ""),
+            nomes_pessoas.get(venda.cliente_id, ""),
             itens_str,
             f"R${venda.valor_total:.2f}"
         ])
 
-    tabela_formatada = tabulate.tabulate(dados_tabela, headers=cabecalhos, tablefmt="grid")
-    
-    sumario = (
+    return dados_tabela, {'produtos': total_produtos, 'servicos': total_servicos, 'geral': total_geral}
+
+def _montar_resumo_vendas(totais: dict[str, float]) -> str:
+    return (
         f"\n--- RESUMO DO FILTRO ---\n"
-        f"Total em Produtos: R${total_produtos:.2f}\n"
-        f"Total em Serviços: R${total_servicos:.2f}\n"
+        f"Total em Produtos: R${totais.get('produtos', 0.0):.2f}\n"
+        f"Total em Serviços: R${totais.get('servicos', 0.0):.2f}\n"
         f"--------------------------\n"
-        f"Valor Total Geral: R${total_geral:.2f}"
+        f"Valor Total Geral: R${totais.get('geral', 0.0):.2f}"
     )
 
-    return f"{tabela_formatada}{sumario}"
+def _formatar_vendas_para_tabela(db: Session, vendas: list[Venda]) -> str:
+    if not vendas:
+        return "Nenhuma venda para exibir."
+
+    dados_tabela, totais = _preparar_linhas_vendas(db, vendas)
+    tabela_formatada = tabulate.tabulate(dados_tabela, headers=CABECALHOS_RELATORIO_VENDAS, tablefmt="grid")
+    return f"{tabela_formatada}{_montar_resumo_vendas(totais)}"
+
+RELATORIO_VENDAS = RelatorioEmFluxo(CABECALHOS_RELATORIO_VENDAS, _preparar_linhas_vendas, _montar_resumo_vendas)
 
 
 def atualizar_dados_venda(db: Session, id_venda: int, **kwargs: Any) -> Venda:
@@ -202,16 +487,24 @@ def atualizar_dados_venda(db: Session, id_venda: int, **kwargs: Any) -> Venda:
         raise ValueError(f"Venda com ID {id_venda} não encontrada.")
 
     campos_permitidos = ['data_venda', 'comentario']
+    muda_resumo = 'data_venda' in kwargs
 
+    if muda_resumo:
+        mod_resumos.aplicar_vendas(db, [id_venda], sinal=-1)
     for chave, valor in kwargs.items():
         if chave in campos_permitidos:
             setattr(venda_existente, chave, valor)
+    if muda_resumo:
+        mod_resumos.aplicar_vendas(db, [id_venda])
+        # As baixas da venda (produtos e suprimentos da agenda) acompanham a
+        # data, para que os saldos por data não fiquem com a baixa no dia antigo.
+        mod_movimentos.mover_movimentos(db, ('venda', 'consumo_agenda'), id_venda, venda_existente.data_venda)
 
     db.commit()
     db.refresh(venda_existente)
     return venda_existente
 
-def listar_vendas(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None, cliente_id: Optional[int] = None, funcionario_id: Optional[int] = None) -> list[Venda]:
+def consultar_vendas(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None, cliente_id: Optional[int] = None, funcionario_id: Optional[int] = None) -> Query:
     query = db.query(Venda)
     if data_inicio:
         query = query.filter(Venda.data_venda >= data_inicio)
@@ -222,4 +515,12 @@ def listar_vendas(db: Session, data_inicio: Optional[date] = None, data_fim: Opt
     if funcionario_id:  
         query = query.filter(Venda.funcionario_id == funcionario_id)
 
-    return query.order_by(Venda.data_venda.asc()).all()
+    return query.order_by(Venda.data_venda.asc(), Venda.id.asc())
+
+def listar_vendas(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None, cliente_id: Optional[int] = None, funcionario_id: Optional[int] = None) -> list[Venda]:
+    return consultar_vendas(db, data_inicio, data_fim, cliente_id, funcionario_id).all()
+
+def paginar_vendas(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None, cliente_id: Optional[int] = None,
+                   funcionario_id: Optional[int] = None, token: Optional[str] = None, tamanho_pagina: int = TAMANHO_PAGINA) -> Pagina:
+    consulta = consultar_vendas(db, data_inicio, data_fim, cliente_id, funcionario_id)
+    return paginar_consulta(consulta, [Venda.data_venda, Venda.id], token, tamanho_pagina)